@@ -12,7 +12,6 @@ import toml
 import json
 import os
 import glob
-import struct
 import subprocess
 
 from datetime import datetime 
@@ -28,7 +27,14 @@ import threading
 
 
 import concurrent.futures  
-from parser.create_message import create_message
+from parser.create_message import create_message, create_message_batch
+from parser.deadband import DeadbandFilter
+from parser.filters import compile_filters
+import msgpack
+from parser.bulk_frames import pack_frames, BULK_CONTENT_TYPE, BULK_MSGPACK_TYPE
+from parser.stream_ingest import StreamClient
+from parser.serial_framer import SerialFramer
+from parser.serial_reader import SerialReader
 from LINK_CONSTANTS import *
 from dotenv import dotenv_values
 from websockets.sync.client import connect
@@ -88,12 +94,21 @@ except KeyError:
 # header to provide with each HTTP request to the parser for API authorization
 AUTH_HEADER = {"Authorization": f"Bearer {SECRET_KEY}"}
 
+# headers of parse requests: ask for compact msgpack responses (the parser answers JSON if it can not)
+PARSE_HEADERS = {**AUTH_HEADER, "Accept": f"{BULK_MSGPACK_TYPE}, application/json;q=0.5"}
+
 # API endpoints
 DEBUG_WRITE_ENDPOINT = f"{PARSER_URL}/api/v1/parse/write/debug"
 PROD_WRITE_ENDPOINT = f"{PARSER_URL}/api/v1/parse/write/production"
 NO_WRITE_ENDPOINT = f"{PARSER_URL}/api/v1/parse"
 HEALTH_ENDPOINT = f"{PARSER_URL}/api/v1/health"
 
+# WebSocket ingest endpoints (--stream): http:// -> ws://, https:// -> wss://
+STREAM_URL = "ws" + PARSER_URL[len("http"):] if PARSER_URL.startswith("http") else PARSER_URL
+DEBUG_STREAM_ENDPOINT = f"{STREAM_URL}/api/v1/stream/write/debug"
+PROD_STREAM_ENDPOINT = f"{STREAM_URL}/api/v1/stream/write/production"
+NO_WRITE_STREAM_ENDPOINT = f"{STREAM_URL}/api/v1/stream"
+
 EXPECTED_CAN_MSG_LENGTH = 30
 
 # ANSI sequences
@@ -112,12 +127,31 @@ DEFAULT_RANDOM_FREQUENCY_HZ = 10
 # global flag that indicates whether a SIGINT signal was received
 SIGINT_RECVD = False
 
+# longest time a frame waits in the --bulk buffer before the buffer is sent
+BULK_MAX_DELAY_S = 0.25
+
+# longest time the exit waits for the request that sends what is left in the --bulk buffer
+BULK_EXIT_TIMEOUT_S = 5.0
+
 # Chunks read per iteration
-CHUNK_SIZE = 24 * 21        # 21 CAN messages from serial at a time.
+SERIAL_QUEUE_CHUNKS = 1024  # chunks read from serial waiting to be framed (see parser/serial_reader.py)
 
 num_processed_msgs = 0
 
 batch_to_write = []
+
+# set by --deadband, see parser/deadband.py
+deadband_filter = None
+
+# WebSocket connection to the parser (--stream), see parser/stream_ingest.py
+stream_client = None
+
+# splits the serial stream into frames, see parser/serial_framer.py
+serial_framer = None
+
+# reads the serial port on its own thread, see parser/serial_reader.py
+serial_reader = None
+
 client = influxdb_client.InfluxDBClient(
     url=INFLUX_URL, org=INFLUX_ORG, token=INFLUX_TOKEN)
 write_api = client.write_api(write_options=SYNCHRONOUS)
@@ -133,7 +167,7 @@ def check_health_handler():
 
     # make ping request to parser
     try:
-        health_req = requests.get(HEALTH_ENDPOINT, headers=AUTH_HEADER)
+        health_req = requests.get(HEALTH_ENDPOINT, headers=AUTH_HEADER, timeout=5.0)
     except Exception:
         print(f"* parser @ {PARSER_URL} -{ANSI_RED} DOWN {ANSI_ESCAPE}")
         print("failed to connect to parser!")
@@ -156,9 +190,10 @@ def check_health_handler():
         name = service["name"]
         url = service["url"]
         status = service["status"]
+        latency = service.get("latency_ms")      # of the parser's last probe of the service
 
         if status == "UP":
-            print(f"|---> {name} @ {url} -{ANSI_GREEN} UP {ANSI_ESCAPE}")
+            print(f"|---> {name} @ {url} -{ANSI_GREEN} UP {ANSI_ESCAPE}" + (f" ({latency:.1f} ms)" if latency is not None else ""))
         elif status == "UNAUTHORIZED":
             print(f"|---> {name} @ {url} -{ANSI_YELLOW} UNAUTHORIZED {ANSI_ESCAPE}")
         else:
@@ -260,6 +295,11 @@ def sigint_handler(sig, frame):
     """
     print("Ctrl+C recv'd, exiting gracefully...")
 
+    # send the frames still waiting in the bulk buffer (--bulk/--stream) before the connections close
+    future = flush_bulk_buffer()
+    if future is not None:
+        concurrent.futures.wait([future], timeout=BULK_EXIT_TIMEOUT_S)
+
     # set SIGINT_RECVD flag to prevent future done callbacks from running
     global SIGINT_RECVD
     SIGINT_RECVD = True
@@ -271,6 +311,41 @@ def sigint_handler(sig, frame):
     print(f"{ANSI_BOLD}Link end time:{ANSI_ESCAPE} {end_time}")
     print(f"{ANSI_BOLD}Link elapsed time:{ANSI_ESCAPE} {end_time - start_time}")
 
+    # decode cache counters only move when frames are parsed locally (--local / offline)
+    decode_cache = parameters.get_decoder_table().cache
+    if decode_cache is not None and decode_cache.hits + decode_cache.misses > 0:
+        stats = decode_cache.stats()
+        print(f"{ANSI_BOLD}Decode cache:{ANSI_ESCAPE} {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['evictions']} evictions ({stats['hit_rate']:.1%} hit rate)")
+
+    # parse failures by reason (only frames parsed locally)
+    parse_failures = parameters.failure_counts()
+    if parse_failures:
+        print(f"{ANSI_BOLD}Parse failures:{ANSI_ESCAPE} " + ", ".join(f"{code}={count}" for code, count in parse_failures.items()))
+
+    if deadband_filter is not None:
+        stats = deadband_filter.stats()
+        print(f"{ANSI_BOLD}Deadband:{ANSI_ESCAPE} {stats['emitted']} values written, {stats['suppressed']} suppressed "
+              f"({stats['suppressed_ratio']:.1%})")
+
+    if serial_reader is not None:
+        serial_reader.stop()
+        stats = serial_reader.stats()
+        print(f"{ANSI_BOLD}Serial reader:{ANSI_ESCAPE} {stats['bytes_read']} bytes read, queue high-water mark "
+              f"{stats['high_water']}/{SERIAL_QUEUE_CHUNKS} chunks"
+              + (f", {ANSI_RED}{stats['overflows']} overflows ({stats['dropped_bytes']} bytes dropped){ANSI_ESCAPE}" if stats['overflows'] else ""))
+
+    if serial_framer is not None and serial_framer.discarded_bytes:
+        print(f"{ANSI_BOLD}Serial framing:{ANSI_ESCAPE} {sum(serial_framer.frames.values())} frames, "
+              f"{ANSI_RED}{serial_framer.discarded_bytes} bytes discarded in {serial_framer.misframes} misframes{ANSI_ESCAPE}")
+
+    if stream_client is not None:
+        stream_client.close()
+        if stream_client.lost_batches or stream_client.resent_batches:
+            print(f"{ANSI_BOLD}Stream:{ANSI_ESCAPE} {stream_client.sent_batches} batches sent, "
+                  f"{stream_client.resent_batches} resent after reconnecting, "
+                  f"{ANSI_RED}{stream_client.lost_batches} lost{ANSI_ESCAPE}")
+
     # shutdown the executor
     global executor
     if executor is not None:
@@ -280,46 +355,6 @@ def sigint_handler(sig, frame):
 
 
     
-def filter_stream(parse_response, filter_list):  
-    data_dict = parse_response['message']
-    return _filter_stream(data_dict, filter_list)
-
-def _filter_stream(data_dict, filter_list, type="CAN"):
-    if "ALL" in filter_list:
-        return True
-    elif "NONE" in filter_list:
-        return False
-      
-    for filter in filter_list:
-        if len(filter) > 2 and filter[:2] == "0x":
-            in_table_data = data_dict['COL']
-            for data_list in in_table_data.values():
-                if filter in data_list:
-                    return True
-        if filter.isdigit():
-            class_name = data_dict["Class"][0]
-
-            # try if it is CAN message
-            can_message = None
-            try:
-                can_message = parameters.CAR_DBC.get_message_by_name(class_name)
-            except:
-                continue
-
-            id = can_message.frame_id
-
-            if int(filter) == id:
-                return True
-            else:
-                continue
-        if filter.isalpha():
-            if filter.upper() == type.upper():
-                return True
-            continue
-
-    return False
-
-
 # <----- Co-routine definitions ----->
     
 def parser_request(payload: Dict, url: str):
@@ -327,7 +362,23 @@ def parser_request(payload: Dict, url: str):
     Makes a parse request to the given `url`.
     """
     try:
-        r = requests.post(url=url, json=payload, timeout=5.0, headers=AUTH_HEADER)
+        r = requests.post(url=url, json=payload, timeout=5.0, headers=PARSE_HEADERS)
+    except requests.ConnectionError as e:
+        print(e)
+        print(f"Unable to make POST request to {url=}!\n")
+    except requests.Timeout:
+        print(f"Connection timeout when making request to {url=}!\n")
+    else:
+        return r
+
+
+def parser_bulk_request(body: bytes, params: Dict, url: str):
+    """
+    Makes a bulk parse request (length prefixed frames, see parser/bulk_frames.py) to the given `url`.
+    """
+    try:
+        r = requests.post(url=url, data=body, params=params, timeout=5.0,
+                          headers={**PARSE_HEADERS, "Content-Type": BULK_CONTENT_TYPE})
     except requests.ConnectionError as e:
         print(e)
         print(f"Unable to make POST request to {url=}!\n")
@@ -399,47 +450,144 @@ def process_response(future: concurrent.futures.Future, args, display_filters: l
     #     print(f"{ANSI_BOLD}Response HTTP status code:{ANSI_ESCAPE} {ANSI_YELLOW}{response.status_code}{ANSI_ESCAPE}")
     # print(f"{ANSI_BOLD}Response HTTP status code:{ANSI_ESCAPE} {ANSI_GREEN}{response.status_code}{ANSI_ESCAPE}")
     
-    try:
-        parse_response: dict = response.json()
-    except json.JSONDecodeError:
-        print(f"Failed to parse response from parser as JSON!")
-        print(f"Response content: {response.content}")
+    parse_response = decode_parse_response(response)
+    if parse_response is None:
         return
 
+    count_acked_frames(parse_response)
     all_responeses = parse_response['all_responses']    
 
     for response in all_responeses:
-        if response["result"] == "OK":
-            table = handle_message_from_response(response["message"], display_filters, args)
+        handle_parse_response(response, args, display_filters, formatted_time)
 
-            if response["logMessage"] and table is not None:
-                write_to_log_file(table, LOG_FILE_NAME, "log", convert_to_hex=False)
-    
-        elif response["result"] == "PARSE_FAIL":
-            fail_msg = f"{ANSI_RED}PARSE_FAIL{ANSI_ESCAPE}: \n" + f"{response['error']}"
-            print(fail_msg)
-
-            # If log upload AND parse fails then log again to the FAILED_UPLOADS.txt file. If no log upload do normal
-            write_to_log_file(response['message'], os.path.join(FAIL_DIRECTORY, "FAILED_UPLOADS_{}.txt".format(formatted_time)) if args.log_upload else FAIL_FILE_NAME, "fail")
-            write_to_log_file(fail_msg + '\n', os.path.join(DEBUG_DIRECTORY, "FAILED_UPLOADS_{}.txt".format(formatted_time)) if args.log_upload else DEBUG_FILE_NAME, "dbg", convert_to_hex=False)
-        elif response["result"] == "INFLUX_WRITE_FAIL":
-            fail_msg = f"{ANSI_RED}INFLUX_WRITE_FAIL{ANSI_ESCAPE}: \n" + f"{response['error']}"
-            print(f"Failed to write measurements for {response['type']} message to InfluxDB!")
-            print(response)
-
-            # If log upload AND INFLUX_WRITE_FAIL fails then log again to the FAILED_UPLOADS.txt file. If no log upload do normal
-            write_to_log_file(response['message'], os.path.join(FAIL_DIRECTORY, "FAILED_UPLOADS_{}.txt".format(formatted_time)) if args.log_upload else FAIL_FILE_NAME, "fail")
-            write_to_log_file(fail_msg + '\n', os.path.join(DEBUG_DIRECTORY, "FAILED_UPLOADS_{}.txt".format(formatted_time)) if args.log_upload else DEBUG_FILE_NAME, "dbg", convert_to_hex=False)
-        else:
-            print(f"Unexpected response: {response['result']}")
 
-def handle_message_from_response(display_dict, display_filters, args):
+def process_bulk_response(future: concurrent.futures.Future, args, display_filters: list):
+    """
+    Done callback of a bulk parse request (see sendToParserBulk). The parser only sends back
+    responses for failed frames and frames matching the log filters, plus the number of frames
+    that parsed OK.
+    """
+    formatted_time = current_log_time.strftime('%Y-%m-%d_%H:%M:%S')
+
+    response = future.result()
+    if response is None or SIGINT_RECVD:
+        return
+
+    if response.status_code == 401:
+        print(f"{ANSI_BOLD}Response HTTP status code:{ANSI_ESCAPE} {ANSI_YELLOW}{response.status_code} (unauthorized access){ANSI_ESCAPE}")
+        print(f"Check that your configured secret key matches the parser's ({PARSER_URL}) secret key!")
+        return
+
+    parse_response = decode_parse_response(response)
+    if parse_response is None:
+        return
+
+    if response.status_code != 200:
+        print(f"{ANSI_RED}Bulk request rejected{ANSI_ESCAPE} ({response.status_code}): {parse_response.get('error')}")
+        return
+
+    count_acked_frames(parse_response)
+    for response in parse_response["all_responses"]:
+        handle_parse_response(response, args, display_filters, formatted_time)
+
+
+def process_stream_reply(reply: dict, args, display_filters: list):
+    """
+    Handles an ack of the parser's WebSocket ingest endpoint (--stream). Batch acks have the same
+    form as bulk responses plus a "seq" number.
+    """
+    if SIGINT_RECVD:
+        return
+
+    if "error" in reply:
+        print(f"{ANSI_RED}Stream message rejected{ANSI_ESCAPE}: {reply['error']}")
+        return
+    if "seq" not in reply:
+        return                                          # ack of the filter options
+
+    formatted_time = current_log_time.strftime('%Y-%m-%d_%H:%M:%S')
+    count_acked_frames(reply)
+    for response in reply["all_responses"]:
+        handle_parse_response(response, args, display_filters, formatted_time)
+
+
+def decode_parse_response(response) -> dict:
+    """
+    Decodes the body of a parse response (msgpack or JSON, see PARSE_HEADERS).
+    Returns None if the body can not be decoded.
+    """
+    try:
+        if response.headers.get("Content-Type", "").startswith(BULK_MSGPACK_TYPE):
+            return msgpack.unpackb(response.content, raw=False)
+        return response.json()
+    except ValueError:                                  # JSONDecodeError and msgpack errors
+        print(f"Failed to decode response from parser!")
+        print(f"Response content: {response.content}")
+        return None
+
+
+def count_acked_frames(parse_response: dict):
+    """
+    Ack mode responses (see sendToParser) only count the frames that parsed OK without sending
+    them back, so those frames are counted as processed here.
+    """
+    if "ok" not in parse_response:
+        return
+
+    global num_processed_msgs
+    num_processed_msgs += parse_response["ok"] - sum(1 for r in parse_response["all_responses"] if r["result"] == "OK")
+
+
+def handle_parse_response(response: dict, args, display_filters: list, formatted_time: str):
+    """
+    Displays and logs the parser's response for one frame.
+    """
+    if response["result"] == "OK":
+        do_display_table = compile_filters(display_filters).matches(response["type"], frame_id_of(response))
+        table = handle_message_from_response(response["message"], do_display_table, args)
+
+        if response["logMessage"] and table is not None:
+            write_to_log_file(table, LOG_FILE_NAME, "log", convert_to_hex=False)
+
+    elif response["result"] == "PARSE_FAIL":
+        fail_msg = f"{ANSI_RED}PARSE_FAIL{ANSI_ESCAPE}: \n" + f"{response['error']}"
+        print(fail_msg)
+
+        # If log upload AND parse fails then log again to the FAILED_UPLOADS.txt file. If no log upload do normal
+        write_to_log_file(response['message'], os.path.join(FAIL_DIRECTORY, "FAILED_UPLOADS_{}.txt".format(formatted_time)) if args.log_upload else FAIL_FILE_NAME, "fail")
+        write_to_log_file(fail_msg + '\n', os.path.join(DEBUG_DIRECTORY, "FAILED_UPLOADS_{}.txt".format(formatted_time)) if args.log_upload else DEBUG_FILE_NAME, "dbg", convert_to_hex=False)
+    elif response["result"] == "INFLUX_WRITE_FAIL":
+        fail_msg = f"{ANSI_RED}INFLUX_WRITE_FAIL{ANSI_ESCAPE}: \n" + f"{response['error']}"
+        print(f"Failed to write measurements for {response['type']} message to InfluxDB!")
+        print(response)
+
+        # If log upload AND INFLUX_WRITE_FAIL fails then log again to the FAILED_UPLOADS.txt file. If no log upload do normal
+        write_to_log_file(response['message'], os.path.join(FAIL_DIRECTORY, "FAILED_UPLOADS_{}.txt".format(formatted_time)) if args.log_upload else FAIL_FILE_NAME, "fail")
+        write_to_log_file(fail_msg + '\n', os.path.join(DEBUG_DIRECTORY, "FAILED_UPLOADS_{}.txt".format(formatted_time)) if args.log_upload else DEBUG_FILE_NAME, "dbg", convert_to_hex=False)
+    else:
+        print(f"Unexpected response: {response['result']}")
+
+def frame_id_of(response: dict):
+    """
+    Gets the CAN frame ID of an OK parse response (parsers before "frame_id" was added only
+    have it in the display table).
+    """
+    if "frame_id" in response:
+        return response["frame_id"]
+    hex_ids = response["message"]["COL"].get("Hex_ID")
+    return int(hex_ids[0], 16) if hex_ids else None
+
+
+def handle_message_from_response(display_dict, do_display_table, args):
     global num_processed_msgs
     num_processed_msgs += 1                             # A call back is received so our request was processed
     
+    # display_dict is None when the caller skipped building it (no table can be shown)
+    if display_dict is None:
+        return None
+
     table = None
-    do_display_table = _filter_stream(display_dict, display_filters)
-    if args.log is not None or do_display_table:
+    if do_display_table:
         # Create a table
         table = BeautifulTable()
 
@@ -497,11 +645,13 @@ Parameters:
     parser_endpoint - the endpoint to send the data to
 Returns: None
 """
-def sendToParser(message: str, live_filters: list, log_filters: list, display_filters: list, args: list, parser_endpoint: str):
+def sendToParser(message: bytes, live_filters: list, log_filters: list, display_filters: list, args: list, parser_endpoint: str):
         payload = {
-            "message" : message,
+            "message" : bytes(message).decode('latin-1'),   # JSON can only carry text
             "live_filters" : live_filters,
             "log_filters" : log_filters,
+            "display_filters" : display_filters,
+            "response_mode" : "ack",                        # only send back what we display or log
         }
     
         # submit to thread pool
@@ -512,49 +662,107 @@ def sendToParser(message: str, live_filters: list, log_filters: list, display_fi
         future.add_done_callback(lambda future: process_response(future, args, display_filters))
 
 
-def upload_logs(args, live_filters, log_filters, display_filters, csv_file_f):
-    # Call the memorator log uploader function
-    if args.mac:
-        raise RuntimeError(
-            "--log-upload option is not supported on macOS because it requires Kvaser Memorator/canlib workflow (not available on MacOS)"
-        )
+"""
+Purpose: Queues a frame for a bulk parse request (--bulk). Frames are sent in one request to the
+         parser's bulk endpoint once --bulk frames are queued or the oldest queued frame is
+         BULK_MAX_DELAY_S old (see bulk_flush_timer), instead of one HTTP request per frame
+Parameters: 
+    Same as sendToParser
+Returns: None
+"""
+# reentrant: sigint_handler flushes the buffer on the main thread, which may already hold the lock
+bulk_lock = threading.RLock()
+bulk_queued = threading.Event()     # set when a frame is queued in an empty buffer
+bulk_buffer = []
+bulk_buffer_start = 0.0
+bulk_send_args = None               # (live_filters, ..., parser_endpoint) the queued frames are sent with
+def sendToParserBulk(message: bytes, live_filters: list, log_filters: list, display_filters: list, args: list, parser_endpoint: str):
+        global bulk_buffer, bulk_buffer_start, bulk_send_args
+        with bulk_lock:
+            if not bulk_buffer:
+                bulk_buffer_start = time.time()
+                bulk_send_args = (live_filters, log_filters, display_filters, args, parser_endpoint)
+                bulk_queued.set()
+            bulk_buffer.append(bytes(message))
 
-    from tools.MemoratorUploader import memorator_upload_script
-    memorator_upload_script(create_message, live_filters, log_filters, display_filters, args, csv_file_f) 
+            if len(bulk_buffer) < args.bulk:
+                return
+
+            frames, bulk_buffer = bulk_buffer, []
+
+        send_bulk(frames, live_filters, log_filters, display_filters, args, parser_endpoint)
 
 
 """
-Purpose: Processes the message by splitting it into parts and returning the parts and the buffer
-Parameters: 
-    message - The total chunk read from the serial stream
-    buffer - the buffer to be added to the start of the message
-Returns (tuple):
-    parts - the fully complete messages of the total chunk read
-    buffer - leftover chunk that is not a message
+Purpose: Sends the frames queued by sendToParserBulk if the oldest one is at least max_age seconds old
+Parameters:
+    max_age - seconds the oldest queued frame must have waited (0 sends whatever is queued)
+Returns: the future of the bulk request, or None if nothing was sent or it went over --stream
 """
-def process_message(message: str, buffer: str = "") -> list:
-    # Remove 00 0a from the start if present
-    if message.startswith("000a"):
-        message = message[4:]
-    elif message.startswith("0a"):
-        message = message[2:]
-    
-    # Add buffer to the start of the message
-    message = buffer + message
+def flush_bulk_buffer(max_age: float = 0.0):
+        global bulk_buffer
+        with bulk_lock:
+            if not bulk_buffer or time.time() - bulk_buffer_start < max_age:
+                return None
+            frames, bulk_buffer = bulk_buffer, []
+            send_args = bulk_send_args
 
-    # Split the message by 0d 0a. TEL board sends messages ending with \r\n which is 0d0a in hex. Use as delimeter
-    parts = message.split("0d0a")
+        return send_bulk(frames, *send_args)
 
-    if len(parts[-1]) != 30 or len(parts[-1]) != 396 or len(parts[-1]) != 44:
-        buffer = parts.pop()
 
-    try:
-        parts = [part + "0d0a" for part in parts if len(part) == 30 or len(part) == 396 or len(part) == 44]
-    except ValueError as e:
-        print(f"{ANSI_RED}Failed to split message: {str([part for part in parts])}{ANSI_ESCAPE}"
-              f"    ERROR: {e}")
-        return [], buffer
-    return [bytes.fromhex(part).decode('latin-1') for part in parts] , buffer
+"""
+Sends a partly filled bulk buffer once its oldest frame is BULK_MAX_DELAY_S old, so the last frames
+of a burst do not wait for the next frame to arrive (runs on its own thread)
+"""
+def bulk_flush_timer():
+    while True:
+        bulk_queued.wait()
+        with bulk_lock:
+            if not bulk_buffer:
+                bulk_queued.clear()
+                continue
+            delay = bulk_buffer_start + BULK_MAX_DELAY_S - time.time()
+
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            flush_bulk_buffer(BULK_MAX_DELAY_S)
+
+
+"""
+Purpose: Sends frames in one bulk parse request, or one message on the open WebSocket (--stream)
+Parameters:
+    frames - the raw frames
+    Others same as sendToParser
+Returns: the future of the bulk request (None for --stream)
+"""
+def send_bulk(frames: list, live_filters: list, log_filters: list, display_filters: list, args: list, parser_endpoint: str):
+        # --stream: one message on the open WebSocket, acks arrive in process_stream_reply
+        if stream_client is not None:
+            stream_client.send(frames)
+            return None
+
+        body = pack_frames(frames)
+        params = {
+            "live_filters": ",".join(live_filters),
+            "log_filters": ",".join(log_filters),
+            "display_filters": ",".join(display_filters),
+        }
+
+        future = executor.submit(parser_bulk_request, body, params, parser_endpoint + "/bulk")
+        future.add_done_callback(lambda future: process_bulk_response(future, args, display_filters))
+        return future
+
+
+def upload_logs(args, live_filters, log_filters, display_filters, csv_file_f):
+    # Call the memorator log uploader function
+    if args.mac:
+        raise RuntimeError(
+            "--log-upload option is not supported on macOS because it requires Kvaser Memorator/canlib workflow (not available on MacOS)"
+        )
+
+    from tools.MemoratorUploader import memorator_upload_script
+    memorator_upload_script(create_message_batch, live_filters, log_filters, display_filters, args, csv_file_f) 
 
 
 """
@@ -568,6 +776,9 @@ def displaySunlinkTracking():
         # 1ms precisios
         sunlink_formatted_runtime = str(sunlink_runtime)[:-3]
         msg = f"LINK_TELEMETRY: Proccessed {num_processed_msgs} Messages in {sunlink_formatted_runtime}. Current Time: {current_formatted_time}"
+        if serial_reader is not None:
+            stats = serial_reader.stats()
+            msg += f". Serial queue: {stats['queued']} (max {stats['high_water']}), {stats['overflows']} overflows"
 
         sys.stdout.write(parameters.ANSI_SAVE_CURSOR)  # Save cursor position
         sys.stdout.write(f"{parameters.ANSI_YELLOW}{msg}{ANSI_ESCAPE}")  # Yellow text
@@ -668,12 +879,28 @@ def main():
                               help=((f"The number of parsed messages to send to InfluxDB at a time (Chunking). \
                                     Default value is {BATCH_SIZE}. Improves performance to chunk high data rates")))
     
+    source_group.add_argument("--bulk", action="store", type=int, default=0, metavar="N",
+                              help=(f"Sends up to N frames per request to the parser's bulk endpoint instead of one request per frame "
+                                    f"(a partly filled request is sent after {BULK_MAX_DELAY_S}s). Improves throughput at high data rates"))
+
+    source_group.add_argument("--stream", action="store_true",
+                              help=("Sends frames to the parser over one WebSocket connection instead of one HTTP request each. "
+                                    "Combine with --bulk N to send up to N frames per WebSocket message"))
+
     source_group.add_argument("--local", action="store_true",
                               help=((f"Will parse messages without using the parser docker container. Generally faster and useful for high data rates")))
 
     source_group.add_argument("--mac", action="store_true",
                               help=((f"Use macOS PCAN CAN bus settings instead of Linux SocketCAN settings.")))
 
+    source_group.add_argument("--watch-dbc", action="store_true",
+                              help=("Reloads the DBC file (--dbc or the default) without restarting when it changes. "
+                                    "Applies to locally parsed messages (--local, --offline, --log-upload)"))
+
+    write_group.add_argument("--deadband", action="store_true",
+                             help=("Only write a signal to InfluxDB when it changes (by more than its deadband in parser/parameters.py) "
+                                   "or has not been written for DEADBAND_MAX_SILENCE seconds. Applies to locally parsed messages (--local, --offline)"))
+
     args = parser.parse_args()
 
     # <----- Argument validation and handling ----->
@@ -691,10 +918,13 @@ def main():
     # build the correct URL to make POST request to
     if args.prod or args.offline:
         PARSER_ENDPOINT = PROD_WRITE_ENDPOINT
+        STREAM_ENDPOINT = PROD_STREAM_ENDPOINT
     elif args.debug:
         PARSER_ENDPOINT = DEBUG_WRITE_ENDPOINT
+        STREAM_ENDPOINT = DEBUG_STREAM_ENDPOINT
     else:
         PARSER_ENDPOINT = NO_WRITE_ENDPOINT
+        STREAM_ENDPOINT = NO_WRITE_STREAM_ENDPOINT
 
     # Check if logging is selected
     global LOG_FILE
@@ -716,8 +946,17 @@ def main():
     
     # <----- Change DBC file based on args ----->
     if (args.dbc):
-        parameters.DBC_FILE = Path(args.dbc)
-        parameters.CAR_DBC  = cantools.database.load_file(parameters.DBC_FILE)
+        parameters.use_dbc_file(Path(args.dbc))
+
+    # reload the DBC when it changes while parsing locally
+    if args.watch_dbc:
+        parameters.DBC_SOURCE.start_watching(parameters.DBC_POLL_INTERVAL)
+
+
+    # <----- Change detection before InfluxDB writes ----->
+    if args.deadband:
+        global deadband_filter
+        deadband_filter = DeadbandFilter(parameters.DEADBAND_DEFAULT, parameters.DEADBAND_MAX_SILENCE, parameters.DEADBAND_SIGNALS)
 
 
     # <----- Define Can Bus for Offline Mode ----->
@@ -764,6 +1003,18 @@ def main():
     global start_time
     start_time = datetime.now()
 
+    # frames over one WebSocket connection (--stream)
+    if args.stream and not args.local:
+        global stream_client
+        stream_options = {"live_filters": live_filters, "log_filters": log_filters, "display_filters": display_filters}
+        stream_client = StreamClient(STREAM_ENDPOINT, AUTH_HEADER, stream_options,
+                                     lambda reply: process_stream_reply(reply, args, display_filters))
+
+    # one request per frame or many frames per request (or WebSocket message)
+    send = sendToParserBulk if args.bulk or args.stream else sendToParser
+    if send is sendToParserBulk:
+        threading.Thread(target=bulk_flush_timer, daemon=True).start()
+
     print(f"{ANSI_GREEN}Telemetry link is up!{ANSI_ESCAPE}")
     print("Waiting for incoming messages...")
 
@@ -809,7 +1060,7 @@ def main():
 
         if args.randomList:
             try:
-                message = RandomMessage().random_message_str(args.randomList)
+                message = RandomMessage().random_message_bytes(args.randomList)
             except Exception as e:
                 print(f"Failed to generate random message: {e}")
                 continue
@@ -821,54 +1072,45 @@ def main():
             # read in bytes from CAN bus
             can_bytes = can_bus.recv()          
 
-            # partition string into pieces
-            epoch_time = time.time()                            # epoch time as float
-            timestamp_bytes = struct.pack('>d', epoch_time)
-            timestamp_str = timestamp_bytes.decode('latin-1')
-
-            id: int = can_bytes.arbitration_id                    # int
-            id_str = id.to_bytes(4, 'big').decode('latin-1')
-
-            data_bytes = can_bytes.data
-            data_pad = data_bytes.ljust(8, b'\0')
-            data_str = data_pad.decode('latin-1')                                    # string 
-
-            data_len: str = str(can_bytes.dlc)                    # string
-
-            message = timestamp_str + "#" + id_str + data_str + data_len
+            # pack into a single frame: timestamp (epoch time as float), '#', id, data (padded to 8 bytes), data length
+            data_pad = bytes(can_bytes.data).ljust(8, b'\0')
+            message = parameters.CAN_FRAME.pack(time.time(), parameters.CAN_FRAME_MARKER, can_bytes.arbitration_id, data_pad) \
+                + str(can_bytes.dlc).encode('ascii')
 
         else:
-            buffer = ""
+            global serial_framer, serial_reader
+            serial_framer = SerialFramer()
             with serial.Serial() as ser:
                 # <----- Configure COM port ----->
                 ser.baudrate = args.baudrate
                 ser.port = args.port
                 ser.open()
 
+                # the reader thread drains the port; this thread frames and sends what it read
+                serial_reader = SerialReader(ser, SERIAL_QUEUE_CHUNKS)
+                serial_reader.start()
+
                 while True:
-                    # read in bytes from COM port
-                    chunk = ser.read(CHUNK_SIZE)
-                    chunk = chunk.hex()
+                    # every chunk read from the COM port since the last time
+                    chunk = serial_reader.read()
 
                     if args.rawest:
-                        print(chunk)
-                        
-                    parts, buffer = process_message(chunk, buffer)
+                        print(chunk.hex())
 
-                    for part in parts:
+                    for part in serial_framer.feed(chunk):
                         if args.raw:
-                            print(part.encode('latin-1').hex())
+                            print(part.hex())
 
                         if (args.local):
                             handle_raw_message(part, display_filters, args)
                         else:
-                            sendToParser(part, live_filters, log_filters, display_filters, args, PARSER_ENDPOINT)
+                            send(part, live_filters, log_filters, display_filters, args, PARSER_ENDPOINT)
 
 
         if (args.local):
             handle_raw_message(message, display_filters, args)
         else:
-            sendToParser(message, live_filters, log_filters, display_filters, args, PARSER_ENDPOINT)
+            send(message, live_filters, log_filters, display_filters, args, PARSER_ENDPOINT)
 
 
 
@@ -876,25 +1118,26 @@ def main():
 def handle_raw_message(raw_message, display_filters, args):
     parsed_message = safe_create_message(raw_message)
     if (parsed_message is not None):
-        handle_message_from_response(parsed_message.data["display_data"], display_filters, args)
+        # display_data is built lazily, so only ask for it if a table could be displayed
+        do_display_table = compile_filters(display_filters).matches(parsed_message.type, parsed_message.record.frame_id)
+        display_dict = parsed_message.display_data if do_display_table else None
+        handle_message_from_response(display_dict, do_display_table, args)
         write_to_influx(parsed_message, "_test" if args.debug else "_prod", args.batch_size)
 
 def write_to_influx(parsed_message, bucket, batch_size):
-    for i in range(len(parsed_message.data[list(parsed_message.data.keys())[0]])):
-        # REQUIRED FIELDS
-        name = parsed_message.data["Measurement"][i]
-        source = parsed_message.data["Source"][i]
-        m_class = parsed_message.data["Class"][i]
-        value = parsed_message.data["Value"][i]
-        
-        timestamp = parsed_message.data.get("Timestamp", ["NA"])[i]
+    record = parsed_message.record
+    for source, m_class, name, value in record.rows():
+        # skip values that did not change (--deadband, see parser/deadband.py)
+        if deadband_filter is not None and not deadband_filter.should_emit(source, m_class, name, value, record.timestamp):
+            continue
 
+        # REQUIRED FIELDS
         point = influxdb_client.Point(source).tag("car", CAR_NAME).tag(
             "class", m_class).field(name, value)
         
         
-        if timestamp != "NA":
-            point.time(int(timestamp * 1e9))
+        if record.timestamp is not None:
+            point.time(int(record.timestamp * 1e9))
         
         global batch_to_write
         batch_to_write.append(point)
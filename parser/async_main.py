@@ -0,0 +1,156 @@
+import asyncio
+import json
+import time
+import msgpack
+
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from parser.bulk_frames import wants_msgpack, BULK_MSGPACK_TYPE
+from parser.main import (API_PREFIX, METRICS_CONTENT_TYPE, STAGE_SECONDS, health_monitor, influx_writer,
+                         parse_bulk_body, parse_json_body, render_metrics, stream_frames, tokens)
+from parser.stream_ingest import StreamSession, STREAM_PATH
+
+"""
+Asyncio server mode of the parser: the same /api/v1 routes and bearer token auth as parser/main.py,
+served by aiohttp on one event loop instead of a thread per request.
+
+Parsing is shared with the Flask app (parse_json_body/parse_bulk_body). It never waits on the
+network: measurements are handed to the batching InfluxDB writer and the Grafana stream queue, which
+are written by their own background threads (see parser/influx_writer.py and write_measurements in
+parser/main.py). The health check serves the results of the background probes (see parser/health.py).
+
+Parsing a body (up to client_max_size) still takes CPU time, so it runs on a small thread pool
+(PARSE_THREADS) rather than on the event loop: the loop keeps serving other connections, the health
+check, metrics and WebSocket heartbeats while a large batch is parsed.
+
+Run from the project root (paths are relative to it):
+    python -m parser.async_main [--host 0.0.0.0] [--port 5000]
+"""
+
+# threads parsing request bodies off the event loop (bounded: parsing holds the GIL, so more threads
+# would only queue more work in memory)
+PARSE_THREADS = 4
+
+PARSE_EXECUTOR = web.AppKey("parse_executor", ThreadPoolExecutor)
+
+# <----- Authentication ----->
+
+@web.middleware
+async def bearer_auth(request: web.Request, handler):
+    if request.path.startswith(API_PREFIX):
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or token not in tokens:
+            return web.Response(status=401, text="Unauthorized Access")
+    return await handler(request)
+
+
+def send_response(request: web.Request, body: dict, status: int = 200) -> web.Response:
+    if wants_msgpack(request.headers.get("Accept", "")):
+        return web.Response(body=msgpack.packb(body), status=status, content_type=BULK_MSGPACK_TYPE)
+    return web.json_response(body, status=status)
+
+
+"""
+Runs a parse call on the parse thread pool so the event loop is not blocked
+
+Parameters:
+    request: the request being handled (its app owns the pool)
+    parse: the function to call
+    args: its arguments
+
+Returns:
+    what parse returns
+"""
+async def run_parse(request: web.Request, parse, *args):
+    return await asyncio.get_running_loop().run_in_executor(request.app[PARSE_EXECUTOR], parse, *args)
+
+
+# <----- Routes ----->
+
+routes = web.RouteTableDef()
+
+@routes.get("/")
+async def welcome(request: web.Request):
+    return web.Response(text="Welcome to UBC Solar's Telemetry Parser!\n")
+
+
+@routes.get(f"{API_PREFIX}/health")
+async def check_health(request: web.Request):
+    return web.json_response({"services": health_monitor.services()})
+
+
+@routes.get(f"{API_PREFIX}/metrics")
+async def get_metrics(request: web.Request):
+    return web.Response(body=render_metrics().encode(), headers={"Content-Type": METRICS_CONTENT_TYPE})
+
+
+def parse_json_request(body: bytes, bucket):
+    start = time.perf_counter()
+    try:
+        parse_request = json.loads(body)
+    except json.JSONDecodeError:
+        return {"error": "Request body is not JSON"}, 400
+    STAGE_SECONDS.observe(time.perf_counter() - start, "request_decode")
+    return parse_json_body(parse_request, bucket), 200
+
+
+def json_parse_route(bucket):
+    async def handler(request: web.Request):
+        body, status = await run_parse(request, parse_json_request, await request.read(), bucket)
+        return send_response(request, body, status)
+    return handler
+
+
+def bulk_parse_route(bucket):
+    async def handler(request: web.Request):
+        body, status = await run_parse(request, parse_bulk_body, await request.read(), request.content_type,
+                                       request.query, bucket)
+        return send_response(request, body, status)
+    return handler
+
+
+def stream_route(bucket):
+    async def handler(request: web.Request):
+        ws = web.WebSocketResponse(heartbeat=30.0)
+        await ws.prepare(request)
+
+        session = StreamSession(bucket, stream_frames)
+        async for message in ws:
+            if message.type in (web.WSMsgType.TEXT, web.WSMsgType.BINARY):
+                await ws.send_bytes(await run_parse(request, session.handle, message.data))
+        return ws
+    return handler
+
+
+for path, bucket in (("", None), ("/write/debug", "_test"), ("/write/production", "_prod")):
+    routes.post(f"{API_PREFIX}/parse{path}")(json_parse_route(bucket))
+    routes.post(f"{API_PREFIX}/parse{path}/bulk")(bulk_parse_route(bucket))
+    routes.get(f"{API_PREFIX}{STREAM_PATH}{path}")(stream_route(bucket))
+
+
+# <----- Application ----->
+
+async def on_cleanup(app: web.Application):
+    app[PARSE_EXECUTOR].shutdown(wait=False, cancel_futures=True)
+    await asyncio.get_running_loop().run_in_executor(None, influx_writer.close)
+
+
+def create_app() -> web.Application:
+    app = web.Application(middlewares=[bearer_auth], client_max_size=16 * 1024 * 1024)
+    app[PARSE_EXECUTOR] = ThreadPoolExecutor(max_workers=PARSE_THREADS, thread_name_prefix="parse")
+    app.add_routes(routes)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Asyncio server mode of the telemetry parser")
+    arg_parser.add_argument("--host", default="0.0.0.0")
+    arg_parser.add_argument("--port", type=int, default=5000)
+    args = arg_parser.parse_args()
+
+    web.run_app(create_app(), host=args.host, port=args.port)
@@ -0,0 +1,153 @@
+import struct
+import msgpack
+from typing import Dict, List, Tuple
+
+
+"""
+Wire format of the parser's bulk endpoints (/api/v1/parse/bulk, /api/v1/parse/write/<debug|production>/bulk).
+One request carries many raw frames in either of two bodies:
+
+    application/octet-stream    frames back to back, each prefixed by its length as a big endian uint16.
+                                Options (Ex. live_filters=CAN,0x401) are passed as query parameters
+    application/msgpack         a map {"frames": [bin, ...], "<option>": ...} or just the array of frames
+"""
+
+BULK_CONTENT_TYPE       = "application/octet-stream"
+BULK_MSGPACK_TYPE       = "application/msgpack"
+
+FRAME_LENGTH_PREFIX     = struct.Struct(">H")
+MAX_FRAME_LENGTH        = 0xFFFF
+
+# options whose query parameter value is a comma separated list
+LIST_OPTIONS            = ("live_filters", "log_filters", "display_filters")
+
+
+"""
+Packs raw frames into a length prefixed body
+
+Parameters:
+    frames: raw frames as bytes-like data
+
+Returns:
+    bytes - the request body
+"""
+def pack_frames(frames) -> bytes:
+    parts = []
+    for frame in frames:
+        if len(frame) > MAX_FRAME_LENGTH:
+            raise ValueError(f"Frame of {len(frame)} bytes is too long for a bulk request")
+        parts.append(FRAME_LENGTH_PREFIX.pack(len(frame)))
+        parts.append(bytes(frame))
+    return b"".join(parts)
+
+
+"""
+Splits a length prefixed body into frames without copying them
+
+Parameters:
+    body: the request body
+
+Returns:
+    list of memoryview slices of body, one per frame
+"""
+def unpack_frames(body: bytes) -> List[memoryview]:
+    view = memoryview(body)
+    frames = []
+    offset = 0
+    while offset < len(view):
+        if offset + FRAME_LENGTH_PREFIX.size > len(view):
+            raise ValueError(f"Bulk body ends inside the length prefix at byte {offset}")
+        (length,) = FRAME_LENGTH_PREFIX.unpack_from(view, offset)
+        offset += FRAME_LENGTH_PREFIX.size
+        if offset + length > len(view):
+            raise ValueError(f"Bulk body ends inside a {length} byte frame at byte {offset}")
+        frames.append(view[offset:offset + length])
+        offset += length
+    return frames
+
+
+"""
+Checks the list options (filters) of a bulk request or stream that came as structured data
+(msgpack or JSON), which cannot be trusted to hold lists of strings
+
+Parameters:
+    options: dict of options
+
+Returns:
+    None
+
+Raises:
+    ValueError if a list option is not a list of strings
+"""
+def check_list_options(options: Dict) -> None:
+    for key in LIST_OPTIONS:
+        if key in options:
+            value = options[key]
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                raise ValueError(f"{key} must be a list of strings")
+
+
+"""
+Reads the frames and options of a bulk request
+
+Parameters:
+    body: the request body
+    content_type: mimetype of the body (BULK_CONTENT_TYPE or BULK_MSGPACK_TYPE)
+    query: query parameters of the request (options of octet-stream bodies)
+
+Returns:
+    (frames, options) - list of raw frames and dict of options (Ex. "live_filters" -> ["CAN"])
+
+Raises:
+    ValueError if the body or its options are malformed
+"""
+def decode_bulk_body(body: bytes, content_type: str, query) -> Tuple[list, Dict]:
+    if content_type == BULK_MSGPACK_TYPE:
+        try:
+            unpacked = msgpack.unpackb(body, raw=False)
+        except Exception as e:
+            raise ValueError(f"Invalid msgpack body: {e}")
+
+        if isinstance(unpacked, dict):
+            frames = unpacked.pop("frames", [])
+            options = unpacked
+        else:
+            frames, options = unpacked, {}
+
+        if not isinstance(frames, list) or not all(isinstance(frame, bytes) for frame in frames):
+            raise ValueError("msgpack body must hold an array of bin frames")
+        check_list_options(options)
+        return frames, options
+
+    if content_type == BULK_CONTENT_TYPE:
+        options = {}
+        for key, value in query.items():
+            options[key] = value.split(",") if key in LIST_OPTIONS else value
+        return unpack_frames(body), options
+
+    raise ValueError(f"Unsupported bulk content type \"{content_type}\" (use {BULK_CONTENT_TYPE} or {BULK_MSGPACK_TYPE})")
+
+
+"""
+Checks if a client prefers msgpack responses
+
+Parameters:
+    accept: the request's Accept header (Ex. "application/msgpack, application/json;q=0.5")
+
+Returns:
+    True if application/msgpack has the highest quality of the accepted types
+"""
+def wants_msgpack(accept: str) -> bool:
+    best_type, best_quality = None, 0.0
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > best_quality:
+            best_type, best_quality = media_type, quality
+    return best_type == BULK_MSGPACK_TYPE
@@ -0,0 +1,516 @@
+import numpy as np
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+# Every radio/cellular CAN frame carries an 8 byte (zero padded) payload
+CAN_PAYLOAD_BYTES   = 8
+
+# Set in the frame key of extended frames (like SocketCAN's CAN_EFF_FLAG), so that a standard and
+# an extended ID with the same number find their own DBC message (see DecoderTable.get_key)
+EXTENDED_ID_FLAG    = 1 << 31
+
+
+"""
+Precompiled decoder for a single CAN frame ID. Everything that CAN.extract_measurements
+needs to know about a DBC message (the message itself, the board that sends it, its class name
+and its signals) is resolved once when the decoder is built, so decoding a payload is a single call
+with no database lookups.
+
+Fields:
+    message: cantools message object from the DBC
+    frame_id: integer frame ID of the message
+    hex_id: frame ID formatted like "0x1A2" (matches the Hex_ID display column)
+    source: the board which sends the message ("UNKNOWN" if the DBC lists no sender)
+    name: the class of the message (Ex. VoltageSensorsData)
+    signal_names: tuple of all signal names in the message
+    schemas: decoded signal names -> FrameSchema of the parsed frames (filled by CAN.extract_measurements)
+"""
+class FrameDecoder:
+    __slots__ = ("message", "frame_id", "hex_id", "source", "name", "signal_names", "schemas", "_decode", "_plan")
+
+    def __init__(self, message) -> None:
+        self.message = message
+        self.frame_id: int = message.frame_id
+        self.hex_id: str = "0x" + format(message.frame_id, "X")
+
+        senders = message.senders
+        self.source: str = senders[0] if len(senders) > 0 else "UNKNOWN"
+
+        self.name: str = message.name
+        self.signal_names: Tuple[str, ...] = tuple(signal.name for signal in message.signals)
+        self.schemas: dict = {}
+        self._decode = message.decode
+        self._plan: Optional[List[SignalExtractor]] = None
+
+
+    """
+    Decodes the payload of a frame with this decoder's ID
+
+    Parameters:
+        data_bytes - the data of the message as bytes or a bytearray
+
+    Returns:
+        dict - signal name -> decoded value
+    """
+    def decode(self, data_bytes) -> dict:
+        return self._decode(data_bytes)
+
+
+    """
+    Decodes many payloads of this frame ID at once. Every signal is pulled out of the whole group
+    with a single vectorized shift/mask so there is no per-frame Python work.
+
+    Parameters:
+        payloads - (N, 8) uint8 array of zero padded payloads
+        decode_choices - replace values that have a name in the DBC (VAL_) by the name, as cantools does
+
+    Returns:
+        (columns, present)
+            columns - signal name -> array of N decoded values
+            present - signal name -> boolean mask of the rows in which a multiplexed signal was sent
+                      (only multiplexed signals appear here; every other signal is present in all rows)
+    """
+    def decode_columns(self, payloads: np.ndarray,
+                       decode_choices: bool = False) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        if self._plan is None:
+            self._plan = [SignalExtractor(signal) for signal in self.message.signals]
+
+        payloads = np.ascontiguousarray(payloads, dtype=np.uint8)
+        words = {
+            "little_endian": payloads.view("<u8").ravel().astype(np.uint64),
+            "big_endian": payloads.view(">u8").ravel().astype(np.uint64),
+        }
+
+        raws = {extractor.name: extractor.extract_raw(words) for extractor in self._plan}
+
+        columns = {}
+        present = {}
+        for extractor in self._plan:
+            columns[extractor.name] = extractor.to_value(raws[extractor.name])
+            if decode_choices and extractor.choices:
+                columns[extractor.name] = extractor.to_choice(raws[extractor.name], columns[extractor.name])
+            if extractor.multiplexer_signal is not None:
+                mask = np.isin(raws[extractor.multiplexer_signal], extractor.multiplexer_ids)
+                if extractor.multiplexer_signal in present:
+                    mask &= present[extractor.multiplexer_signal]
+                present[extractor.name] = mask
+
+        return columns, present
+
+
+"""
+Bit-level description of one DBC signal, precomputed so that the raw value can be extracted from
+a column of 64 bit payload words with one shift and one mask.
+
+cantools numbers little endian (Intel) signals from the LSB of the little endian payload word and
+big endian (Motorola) signals by their MSB in sawtooth order, so both are converted here into a
+right shift on the matching 64 bit word.
+"""
+class SignalExtractor:
+    __slots__ = ("name", "byte_order", "shift", "mask", "length", "is_signed", "is_float",
+                 "scale", "offset", "multiplexer_signal", "multiplexer_ids", "choices")
+
+    def __init__(self, signal) -> None:
+        self.name: str = signal.name
+        self.byte_order: str = signal.byte_order
+        self.length: int = signal.length
+
+        if signal.byte_order == "little_endian":
+            shift = signal.start
+        else:
+            msb_position = (signal.start // 8) * 8 + (7 - signal.start % 8)
+            shift = CAN_PAYLOAD_BYTES * 8 - msb_position - signal.length
+
+        self.shift = np.uint64(shift)
+        self.mask = np.uint64((1 << signal.length) - 1)
+        self.is_signed: bool = signal.is_signed
+        self.is_float: bool = signal.is_float
+        self.scale = signal.scale
+        self.offset = signal.offset
+        self.multiplexer_signal: Optional[str] = signal.multiplexer_signal
+        self.multiplexer_ids: List[int] = list(signal.multiplexer_ids or [])
+        self.choices: Dict[int, str] = {int(raw): str(name) for raw, name in (signal.choices or {}).items()}
+
+
+    """
+    Pulls the unscaled bits of the signal out of every payload word
+
+    Parameters:
+        words - byte order -> (N,) uint64 payload words
+
+    Returns:
+        (N,) uint64 array of raw signal bits
+    """
+    def extract_raw(self, words: Dict[str, np.ndarray]) -> np.ndarray:
+        return (words[self.byte_order] >> self.shift) & self.mask
+
+
+    """
+    Converts raw signal bits to physical values (sign, IEEE float and scale/offset as cantools does)
+
+    Parameters:
+        raw - (N,) uint64 array from extract_raw
+
+    Returns:
+        (N,) int64 or float64 array of decoded values
+    """
+    def to_value(self, raw: np.ndarray) -> np.ndarray:
+        value = self.to_unscaled(raw)
+
+        if self.scale == 1 and self.offset == 0:
+            return value
+        if isinstance(self.scale, int) and isinstance(self.offset, int) and not self.is_float:
+            return value * self.scale + self.offset
+        return value * float(self.scale) + float(self.offset)
+
+
+    """
+    Converts raw signal bits to unscaled values (sign and IEEE float), which DBC choices are keyed on
+
+    Parameters:
+        raw - (N,) uint64 array from extract_raw
+
+    Returns:
+        (N,) int64 or float64 array of unscaled values
+    """
+    def to_unscaled(self, raw: np.ndarray) -> np.ndarray:
+        if self.is_float:
+            if self.length == 32:
+                # signalling NaN payloads are expected in random/garbage frames, keep them quiet
+                with np.errstate(invalid="ignore"):
+                    return raw.astype(np.uint32).view(np.float32).astype(np.float64)
+            return raw.view(np.float64)
+        if self.is_signed:
+            value = raw.view(np.int64)
+            if self.length < 64:
+                sign_bit = 1 << (self.length - 1)
+                value = (value ^ sign_bit) - sign_bit
+            return value
+        return raw.astype(np.int64)
+
+
+    """
+    Replaces the values that have a name in the DBC (VAL_ choices) by the name
+
+    Parameters:
+        raw - (N,) uint64 array from extract_raw
+        values - (N,) decoded values from to_value
+
+    Returns:
+        (N,) object array of choice names and the values without one
+    """
+    def to_choice(self, raw: np.ndarray, values: np.ndarray) -> np.ndarray:
+        unscaled = self.to_unscaled(raw)
+        named = values.astype(object)
+        for raw_value, name in self.choices.items():
+            named[unscaled == raw_value] = name
+        return named
+
+
+"""
+Columnar decode result for all frames of one ID in a batch.
+
+Fields:
+    decoder: FrameDecoder of the frame ID (gives source, class name and hex id)
+    indices: (M,) positions of these frames in the original batch
+    timestamps: (M,) float64 timestamps of the frames
+    columns: signal name -> (M,) array of decoded values
+    present: signal name -> (M,) boolean mask, only for multiplexed signals
+"""
+class CanColumns:
+    __slots__ = ("decoder", "indices", "timestamps", "columns", "present")
+
+    def __init__(self, decoder: FrameDecoder, indices: np.ndarray, timestamps: np.ndarray,
+                 columns: Dict[str, np.ndarray], present: Dict[str, np.ndarray]) -> None:
+        self.decoder = decoder
+        self.indices = indices
+        self.timestamps = timestamps
+        self.columns = columns
+        self.present = present
+
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+    """
+    Iterates over each signal column with multiplexed rows that were not sent removed
+
+    Parameters:
+        None
+
+    Returns:
+        generator of (signal name, timestamps, values) with matching array lengths
+    """
+    def signals(self):
+        for name, values in self.columns.items():
+            mask = self.present.get(name)
+            if mask is None:
+                yield name, self.timestamps, values
+            else:
+                yield name, self.timestamps[mask], values[mask]
+
+
+"""
+Result of DecoderTable.decode_batch.
+
+Fields:
+    groups: frame ID (frame key when decoded with extended flags) -> CanColumns for every known ID in the batch
+    unknown: positions (in the original batch) of frames whose ID is not in the DBC
+    truncated: positions of frames whose payload is shorter than the DBC message length
+"""
+class CanBatch:
+    __slots__ = ("groups", "unknown", "truncated")
+
+    def __init__(self, groups: Dict[int, CanColumns], unknown: np.ndarray, truncated: np.ndarray) -> None:
+        self.groups = groups
+        self.unknown = unknown
+        self.truncated = truncated
+
+
+    def __len__(self) -> int:
+        return sum(len(group) for group in self.groups.values())
+
+
+"""
+Bounded least recently used cache of decoded payloads keyed on (frame_id, payload bytes).
+
+Much of the car's traffic repeats byte for byte (heartbeats, status and fault frames sit at the
+same payload for minutes), so a hit skips the cantools decode entirely. Cached values are shared
+between hits and must not be mutated by callers. All operations take a lock so one cache can be
+shared by the parser's request threads.
+
+Fields:
+    capacity: maximum number of cached payloads (the least recently used one is evicted past this)
+    hits, misses, evictions: counters since the cache was created (or cleared)
+"""
+class DecodeCache:
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError(f"DecodeCache capacity must be positive, got {capacity}")
+
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    """
+    Gets a cached value and marks it as most recently used
+
+    Parameters:
+        key - (frame_id, payload bytes)
+
+    Returns:
+        the cached value or None on a miss
+    """
+    def get(self, key: Hashable) -> Optional[dict]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+
+    """
+    Adds a value, evicting the least recently used entry if the cache is full
+
+    Parameters:
+        key - (frame_id, payload bytes)
+        value - decoded signal dict
+
+    Returns:
+        None
+    """
+    def put(self, key: Hashable, value: dict) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    """
+    Snapshot of the cache counters
+
+    Parameters:
+        None
+
+    Returns:
+        dict with size, capacity, hits, misses, evictions and hit_rate (0 to 1)
+    """
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+"""
+Maps every frame ID in a DBC to a precompiled FrameDecoder. Built once per DBC
+(see parameters.get_decoder_table) and then only read, so it is safe to share between threads.
+A table built with cache_size > 0 also owns a DecodeCache used by decode(); since the cache
+belongs to the table, replacing the DBC also drops every payload decoded with the old one.
+"""
+class DecoderTable:
+    def __init__(self, dbc, cache_size: int = 0) -> None:
+        self.dbc = dbc
+        self.decoders: Dict[int, FrameDecoder] = {}
+        self.decoders_by_key: Dict[int, FrameDecoder] = {}       # frame key (see get_key) -> decoder
+        for message in dbc.messages:
+            decoder = FrameDecoder(message)
+            self.decoders[message.frame_id] = decoder
+            self.decoders_by_key[message.frame_id | (EXTENDED_ID_FLAG if message.is_extended_frame else 0)] = decoder
+        self.cache: Optional[DecodeCache] = DecodeCache(cache_size) if cache_size > 0 else None
+
+
+    """
+    Gets the decoder for a frame ID
+
+    Parameters:
+        frame_id - the integer id of the message
+
+    Returns:
+        FrameDecoder for the ID or None if the ID is not in the DBC
+    """
+    def get(self, frame_id: int) -> Optional[FrameDecoder]:
+        return self.decoders.get(frame_id)
+
+
+    """
+    Gets the decoder for a frame key: the frame ID, with EXTENDED_ID_FLAG set for extended frames.
+    The message with the same ID and frame format is preferred; when the DBC only has the other
+    format for the ID, that message is used.
+
+    Parameters:
+        key - frame ID | EXTENDED_ID_FLAG (extended frames) or the frame ID (standard frames)
+
+    Returns:
+        FrameDecoder for the key or None if the ID is not in the DBC
+    """
+    def get_key(self, key: int) -> Optional[FrameDecoder]:
+        decoder = self.decoders_by_key.get(key)
+        if decoder is None:
+            decoder = self.decoders.get(key & ~EXTENDED_ID_FLAG)
+        return decoder
+
+
+    def __contains__(self, frame_id: int) -> bool:
+        return frame_id in self.decoders
+
+
+    def __len__(self) -> int:
+        return len(self.decoders)
+
+
+    """
+    Decodes the payload of one frame, going through the decode cache when the table has one
+
+    Parameters:
+        decoder - the FrameDecoder for the frame's ID (from get)
+        data_bytes - the data of the message as bytes-like data
+
+    Returns:
+        dict - signal name -> decoded value (shared with the cache, do not mutate)
+    """
+    def decode(self, decoder: FrameDecoder, data_bytes) -> dict:
+        cache = self.cache
+        if cache is None:
+            return decoder.decode(data_bytes)
+
+        key = (decoder.frame_id, bytes(data_bytes))
+        measurements = cache.get(key)
+        if measurements is None:
+            measurements = decoder.decode(data_bytes)
+            cache.put(key, measurements)
+        return measurements
+
+
+    """
+    Decodes N raw frames at once. Frames are grouped by ID and every signal of a group is decoded in
+    one vectorized pass (see FrameDecoder.decode_columns).
+
+    Parameters:
+        timestamps - N frame timestamps (seconds since epoch)
+        frame_ids - N integer frame ids
+        payloads - N payloads (bytes-like, up to 8 bytes each) or an (N, 8) uint8 array
+        extended - N extended frame flags, or None to look frames up by ID only (see get_key)
+        decode_choices - replace values that have a name in the DBC by the name (see decode_columns)
+
+    Returns:
+        CanBatch with one CanColumns per frame ID plus the positions of unknown/truncated frames
+    """
+    def decode_batch(self, timestamps: Sequence[float], frame_ids: Sequence[int], payloads,
+                     extended: Optional[Sequence[bool]] = None, decode_choices: bool = False) -> CanBatch:
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        frame_ids = np.asarray(frame_ids, dtype=np.int64)
+        lookup = self.decoders.get
+        if extended is not None:
+            frame_ids = frame_ids | np.where(np.asarray(extended, dtype=bool), EXTENDED_ID_FLAG, 0)
+            lookup = self.get_key
+
+        if isinstance(payloads, np.ndarray):
+            matrix = np.ascontiguousarray(payloads, dtype=np.uint8).reshape(-1, CAN_PAYLOAD_BYTES)
+            lengths = np.full(len(matrix), CAN_PAYLOAD_BYTES)
+        else:
+            lengths = np.fromiter((len(payload) for payload in payloads), dtype=np.int64, count=len(payloads))
+            joined = b"".join(bytes(payload[:CAN_PAYLOAD_BYTES]).ljust(CAN_PAYLOAD_BYTES, b"\0") for payload in payloads)
+            matrix = np.frombuffer(joined, dtype=np.uint8).reshape(-1, CAN_PAYLOAD_BYTES)
+
+        if not (len(timestamps) == len(frame_ids) == len(matrix)):
+            raise ValueError(
+                f"decode_batch got {len(timestamps)} timestamps, {len(frame_ids)} ids and {len(matrix)} payloads"
+            )
+
+        groups = {}
+        unknown = []
+        truncated = []
+
+        order = np.argsort(frame_ids, kind="stable")
+        unique_ids, starts = np.unique(frame_ids[order], return_index=True)
+        for frame_id, indices in zip(unique_ids.tolist(), np.split(order, starts[1:])):
+            decoder = lookup(frame_id)
+            if decoder is None:
+                unknown.append(indices)
+                continue
+
+            short = lengths[indices] < decoder.message.length
+            if short.any():
+                truncated.append(indices[short])
+                indices = indices[~short]
+                if len(indices) == 0:
+                    continue
+
+            columns, present = decoder.decode_columns(matrix[indices], decode_choices)
+            groups[frame_id] = CanColumns(decoder, indices, timestamps[indices], columns, present)
+
+        empty = np.empty(0, dtype=np.int64)
+        return CanBatch(
+            groups,
+            np.sort(np.concatenate(unknown)) if unknown else empty,
+            np.sort(np.concatenate(truncated)) if truncated else empty,
+        )
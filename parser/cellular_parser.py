@@ -2,13 +2,16 @@
 """
 cellular_parser.py
 - gRPC server that ingests FrameBatch streams
-- Decodes CAN frames via DBC (supports standard & extended IDs)
+- Decodes CAN frames via DBC, column-wise per FrameBatch (supports standard & extended IDs)
 - Writes signal fields to InfluxDB using async batching
 - Prints lightweight live metrics
 - Logs undecodable/unknown frames to a rotating file
 
 ENV (typical):
   DBC_FILE=/app/dbc/brightside.dbc
+  DBC_CACHE_DIR=/app/dbc/.cache
+  DBC_WATCH=true|false
+  DBC_POLL_SEC=2
   INFLUX_URL=http://influxdb:8086
   INFLUX_ORG=UBC Solar
   INFLUX_BUCKET=CAN_test
@@ -21,6 +24,9 @@ ENV (typical):
   GRPC_COMPRESSION=gzip|zstd|none
   PRINT_EVERY_SEC=5
   FAIL_LOG_PATH=/app/logs/parser_failures.log
+  DEADBAND=true|false
+  DEADBAND_DEFAULT=0
+  DEADBAND_MAX_SILENCE_SEC=10
 """
 
 import os, time, sys, threading, queue
@@ -28,7 +34,7 @@ from datetime import datetime, timezone
 from concurrent import futures
 
 import grpc
-import cantools
+import numpy as np
 from influxdb_client import InfluxDBClient, Point, WriteOptions
 
 # --- Ensure stubs are importable (tools/proto on PYTHONPATH) ---
@@ -37,6 +43,8 @@ PROTO_DIR = os.path.join(BASE_DIR, "tools", "proto")
 if PROTO_DIR not in sys.path:
     sys.path.insert(0, PROTO_DIR)
 import canlink_pb2, canlink_pb2_grpc  # noqa: E402
+from parser.deadband import DeadbandFilter  # noqa: E402
+from parser.dbc_watcher import DbcSource  # noqa: E402
 
 # -----------------------------
 # Config from environment
@@ -55,24 +63,21 @@ GRPC_MAX_WORKERS  = int(os.getenv("GRPC_MAX_WORKERS", "8"))
 GRPC_COMPRESSION  = os.getenv("GRPC_COMPRESSION", "gzip").lower()
 PRINT_EVERY_SEC   = float(os.getenv("PRINT_EVERY_SEC", "5"))
 FAIL_LOG_PATH     = os.getenv("FAIL_LOG_PATH", "/app/logs/parser_failures.log")
+DBC_WATCH         = os.getenv("DBC_WATCH", "true").lower() == "true"
+DBC_POLL_SEC      = float(os.getenv("DBC_POLL_SEC", "2"))
+DEADBAND          = os.getenv("DEADBAND", "false").lower() == "true"
+DEADBAND_DEFAULT  = float(os.getenv("DEADBAND_DEFAULT", "0"))
+DEADBAND_MAX_SILENCE_SEC = float(os.getenv("DEADBAND_MAX_SILENCE_SEC", "10"))
 
 print(f"[Parser] Loading DBC: {DBC_FILE}")
-DBC = cantools.database.load_file(DBC_FILE)
-
-# Build a fast lookup that respects extended vs standard IDs.
-# Primary key: (frame_id, is_extended); Fallback: by frame_id only.
-_MSG_BY_KEY = {}
-_MSG_BY_ID  = {}
-for m in DBC.messages:
-    is_ext = bool(getattr(m, "is_extended_frame", False))
-    _MSG_BY_KEY[(m.frame_id, is_ext)] = m
-    _MSG_BY_ID[m.frame_id] = m
-
-def _lookup_msg(can_id: int, is_extended: bool):
-    msg = _MSG_BY_KEY.get((can_id, bool(is_extended)))
-    if msg is None:
-        msg = _MSG_BY_ID.get(can_id)
-    return msg
+# Compiled snapshot keyed by content hash (DBC_CACHE_DIR) with precompiled decoders for every frame ID;
+# batches are decoded column-wise (see parser/can_decoder.py). Reloaded when the file changes
+_DBC = DbcSource(DBC_FILE, log=lambda line: print(f"[Parser] {line}"))
+if DBC_WATCH:
+    _DBC.start_watching(DBC_POLL_SEC)
+
+# Optional change detection: unchanged signals are only written every DEADBAND_MAX_SILENCE_SEC
+_DEADBAND = DeadbandFilter(DEADBAND_DEFAULT, DEADBAND_MAX_SILENCE_SEC) if DEADBAND else None
 
 # -----------------------------
 # Influx async writer + metrics
@@ -84,6 +89,7 @@ metrics = {
     "decodes_ok": 0,
     "decodes_failed": 0,
     "fields_produced": 0,
+    "fields_suppressed": 0,
     "points_enqueued": 0,
     "points_ok": 0,
     "points_err": 0,
@@ -149,19 +155,25 @@ def _log_fail(can_id: int, is_ext: bool, data: bytes, why: str):
 # -----------------------------
 # Helpers
 # -----------------------------
-def _points_from(msg, vals, can_ts):
-    src = (msg.senders or ["UNKNOWN"])[0]
-    t = datetime.now(timezone.utc) if USE_NOW_TIME else datetime.fromtimestamp(can_ts, tz=timezone.utc)
-    for k, v in vals.items():
-        if isinstance(v, bool):
-            v = 1.0 if v else 0.0
-        elif not isinstance(v, (int, float)):
-            continue
-        yield (Point(src)
-               .tag("class", msg.name)
-               .field(k, float(v))
-               .field("can_timestamp", float(can_ts))
-               .time(t))
+def _points_from(columns):
+    src = columns.decoder.source
+    now = datetime.now(timezone.utc) if USE_NOW_TIME else None
+    for k, stamps, values in columns.signals():
+        if values.dtype == object:
+            # values named by DBC choices are not numbers and are not written (only the others are)
+            numeric = np.fromiter((not isinstance(v, str) for v in values), dtype=bool, count=len(values))
+            stamps, values = stamps[numeric], values[numeric].astype(np.float64)
+        if _DEADBAND is not None:
+            keep = _DEADBAND.mask(src, columns.decoder.name, k, stamps, values)
+            metrics["fields_suppressed"] += int(len(keep) - keep.sum())
+            stamps, values = stamps[keep], values[keep]
+        for can_ts, v in zip(stamps.tolist(), values.tolist()):
+            t = now if USE_NOW_TIME else datetime.fromtimestamp(can_ts, tz=timezone.utc)
+            yield (Point(src)
+                   .tag("class", columns.decoder.name)
+                   .field(k, float(v))
+                   .field("can_timestamp", float(can_ts))
+                   .time(t))
 
 def _maybe_print():
     global _last_print
@@ -177,6 +189,7 @@ def _maybe_print():
         f"unknown={metrics['unknown_ids']:7d}  "
         f"dec_ok={metrics['decodes_ok']:9d}  dec_fail={metrics['decodes_failed']:7d}  "
         f"fields={metrics['fields_produced']:9d} ({fpm:10.1f}/min)  "
+        f"suppressed={metrics['fields_suppressed']:9d}  "
         f"enq={metrics['points_enqueued']:9d}  ok={metrics['points_ok']:9d}  "
         f"retry={metrics['points_retry']:9d}  err={metrics['points_err']:9d}  "
         f"frames/min={rpm:10.1f}"
@@ -195,32 +208,37 @@ class CanIngestService(canlink_pb2_grpc.CanIngestServicer):
             # helpful batch-size visibility
             print(f"[Parser] received FrameBatch with {len(batch.frames)} frames")
 
-            points_buffer = []  # write per batch to reduce write() calls
-            for f in batch.frames:
-                local_frames += 1
-                metrics["frames_in"] += 1
+            frames = batch.frames
+            local_frames += len(frames)
+            metrics["frames_in"] += len(frames)
 
-                msg = _lookup_msg(f.can_id, f.is_extended_id)
-                if msg is None:
-                    metrics["unknown_ids"] += 1
-                    _log_fail(f.can_id, f.is_extended_id, bytes(f.data), "UNKNOWN_ID")
-                    continue
+            # decode the whole batch column-wise, one vectorized pass per frame ID
+            # (with one DBC version, even if it is reloaded meanwhile)
+            decoded = _DBC.current().decoders.decode_batch(
+                [f.timestamp for f in frames],
+                [f.can_id for f in frames],
+                [f.data for f in frames],
+                extended=[f.is_extended_id for f in frames],
+                decode_choices=True,
+            )
 
-                try:
-                    vals = msg.decode(bytes(f.data))
-                except Exception as e:
-                    metrics["decodes_failed"] += 1
-                    _log_fail(f.can_id, f.is_extended_id, bytes(f.data), f"DECODE_FAIL:{type(e).__name__}")
-                    continue
+            for i in decoded.unknown.tolist():
+                f = frames[i]
+                metrics["unknown_ids"] += 1
+                _log_fail(f.can_id, f.is_extended_id, bytes(f.data), "UNKNOWN_ID")
+
+            for i in decoded.truncated.tolist():
+                f = frames[i]
+                metrics["decodes_failed"] += 1
+                _log_fail(f.can_id, f.is_extended_id, bytes(f.data), "DECODE_FAIL:TRUNCATED")
 
-                metrics["decodes_ok"] += 1
+            metrics["decodes_ok"] += len(decoded)
 
-                produced_here = 0
-                for p in _points_from(msg, vals, f.timestamp):
-                    points_buffer.append(p)
-                    produced_here += 1
+            points_buffer = []  # write per batch to reduce write() calls
+            for columns in decoded.groups.values():
+                points_buffer.extend(_points_from(columns))
 
-                metrics["fields_produced"] += produced_here
+            metrics["fields_produced"] += len(points_buffer)
 
             # one async write per batch if we have points
             if points_buffer:
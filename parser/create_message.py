@@ -1,39 +1,64 @@
-# Types of messages
+# Types of messages. Importing them registers them with the message registry
 from parser.data_classes.CAN_Msg import CAN      # CAN message
 from parser.data_classes.IMU_Msg import IMU      # IMU message
 from parser.data_classes.GPS_Msg import GPS      # GPS message
+from parser.message_registry import message_class_for
 from parser.parameters import *     # For mins and maxes of messages
+from parser.can_decoder import CanBatch
 
 
 """
 Factory method for creating a Message object based on the message type
-To add new message types simply add a new elif statement:
+To add new message types decorate the class with register_message and import it above:
 ------------------------------------------------------
-elif len(message) == <length of message>:
-    return <Message Subclass>(message)
+@register_message("<MESSAGE_NAME>", <LENGTH_MIN>, <LENGTH_MAX>, <MARKER>, marker_offset=<OFFSET>)
+class <MESSAGE_NAME>:
 ------------------------------------------------------
 
-Decision based on LENGTH of the message (see parser/parameters.py): 
+Decision based on LENGTH of the message (see parser/parameters.py) with a single table lookup
+(see parser/message_registry.py). Markers only break ties between types that share a length.
 
 Parameters:
-    message: the message to be parsed
+    message: the raw frame to be parsed as bytes-like data (a latin-1 string is also accepted)
     
 Returns:
     a message object (CAN, GPS, IMU, etc.)
+
+Raises:
+    ParseError (see parser/parse_errors.py) if the frame can not be parsed
+"""
+def create_message(message: Frame):
+    message = as_frame(message)
+    message_class = message_class_for(message)
+    if message_class is not None:
+        return message_class(message)
+
+    error = ParseError(ParseErrorCode.INVALID_LENGTH, f"no message type has length {len(message)}")
+    raise error.attach(None, message, _describe_invalid_length)
+
+
+def _describe_invalid_length(error: ParseError) -> str:
+    return (
+        f"{ANSI_BOLD}Failed to create message in create_message{ANSI_ESCAPE}:\n"
+        f"      Message length of {len(error.frame)} is not a valid length for any message type. "
+        f"Hex Message: {error.frame.hex()}"
+    )
+    
+
+"""
+Batch counterpart of create_message for CAN frames. Decodes N raw frames into columns
+(one NumPy array per signal, grouped by frame ID) instead of N CAN objects, which is what
+bulk consumers such as the cellular parser and the Memorator log uploader want.
+
+Parameters:
+    timestamps: N frame timestamps (seconds since epoch)
+    frame_ids: N integer CAN ids
+    payloads: N payloads (bytes-like, up to 8 bytes each) or an (N, 8) uint8 array
+    decode_choices: give signal values that have a name in the DBC as the name (like create_message)
+
+Returns:
+    CanBatch (see parser/can_decoder.py): frame ID -> CanColumns plus the positions of
+    frames that have an unknown ID or a truncated payload
 """
-def create_message(message: str):
-    try:
-        if CAN_LENGTH_MIN <= len(message) <= CAN_LENGTH_MAX:
-            return CAN(message)
-        else:
-            raise ValueError(
-                f"Message length of {len(message)} is not a valid length for any message type. "
-                f"Message: {message}\n"
-                f"Hex Message: {message.encode('latin-1').hex()}"
-            )
-    except Exception as e:
-        raise Exception(
-            f"{ANSI_BOLD}Failed to create message in create_message{ANSI_ESCAPE}:\n"
-            f"      {e}"
-        )
-    
\ No newline at end of file
+def create_message_batch(timestamps, frame_ids, payloads, decode_choices: bool = False) -> CanBatch:
+    return get_decoder_table().decode_batch(timestamps, frame_ids, payloads, decode_choices=decode_choices)
@@ -1,10 +1,15 @@
 import struct
 from parser.parameters import *
+from parser.can_decoder import FrameDecoder
+from parser.message_registry import register_message
+from parser.data_classes.Message_Data import MessageData, FrameSchema, ParsedFrame
 from time import strftime, localtime
 from datetime import datetime
 
+
 """
-CAN Message data class. Data fields are:
+CAN Message data class. The parsed frame is stored compactly in self.record (a ParsedFrame whose
+FrameSchema is shared by every frame of the same ID). self.data is a dict view of it with fields:
 
 REQUIRED (INFLUX) FIELDS:
     "Source": (list) The board which the message came from
@@ -13,7 +18,7 @@ REQUIRED (INFLUX) FIELDS:
     "Value": (list) The value of the associated measurement
     "Timestamp": (list) The time the message was sent
 
-DISPLAY FIELDS:
+DISPLAY FIELDS (built lazily on first access of self.display_data or data["display_data"]):
     "display_data" : {
         "ROW": {
             "Raw Hex": (list) raw hex data of the CAN message
@@ -30,107 +35,91 @@ DISPLAY FIELDS:
 
 self.type = "CAN"
 """
+@register_message("CAN", CAN_LENGTH_MIN, CAN_LENGTH_MAX, CAN_FRAME_MARKER, marker_offset=8)
 class CAN:
     """
     CREDIT: Mihir. N for his implementation
     CHANGES:
         data field is now 8 bytes (Before: FF is sent as 2 letter Fs, now it is sent as 1 byte char with value 255)
     """
-    def __init__(self, message: str) -> None: 
-        self.message = message  
-        self.data = self.extract_measurements()
+    __slots__ = ("message", "record", "type", "_data", "_display_data")
+
+    def __init__(self, message: Frame) -> None: 
+        self.message = as_frame(message)
+        self._data = None
+        self._display_data = None
+        self.record = self.extract_measurements()
         self.type = "CAN"
 
 
     """
-    Gets the timestamp of the message as a 64 bit float
-    Parameters:
-        message_timestamp - the timestamp of the message as a latin-1 string
-    
-    Returns:
-        float - the timestamp of the message
+    Dict view of the parsed frame (see the class description). Built on first access only;
+    prefer self.record in hot paths.
     """
-    def get_timestamp(self, message_timestamp) -> float:
-        try:
-            timestamp = struct.unpack('>d', message_timestamp.encode('latin-1'))[0]
-            float_timestamp = float(timestamp)
-
-            return float_timestamp
-        except Exception as e:
-            generate_exception(e, "get_timestamp")
+    @property
+    def data(self) -> MessageData:
+        if self._data is None:
+            self._data = MessageData(self, self.record.as_dict())
+        return self._data
 
 
     """
-    Gets the hex id of the message
+    Unpacks the raw frame in one precompiled struct call (no copies or string conversions)
     
     Parameters:
-        message_id - the id of the message as a latin-1 string
+        message - the raw CAN frame as bytes-like data "TTTTTTTT#IIIIDDDDDDDDL"
     
     Returns:
-        string - the id of the message in hex
+        tuple - (timestamp as a 64 bit float, integer id, data bytes)
     """
-    def get_hex_id(self, message_id) -> str:
+    def unpack_frame(self, message):
         try:
-            identifier = int.from_bytes(message_id.encode('latin-1'), 'big')
-            hex_id = "0x" + hex(identifier)[2:].upper()
+            timestamp, marker, identifier, data_bytes = CAN_FRAME.unpack_from(message)
+        except struct.error as e:
+            raise ParseError(ParseErrorCode.MALFORMED_FRAME, f"unpack_frame: {e}")
+        if marker != CAN_FRAME_MARKER:
+            raise ParseError(ParseErrorCode.MALFORMED_FRAME, f"unpack_frame: expected {CAN_FRAME_MARKER} at message[8] but found {marker}")
+
+        return timestamp, identifier, data_bytes
+
 
-            return hex_id
-        except Exception as e:
-            generate_exception(e, "get_hex_id")
-        
-    
     """
-    Converts the message data to a bytearray
+    Try to get the precompiled decoder for the message from the DBC file
     
     Parameters:
-        message_data - the data of the message as a latin-1 string
+        identifier - the integer id of the message
+        dbc - DbcHandle of the DBC version to decode with
     
     Returns:
-        bytearray - the data of the message as a bytearray
+        FrameDecoder holding the cantools message, source, class name and signals
     """
-    def get_data_bytes(self, message_data) -> bytearray:
-        try:
-            data_bytes = bytearray(map(lambda x: ord(x), message_data))
+    def get_decoder(self, identifier, dbc) -> FrameDecoder:
+        decoder = dbc.decoders.get(identifier)
+        if decoder is None:
+            raise ParseError(ParseErrorCode.UNKNOWN_ID, f"get_decoder: no message with frame ID = {identifier} in DBC_FILE={dbc.path} (version {dbc.version})")
+        return decoder
 
-            return data_bytes   
-        except Exception as e:
-            generate_exception(e, "get_data_bytes")
 
     """
-    Try to decode the message using the DBC file
+    Try to decode the message using its precompiled decoder. Repeated payloads are served
+    from the decoder table's LRU cache (see parameters.DECODE_CACHE_SIZE)
     
     Parameters:
-        identifier - the integer id of the message
+        decoder - the FrameDecoder for the message id
         data_bytes - the data of the message as a byte array
+        dbc - DbcHandle of the DBC version to decode with
         
     Returns:
-        cantools measurements object
+        cantools measurements object (shared with the cache, do not mutate)
     """    
-    def get_measurements(self, identifier, data_bytes):
-        try:
-            measurements = CAR_DBC.decode_message(identifier, data_bytes)
-            if measurements == {}:
-                raise Exception(f"Could not decode_message on ID = {identifier} with data = {data_bytes}")
-            return measurements
-        except Exception as e:
-            generate_exception(e, "get_measurements")
-        
-
-    """
-    Try to get the message from the DBC file
-    
-    Parameters:
-        identifier - the integer id of the message
-    
-    Returns:
-        cantools message object
-    """
-    def get_message(self, identifier):
+    def get_measurements(self, decoder, data_bytes, dbc):
         try:
-            message = CAR_DBC.get_message_by_frame_id(identifier)
-            return message
+            measurements = dbc.decoders.decode(decoder, data_bytes)
         except Exception as e:
-            generate_exception(e, "get_message")
+            raise ParseError(ParseErrorCode.DECODE_FAIL, f"get_measurements: {e}")
+        if measurements == {}:
+            raise ParseError(ParseErrorCode.DECODE_FAIL, f"get_measurements: could not decode_message on ID = {decoder.frame_id} with data = {data_bytes}")
+        return measurements
 
 
     """
@@ -145,86 +134,104 @@ class CAN:
         None
         
     Returns:
-        display_data dictionary with form outlined in the class description
+        ParsedFrame of the message (self.data is its dict view)
+
+    Raises:
+        ParseError whose verbose text (see describe_failure) is only built if it is displayed
     """
-    def extract_measurements(self) -> dict:
-        timestamp = None
-        hex_id = None
+    def extract_measurements(self) -> ParsedFrame:
+        identifier = None
         data_bytes = None
-        measurements = None
-        message = None
+        decoder = None
+        dbc = get_dbc_handle()      # one DBC version for the whole decode, even if it is reloaded meanwhile
         try:      
-            timestamp = self.get_timestamp(self.message[:8])
-            hex_id = self.get_hex_id(self.message[9:13])
-            data_bytes = self.get_data_bytes(self.message[13:21])
-            measurements = self.get_measurements(int(hex_id, 16), data_bytes)
-            message = self.get_message(int(hex_id, 16))
-        except Exception as e:
-            raise Exception(
-                f"Could not extract {ANSI_BOLD}CAN{ANSI_ESCAPE} message with properties: \n"
-                f"      Message Length = {len(self.message)} \n"
-                f"      Message Hex Data = {self.message.encode('latin-1').hex()} \n\n"
-                f"      {ANSI_RED}Error{ANSI_ESCAPE}: \n"
-                f"      {e} \n"
-                f"      {ANSI_GREEN}Function Call Details (self.message[] bytes -> hex numbers):{ANSI_ESCAPE} \n"
-                f"        {ANSI_BOLD}get_timestamp( message[:8] = {self.message[:8].encode('latin-1').hex()} ){ANSI_ESCAPE}, \n"
-                f"          - Converts latin-1 arg to a 64 bit double \n"
-                f"        {ANSI_BOLD}get_hex_id( message[9:13] = {self.message[9:13].encode('latin-1').hex()} ){ANSI_ESCAPE}, \n"
-                f"          - Converts latin-1 arg to int then to hex \n"
-                f"        {ANSI_BOLD}get_data_bytes( message[13:21] = {self.message[13:21].encode('latin-1').hex()} ){ANSI_ESCAPE}, \n"
-                f"          - Converts latin-1 arg to a bytearray \n"
-                f"        {ANSI_BOLD}get_measurements( int(hex_id, 16) = {int(hex_id, 16) if hex_id else 'NOT SET'}, databytes = {data_bytes if data_bytes else 'NOT SET'} ){ANSI_ESCAPE}, \n"
-                f"          - Performs decode_message using databytes and int ID and DBC_FILE={DBC_FILE}\n"
-                f"        {ANSI_BOLD}get_message( int(hex_id, 16) = {int(hex_id, 16) if hex_id else 'NOT SET'} ){ANSI_ESCAPE} \n"
-                f"          - Gets CAN message object from DBC_FILE={DBC_FILE} \n"
-            )
+            timestamp, identifier, data_bytes = self.unpack_frame(self.message)
+            decoder = self.get_decoder(identifier, dbc)
+            measurements = self.get_measurements(decoder, data_bytes, dbc)
+        except ParseError as e:
+            raise e.attach("CAN", self.message, lambda error: self.describe_failure(error, identifier, decoder, data_bytes, dbc))
         
-        # where the data came from
-        sources: list = message.senders
-
-        source: str
-        if len(sources) == 0:
-            source = "UNKNOWN"
-        else:
-            source = sources[0]
-
-        # Initilization
-        data = {
-            "Source": [],
-            "Class": [],
-            "Measurement": [],
-            "Value": [],
-            "Timestamp": [],
-            "display_data": {  
-                "ROW": {
-                    "Raw Hex": [self.message.encode('latin-1').hex()]
-                },
-                "COL": { 
-                    "Hex_ID": [],
-                    "Source": [],
-                    "Class": [],
-                    "Measurement": [],
-                    "Value": [],
-                    "Timestamp": []
-                }
+        # one schema per frame ID (and per set of decoded signals for multiplexed messages), kept on the
+        # decoder so that the schemas of a reloaded DBC are dropped with its decoders
+        names = tuple(measurements)
+        schema = decoder.schemas.get(names)
+        if schema is None:
+            schema = FrameSchema(
+                decoder.frame_id,
+                (decoder.source,) * len(names),       # where the data came from
+                (decoder.name,) * len(names),
+                names
+            )
+            decoder.schemas[names] = schema
+
+        # DISPLAY FIELDS are built lazily (see display_data)
+        return ParsedFrame(schema, timestamp, tuple(measurements.values()))
+
+
+    """
+    Builds the verbose diagnostic text of a failed parse (see parse_errors.ParseError)
+
+    Parameters:
+        error - the ParseError raised by extract_measurements
+        identifier, decoder, data_bytes - what extract_measurements got before it failed (None if not set)
+        dbc - DbcHandle the message was decoded with
+
+    Returns:
+        multi-line ANSI formatted description of the failure
+    """
+    def describe_failure(self, error, identifier, decoder, data_bytes, dbc) -> str:
+        return (
+            f"Could not extract {ANSI_BOLD}CAN{ANSI_ESCAPE} message with properties: \n"
+            f"      Message Length = {len(self.message)} \n"
+            f"      Message Hex Data = {self.message.hex()} \n\n"
+            f"      {ANSI_RED}Error{ANSI_ESCAPE} ({error.code.name}): \n"
+            f"      {error.detail} \n"
+            f"      {ANSI_GREEN}Function Call Details (self.message[] bytes -> hex numbers):{ANSI_ESCAPE} \n"
+            f"        {ANSI_BOLD}unpack_frame( message[:8] = {self.message[:8].hex()}, message[8] = {self.message[8:9].hex()}, "
+            f"message[9:13] = {self.message[9:13].hex()}, message[13:21] = {self.message[13:21].hex()} ){ANSI_ESCAPE}, \n"
+            f"          - Unpacks a 64 bit double timestamp, '#', 32 bit int id and 8 data bytes \n"
+            f"        {ANSI_BOLD}get_decoder( identifier = {identifier if identifier is not None else 'NOT SET'} ){ANSI_ESCAPE}, \n"
+            f"          - Gets precompiled decoder for the ID from DBC_FILE={dbc.path} (version {dbc.version}) \n"
+            f"        {ANSI_BOLD}get_measurements( decoder = {decoder.name if decoder else 'NOT SET'}, databytes = {data_bytes if data_bytes else 'NOT SET'} ){ANSI_ESCAPE} \n"
+            f"          - Decodes databytes with the message's precompiled decoder \n"
+        )
+
+
+    """
+    Display fields of the message (see the class description). Built on first access only, since
+    most frames are never displayed and formatting them is a large share of the cost of a decode.
+
+    Parameters:
+        None
+
+    Returns:
+        display_data dictionary with form outlined in the class description
+    """
+    @property
+    def display_data(self) -> dict:
+        if self._display_data is None:
+            self._display_data = self.build_display_data()
+        return self._display_data
+
+
+    def build_display_data(self) -> dict:
+        record = self.record
+        schema = record.schema
+        num_rows = len(record)
+
+        # every signal of a frame shares the frame's timestamp, so format it once
+        formatted_timestamp = datetime.fromtimestamp(record.timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+        return {
+            "ROW": {
+                "Raw Hex": [self.message.hex()]
+            },
+            "COL": {
+                "Hex_ID": ["0x" + format(schema.frame_id, "X")] * num_rows,
+                "Source": list(schema.sources),
+                "Class": list(schema.classes),
+                "Measurement": list(schema.measurements),
+                "Value": list(record.values),
+                "Timestamp": [formatted_timestamp] * num_rows
             }
         }
-
-        # Now add each field to the list
-        for name, dbc_data in measurements.items():
-            # REQUIRED FIELDS
-            data["Source"].append(source)
-            data["Class"].append(message.name)
-            data["Measurement"].append(name)
-            data["Value"].append(dbc_data)
-            data["Timestamp"].append(timestamp)
-        
-            # DISPLAY FIELDS
-            data["display_data"]["COL"]["Hex_ID"].append(hex_id)
-            data["display_data"]["COL"]["Source"].append(source)
-            data["display_data"]["COL"]["Class"].append(message.name)
-            data["display_data"]["COL"]["Measurement"].append(name)
-            data["display_data"]["COL"]["Timestamp"].append(datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3])
-            data["display_data"]["COL"]["Value"].append(dbc_data)
-
-        return data
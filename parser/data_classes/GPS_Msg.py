@@ -2,15 +2,27 @@ import re
 import time
 from time import strftime, localtime
 from datetime import datetime
-from parser.parameters import ANSI_RED, ANSI_ESCAPE
+from parser.parameters import ANSI_RED, ANSI_ESCAPE, Frame, as_frame, ParseError, ParseErrorCode, GPS_LENGTH_MIN, GPS_LENGTH_MAX
+from parser.message_registry import register_message
+from parser.data_classes.Message_Data import MessageData, FrameSchema, ParsedFrame
 
 
 SECONDS_IN_DAY       = 86400
 
+# every GPS frame has the same rows
+GPS_SCHEMA = FrameSchema(
+    None,
+    ("GPS",) * 9,
+    ("Latitudes", "Latsides", "Longitudes", "Longsides", "Altitudes", "HDOPs", "Satellites_Counts", "Fixs", "Timestamps"),
+    ("Latitude", "Latside", "Longitude", "Longside", "Altitude", "HDOP", "Satellites", "Fix", "Timestamp")
+)
+
 
 """
-GPS Message data class. Assumes message parameter in constructor is a latin-1 decoded string.
-Data fields are below:
+GPS Message data class. Assumes message parameter in constructor is the raw frame as bytes-like data
+(a latin-1 string is also accepted). GPS frames are NMEA-like text so they are decoded once for the regex.
+The parsed frame is stored compactly in self.record (a ParsedFrame). self.data is a dict view of it
+with the fields below:
 
 REQUIRED (INFLUX) FIELDS:
     "Source": (list) "GPS" 
@@ -19,7 +31,7 @@ REQUIRED (INFLUX) FIELDS:
     "Value": (list) Value of the latitude, longitude, measurments.
     "Timestamp": (list) The time the message was sent
 
-DISPLAY FIELDS:
+DISPLAY FIELDS (built lazily on first access of self.display_data or data["display_data"]):
     "display_data" : {
         "ROW": {
             "Raw Hex": (list) raw hex data of the GPS message
@@ -37,14 +49,29 @@ DISPLAY FIELDS:
 
 self.type = "GPS"
 """
+@register_message("GPS", GPS_LENGTH_MIN, GPS_LENGTH_MAX)
 class GPS:
-    def __init__(self, message: str) -> None:   
+    __slots__ = ("message", "record", "type", "gps_data", "_data", "_display_data")
+
+    def __init__(self, message: Frame) -> None:   
         # Parse all data fields and set type
-        self.message = message
-        self.data = self.extract_measurements()
+        self.message = as_frame(message)
+        self._data = None
+        self._display_data = None
+        self.record = self.extract_measurements()
         self.type = "GPS"
 
 
+    """
+    Dict view of the parsed frame (see the class description). Built on first access only.
+    """
+    @property
+    def data(self) -> MessageData:
+        if self._data is None:
+            self._data = MessageData(self, self.record.as_dict())
+        return self._data
+
+
     """
     Given a GPS timestamp formatted as HHMMSS converts it to an epoch
     timestamp by getting the current day and adding on the GPS timestamp.
@@ -84,9 +111,9 @@ class GPS:
         None
         
     Returns:
-        display_data dictionary with the form outlined in the class description 
+        ParsedFrame of the message (self.data is its dict view)
     """
-    def extract_measurements(self) -> dict:
+    def extract_measurements(self) -> ParsedFrame:
         pattern = (
             r"Latitude: (?P<Latitude>-?\d+\.\d+) (?P<Latside>[NS]), "
             r"Longitude: (?P<Longitude>-?\d+\.\d+) (?P<Longside>[EW]), "
@@ -96,48 +123,74 @@ class GPS:
             r"Fix: (?P<Fix>\d+), "
             r"Time: (?P<Timestamp>\d+)"
         )
-        match = re.search(pattern, self.message)
+        match = re.search(pattern, bytes(self.message).decode('latin-1'))
         
-        data = {}
         if match:
             gps_data = match.groupdict()
 
             epochTSFloat = float(self.getEpochTS(gps_data['Timestamp']))
-            formattedTS = self.formatEpochTS(epochTSFloat)
             
             # REQUIRED FIELDS
-            data["Source"] = ["GPS"] * len(gps_data.keys())
-            data["Class"] = ["Latitudes", "Latsides", "Longitudes", "Longsides", "Altitudes", "HDOPs", "Satellites_Counts", "Fixs", "Timestamps"]
-            data["Measurement"] = ["Latitude", "Latside", "Longitude", "Longside", "Altitude", "HDOP", "Satellites", "Fix", "Timestamp"]
-            data["Value"] = []
-            data["Timestamp"] = []
-            for key in data["Measurement"]:
-                data["Value"].append(self.getType(key, gps_data[key]))
-                data["Timestamp"].append(epochTSFloat)
-
-            # DISPLAY FIELDS
-            data["display_data"] = {
-                "ROW": {
-                    "Raw Hex": [self.message.encode('latin-1').hex()]
-                },
-                "COL": {
-                    "Latitude": [gps_data['Latitude'] + " " + gps_data['Latside']],
-                    "Longitude": [gps_data['Longitude'] + " " + gps_data['Longside']],
-                    "Altitude": [gps_data['Altitude']],
-                    "HDOP": [gps_data['HDOP']],
-                    "Satellites": [gps_data['Satellites']],
-                    "Fix": [gps_data['Fix']],
-                    "Time": [formattedTS]
-                }
-            }
+            values = tuple(self.getType(key, gps_data[key]) for key in GPS_SCHEMA.measurements)
+
+            # DISPLAY FIELDS are built lazily from the matched text (see display_data)
+            self.gps_data = gps_data
         else:
-            raise Exception(
-                f"{ANSI_RED}Regex Match failed for GPS message with properties: {ANSI_ESCAPE}\n"
-                f"      Message Length = {len(self.message)} \n"
-                f"      Message Data = '{self.message}' \n"
-            )
+            error = ParseError(ParseErrorCode.NO_MATCH, "extract_measurements: regex match failed")
+            raise error.attach("GPS", self.message, self.describe_failure)
+
+        return ParsedFrame(GPS_SCHEMA, epochTSFloat, values)
+
+
+    """
+    Builds the verbose diagnostic text of a failed parse (see parse_errors.ParseError)
+
+    Parameters:
+        error - the ParseError raised by extract_measurements
 
-        return data
+    Returns:
+        multi-line ANSI formatted description of the failure
+    """
+    def describe_failure(self, error) -> str:
+        return (
+            f"{ANSI_RED}Regex Match failed for GPS message with properties: {ANSI_ESCAPE}\n"
+            f"      Message Length = {len(self.message)} \n"
+            f"      Message Data = '{bytes(self.message).decode('latin-1')}' \n"
+        )
+
+
+    """
+    Display fields of the message (see the class description). Built on first access only.
+
+    Parameters:
+        None
+
+    Returns:
+        display_data dictionary with the form outlined in the class description
+    """
+    @property
+    def display_data(self) -> dict:
+        if self._display_data is None:
+            self._display_data = self.build_display_data()
+        return self._display_data
+
+
+    def build_display_data(self) -> dict:
+        gps_data = self.gps_data
+        return {
+            "ROW": {
+                "Raw Hex": [self.message.hex()]
+            },
+            "COL": {
+                "Latitude": [gps_data['Latitude'] + " " + gps_data['Latside']],
+                "Longitude": [gps_data['Longitude'] + " " + gps_data['Longside']],
+                "Altitude": [gps_data['Altitude']],
+                "HDOP": [gps_data['HDOP']],
+                "Satellites": [gps_data['Satellites']],
+                "Fix": [gps_data['Fix']],
+                "Time": [self.formatEpochTS(self.record.timestamp)]
+            }
+        }
 
 
     """
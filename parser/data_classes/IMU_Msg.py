@@ -1,12 +1,19 @@
 import struct
 from parser.parameters import *
+from parser.message_registry import register_message
+from parser.data_classes.Message_Data import MessageData, FrameSchema, ParsedFrame
 from time import strftime, localtime
 from datetime import datetime
 
 
+# IMU id (Ex. "AX") -> FrameSchema shared by every frame with that id
+_SCHEMAS = {}
+
+
 """
-IMU Message data class. Assumes message parameter in constructor is a latin-1 decoded string.
-Data fields are below:
+IMU Message data class. Assumes message parameter in constructor is the raw frame as bytes-like data.
+The parsed frame is stored compactly in self.record (a ParsedFrame). self.data is a dict view of it
+with the fields below:
 
 REQUIRED (INFLUX) FIELDS:
     "Source": (list) "IMU"
@@ -15,7 +22,7 @@ REQUIRED (INFLUX) FIELDS:
     "Value": (list) value of the IMU message (rounded to 6 decimal places)
     "Timestamp": (list) timestamp of the IMU message 
 
-DISPLAY FIELDS DICT:
+DISPLAY FIELDS DICT (built lazily on first access of self.display_data or data["display_data"]):
     "display_data" : {
         "ROW": {
             "Raw Hex": (list) raw hex data of the IMU message
@@ -30,69 +37,63 @@ DISPLAY FIELDS DICT:
 
 self.type = "IMU"
 """
+@register_message("IMU", IMU_LENGTH_MIN, IMU_LENGTH_MAX, IMU_FRAME_MARKER, marker_offset=8)
 class IMU:
-    def __init__(self, message: str) -> None:   
+    __slots__ = ("message", "record", "type", "_data", "_display_data")
+
+    def __init__(self, message: Frame) -> None:   
         # Parse all data fields and set type
-        self.message = message
-        self.data = self.extract_measurements()
+        self.message = as_frame(message)
+        self._data = None
+        self._display_data = None
+        self.record = self.extract_measurements()
         self.type = "IMU"
 
 
     """
-    Gets the timestamp of the message as a 64 bit float
-    Parameters:
-        message_timestamp - the timestamp of the message as a latin-1 string
-    
-    Returns:
-        float - the timestamp of the message
+    Dict view of the parsed frame (see the class description). Built on first access only.
     """
-    def get_timestamp(self, message_timestamp) -> float:
-        try:
-            timestamp = struct.unpack('>d', message_timestamp.encode('latin-1'))[0]
-            float_timestamp = float(timestamp)
+    @property
+    def data(self) -> MessageData:
+        if self._data is None:
+            self._data = MessageData(self, self.record.as_dict())
+        return self._data
 
-            return float_timestamp
-        except Exception as e:
-            generate_exception(e, "get_timestamp")
-   
 
     """
-    Gets the value of the message as a float
+    Unpacks the raw frame in one precompiled struct call (no copies or string conversions)
 
     Parameters:
-        message_val - the value of the message as a latin-1 string
+        message - the raw IMU frame as bytes-like data "TTTTTTTT@IIFFFF"
     
     Returns:
-        float - the value of the message
+        tuple - (timestamp as a 64 bit float, 2 byte id, value as a float)
     """
-    def get_value(self, message_val) -> float:
+    def unpack_frame(self, message):
         try:
-            val = struct.unpack('>f', bytearray(message_val.encode('latin-1')))[0]
-            float_val = float(val)
+            timestamp, marker, message_id, value = IMU_FRAME.unpack_from(message)
+        except struct.error as e:
+            raise ParseError(ParseErrorCode.MALFORMED_FRAME, f"unpack_frame: {e}")
+        if marker != IMU_FRAME_MARKER:
+            raise ParseError(ParseErrorCode.MALFORMED_FRAME, f"unpack_frame: expected {IMU_FRAME_MARKER} at message[8] but found {marker}")
 
-            return float_val
-        except Exception as e:
-            generate_exception(e, "get_value")
+        return timestamp, message_id, value
         
     
     """
     Gets the ID of the message as a string and checks if it contains, A, G, X, Y, or Z
     
     Parameters:
-        message_id - the id of the message as a latin-1 string
+        message_id - the 2 byte id of the message
         
     Returns:
         string - the id of the message
     """
     def get_id(self, message_id):
-        try:
-            # Ensure ID[0] is one of A or G and ID[1] is one of X, Y, or Z and length 2
-            if message_id[0] not in ["A", "G"] or message_id[1] not in ["X", "Y", "Z"] and len(message_id) != 2:
-                raise Exception(f"'{message_id}' is not a valid IMU ID")
-            else:
-                return message_id
-        except Exception as e:
-            generate_exception(e, "get_id")
+        # Ensure ID[0] is one of A or G and ID[1] is one of X, Y, or Z
+        if message_id[:1] not in (b"A", b"G") or message_id[1:2] not in (b"X", b"Y", b"Z"):
+            raise ParseError(ParseErrorCode.INVALID_ID, f"get_id: '{message_id}' is not a valid IMU ID")
+        return message_id.decode('ascii')
     
 
     """
@@ -104,51 +105,78 @@ class IMU:
         None
                 
     Returns:
-        display_data dictionary with the form outlined in the class description
+        ParsedFrame of the message (self.data is its dict view)
+
+    Raises:
+        ParseError whose verbose text (see describe_failure) is only built if it is displayed
     """
-    def extract_measurements(self,) -> dict:
-        timestamp = None
-        value = None
-        id = None
+    def extract_measurements(self,) -> ParsedFrame:
         try:      
-            timestamp = self.get_timestamp(self.message[:8])
-            value = self.get_value(self.message[11:15])
-            id = self.get_id(self.message[9:11])     
-        except Exception as e:
-            raise Exception(
-                f"Could not extract {ANSI_BOLD}IMU{ANSI_ESCAPE} message with properties: \n"
-                f"      Message Length = {len(self.message)} \n"
-                f"      Message Hex Data = {self.message.encode('latin-1').hex()} \n\n"
-                f"      {ANSI_RED}Error{ANSI_ESCAPE}: \n"
-                f"      {e} \n"
-                f"      {ANSI_GREEN}Function Call Details (self.message[] bytes -> hex numbers):{ANSI_ESCAPE} \n"
-                f"        {ANSI_BOLD}get_timestamp( message[:8] = {self.message[:8].encode('latin-1').hex()} ){ANSI_ESCAPE}, \n"
-                f"          - Converts latin-1 arg to a 64 bit double \n"
-                f"        {ANSI_BOLD}get_value( message[11:] = {self.message[11:15].encode('latin-1').hex()} ){ANSI_ESCAPE},\n"
-                f"          - Converts latin-1 arg to a 32 bit float \n"
-                f"        {ANSI_BOLD}id (self.message[9:11]) = {self.message[9:11].encode('latin-1').hex()},{ANSI_ESCAPE}  \n"
-            )
-
-        data = {}
-        
+            timestamp, message_id, value = self.unpack_frame(self.message)
+            id = self.get_id(message_id)
+        except ParseError as e:
+            raise e.attach("IMU", self.message, self.describe_failure)
+
         # REQUIRED FIELDS
-        data["Source"] = ["IMU"]
-        data["Class"] = [id[0]]
-        data["Measurement"] = [id[1]]
-        data["Value"] = [round(value, 6)]
-        data["Timestamp"] = [timestamp]
-
-        # DISPLAY FIELDS
-        data["display_data"] = {
+        schema = _SCHEMAS.get(id)
+        if schema is None:
+            schema = FrameSchema(None, ("IMU",), (id[0],), (id[1],))
+            _SCHEMAS[id] = schema
+
+        # DISPLAY FIELDS are built lazily (see display_data)
+        return ParsedFrame(schema, timestamp, (round(value, 6),))
+
+
+    """
+    Builds the verbose diagnostic text of a failed parse (see parse_errors.ParseError)
+
+    Parameters:
+        error - the ParseError raised by extract_measurements
+
+    Returns:
+        multi-line ANSI formatted description of the failure
+    """
+    def describe_failure(self, error) -> str:
+        return (
+            f"Could not extract {ANSI_BOLD}IMU{ANSI_ESCAPE} message with properties: \n"
+            f"      Message Length = {len(self.message)} \n"
+            f"      Message Hex Data = {self.message.hex()} \n\n"
+            f"      {ANSI_RED}Error{ANSI_ESCAPE} ({error.code.name}): \n"
+            f"      {error.detail} \n"
+            f"      {ANSI_GREEN}Function Call Details (self.message[] bytes -> hex numbers):{ANSI_ESCAPE} \n"
+            f"        {ANSI_BOLD}unpack_frame( message[:8] = {self.message[:8].hex()}, message[8] = {self.message[8:9].hex()}, "
+            f"message[9:11] = {self.message[9:11].hex()}, message[11:15] = {self.message[11:15].hex()} ){ANSI_ESCAPE},\n"
+            f"          - Unpacks a 64 bit double timestamp, '@', 2 byte id and 32 bit float value \n"
+            f"        {ANSI_BOLD}get_id( message[9:11] = {self.message[9:11].hex()} ){ANSI_ESCAPE}  \n"
+        )
+
+
+    """
+    Display fields of the message (see the class description). Built on first access only.
+
+    Parameters:
+        None
+
+    Returns:
+        display_data dictionary with the form outlined in the class description
+    """
+    @property
+    def display_data(self) -> dict:
+        if self._display_data is None:
+            self._display_data = self.build_display_data()
+        return self._display_data
+
+
+    def build_display_data(self) -> dict:
+        record = self.record
+        return {
             "ROW": {
-                "Raw Hex": [self.message.encode('latin-1').hex()]
+                "Raw Hex": [self.message.hex()]
             },
             "COL": {
-                "Type": [id[0]],
-                "Dimension": [id[1]],
-                "Value": [round(value, 6)],
-                "Timestamp": [datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]],
+                "Type": list(record.schema.classes),
+                "Dimension": list(record.schema.measurements),
+                "Value": list(record.values),
+                "Timestamp": [datetime.fromtimestamp(record.timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]],
             }
         }
-        
-        return data
@@ -0,0 +1,110 @@
+"""
+Dictionary view of the REQUIRED (INFLUX) FIELDS of a parsed message ("Source", "Class", "Measurement",
+"Value", "Timestamp") that builds "display_data" only when it is asked for. Message classes store a
+compact ParsedFrame (below) and only build this view for callers that use message.data.
+
+Building the display table means formatting timestamps and hex dumping the raw message, which is
+wasted work for the many frames that are never displayed (--no-write, --local, cellular). The
+message class that owns the dict builds it through its display_data property, so
+    message.data["display_data"] is message.display_data
+keeps working for older callers while "display_data" is not stored as a key until then.
+(i.e. `"display_data" in message.data` and `message.data.get("display_data")` do not build it).
+"""
+class MessageData(dict):
+    __slots__ = ("_owner",)
+
+    def __init__(self, owner, fields: dict) -> None:
+        super().__init__(fields)
+        self._owner = owner
+
+
+    def __missing__(self, key):
+        if key == "display_data":
+            return self._owner.display_data
+        raise KeyError(key)
+
+
+"""
+Shared description of the rows of a parsed frame. One schema exists per frame ID (and per set of
+decoded signals for multiplexed CAN messages) and is reused by every frame with that layout, so
+the per-frame record only stores its timestamp and values.
+
+Fields:
+    frame_id: integer CAN id of the frame (None for message types without one, Ex. IMU and GPS)
+    sources: tuple of the "Source" of each row
+    classes: tuple of the "Class" of each row
+    measurements: tuple of the "Measurement" of each row
+"""
+class FrameSchema:
+    __slots__ = ("frame_id", "sources", "classes", "measurements")
+
+    def __init__(self, frame_id, sources: tuple, classes: tuple, measurements: tuple) -> None:
+        self.frame_id = frame_id
+        self.sources = sources
+        self.classes = classes
+        self.measurements = measurements
+
+
+    def __len__(self) -> int:
+        return len(self.measurements)
+
+
+"""
+Compact parsed frame: a shared FrameSchema plus the frame's timestamp and one value per row.
+Replaces the dict of five parallel lists so that queued/in-flight messages stay small.
+
+Fields:
+    schema: FrameSchema of the frame
+    timestamp: the time the message was sent (float, seconds since epoch)
+    values: tuple of the value of each row
+"""
+class ParsedFrame:
+    __slots__ = ("schema", "timestamp", "values")
+
+    def __init__(self, schema: FrameSchema, timestamp: float, values: tuple) -> None:
+        self.schema = schema
+        self.timestamp = timestamp
+        self.values = values
+
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+    @property
+    def frame_id(self):
+        return self.schema.frame_id
+
+
+    """
+    Iterates over the rows of the frame
+
+    Parameters:
+        None
+
+    Returns:
+        generator of (source, class, measurement, value) tuples
+    """
+    def rows(self):
+        schema = self.schema
+        return zip(schema.sources, schema.classes, schema.measurements, self.values)
+
+
+    """
+    Builds the dict-of-lists view of the REQUIRED (INFLUX) FIELDS
+
+    Parameters:
+        None
+
+    Returns:
+        dict with "Source", "Class", "Measurement", "Value" and "Timestamp" lists
+    """
+    def as_dict(self) -> dict:
+        schema = self.schema
+        return {
+            "Source": list(schema.sources),
+            "Class": list(schema.classes),
+            "Measurement": list(schema.measurements),
+            "Value": list(self.values),
+            "Timestamp": [self.timestamp] * len(self.values)
+        }
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import cantools
+from pathlib import Path
+from typing import Optional, Union
+
+
+"""
+Compiled DBC cache. Parsing the DBC text with cantools is the slowest part of starting the parser,
+the cellular parser and link_telemetry, so the parsed database is pickled next to the DBC (in
+DBC_CACHE_DIR, default <dbc folder>/.cache) and loaded from there on the next start.
+
+A snapshot is keyed by the sha256 of the DBC file's contents plus the cantools and Python versions,
+so editing the DBC (or upgrading cantools) automatically rebuilds it. Snapshots are written to a
+temporary file and renamed into place, so processes starting at the same time never read a partial
+one. If the cache folder is not writable the DBC is simply parsed every time.
+"""
+
+CACHE_DIR_ENV = "DBC_CACHE_DIR"
+
+_KEY_SUFFIX = f"cantools{cantools.__version__}-py{sys.version_info[0]}{sys.version_info[1]}"
+
+# database formats cantools can parse from a string; like cantools.database.load_file, the format is
+# taken from the file extension (other extensions are auto-detected) and DBC/SYM files are cp1252
+_DATABASE_FORMATS = ("arxml", "dbc", "kcd", "sym", "cdd")
+_CP1252_FORMATS = ("dbc", "sym")
+
+
+"""
+Gets the hash that identifies the contents of a DBC file
+
+Parameters:
+    dbc_bytes: contents of the DBC file
+
+Returns:
+    str - hex sha256 of the contents
+"""
+def dbc_hash(dbc_bytes: bytes) -> str:
+    return hashlib.sha256(dbc_bytes).hexdigest()
+
+
+"""
+Gets the folder snapshots of a DBC are stored in
+
+Parameters:
+    dbc_file: path of the DBC file
+
+Returns:
+    Path of the cache folder (not created here)
+"""
+def cache_dir_for(dbc_file: Path) -> Path:
+    cache_dir = os.getenv(CACHE_DIR_ENV)
+    if cache_dir:
+        return Path(cache_dir)
+    return Path(dbc_file).parent / ".cache"
+
+
+"""
+Loads a DBC file, from its compiled snapshot when one exists for the file's current contents
+
+Parameters:
+    dbc_file: path of the DBC file
+    cache_dir: folder of the snapshots (default: see cache_dir_for)
+
+Returns:
+    cantools Database of the DBC
+"""
+def load_dbc(dbc_file: Union[str, Path], cache_dir: Optional[Path] = None):
+    dbc_file = Path(dbc_file)
+    return load_dbc_contents(dbc_file.read_bytes(), dbc_file, cache_dir)
+
+
+"""
+Loads DBC contents that were already read (so the caller can hash exactly what was loaded)
+
+Parameters:
+    dbc_bytes: contents of the DBC file
+    dbc_file: path the contents came from (names the snapshot)
+    cache_dir: folder of the snapshots (default: see cache_dir_for)
+
+Returns:
+    cantools Database of the DBC
+"""
+def load_dbc_contents(dbc_bytes: bytes, dbc_file: Union[str, Path], cache_dir: Optional[Path] = None):
+    dbc_file = Path(dbc_file)
+    cache_dir = Path(cache_dir) if cache_dir is not None else cache_dir_for(dbc_file)
+    snapshot = cache_dir / f"{dbc_file.stem}.{dbc_hash(dbc_bytes)[:32]}.{_KEY_SUFFIX}.pickle"
+
+    try:
+        with open(snapshot, "rb") as snapshot_file:
+            return pickle.load(snapshot_file)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        # corrupt or incompatible snapshot: rebuild it below
+        print(f"Ignoring unreadable DBC cache \"{snapshot}\": {e}")
+
+    database_format = dbc_file.suffix[1:].lower()
+    if database_format not in _DATABASE_FORMATS:
+        database_format = None
+    encoding = "cp1252" if database_format in _CP1252_FORMATS else "utf-8"
+    database = cantools.database.load_string(dbc_bytes.decode(encoding, errors="replace"),
+                                             database_format=database_format)
+    _write_snapshot(database, snapshot, dbc_file.stem)
+    return database
+
+
+"""
+Atomically writes a snapshot and removes older snapshots of the same DBC (only the ones written
+with this cantools and Python version; other versions sharing the folder keep theirs)
+
+Parameters:
+    database: parsed cantools Database
+    snapshot: path to write the snapshot to
+    stem: DBC file name without extension (prefix of its snapshots)
+
+Returns:
+    None
+"""
+def _write_snapshot(database, snapshot: Path, stem: str) -> None:
+    try:
+        snapshot.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=snapshot.parent, prefix=f".{stem}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                pickle.dump(database, temp_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, snapshot)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        for old in snapshot.parent.glob(f"{stem}.*.{_KEY_SUFFIX}.pickle"):
+            if old != snapshot:
+                old.unlink(missing_ok=True)
+    except OSError as e:
+        print(f"Unable to write DBC cache \"{snapshot}\": {e}")
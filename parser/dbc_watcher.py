@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Union
+
+from parser.can_decoder import DecoderTable
+from parser.dbc_cache import dbc_hash, load_dbc_contents
+
+
+"""
+One compiled version of a DBC: the cantools database plus its decoder table. Handles are never
+modified, so a decode that grabbed a handle keeps using a consistent DBC and decoder set even if a
+newer version is swapped in halfway through.
+
+Fields:
+    version: increases by one every time a changed DBC is swapped in (starts at 1)
+    path: the DBC file
+    content_hash: sha256 of the DBC contents
+    dbc: cantools Database
+    decoders: DecoderTable built from dbc
+    loaded_at: time.time() of the load
+"""
+class DbcHandle:
+    __slots__ = ("version", "path", "content_hash", "dbc", "decoders", "loaded_at")
+
+    def __init__(self, version: int, path: Path, content_hash: str, dbc, decoders: DecoderTable) -> None:
+        self.version = version
+        self.path = path
+        self.content_hash = content_hash
+        self.dbc = dbc
+        self.decoders = decoders
+        self.loaded_at = time.time()
+
+
+"""
+Watched DBC file. current() always returns the latest DbcHandle; reload() (called by the watch
+thread every poll_interval seconds, or by hand) compiles the DBC again when the file changed and
+swaps the new handle in with a single assignment, so ingest never waits for a reload.
+
+A DBC that fails to load (Ex. a half-saved file) is reported and the previous version keeps being
+used until the file changes again.
+"""
+class DbcSource:
+    def __init__(self, path: Union[str, Path], cache_size: int = 0,
+                 log: Callable[[str], None] = print) -> None:
+        self.cache_size = cache_size
+        self.log = log
+        self._listeners: List[Callable[[DbcHandle], None]] = []
+        self._reload_lock = threading.Lock()
+        self._watch_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self.path = Path(path)
+        self._stat = self._stat_of(self.path)
+        self._handle = self._compile(self.path, version=1)
+
+
+    def current(self) -> DbcHandle:
+        return self._handle
+
+
+    """
+    Registers a function called with the new DbcHandle after every swap
+
+    Parameters:
+        listener - function taking a DbcHandle
+
+    Returns:
+        None
+    """
+    def add_listener(self, listener: Callable[[DbcHandle], None]) -> None:
+        self._listeners.append(listener)
+
+
+    """
+    Compiles the DBC again if the file changed since the last load
+
+    Parameters:
+        None
+
+    Returns:
+        True if a new version was swapped in
+    """
+    def reload(self) -> bool:
+        with self._reload_lock:
+            stat = self._stat_of(self.path)
+            if stat is None or stat == self._stat:
+                return False
+            self._stat = stat
+
+            try:
+                dbc_bytes = self.path.read_bytes()
+                if dbc_hash(dbc_bytes) == self._handle.content_hash:
+                    return False
+                handle = self._compile(self.path, self._handle.version + 1, dbc_bytes)
+            except Exception as e:
+                self.log(f"Unable to reload DBC \"{self.path}\", keeping version {self._handle.version}: {e}")
+                return False
+
+            self._swap(handle)
+            return True
+
+
+    """
+    Switches to a different DBC file (Ex. link_telemetry's --dbc option)
+
+    Parameters:
+        path - the new DBC file
+
+    Returns:
+        the new DbcHandle
+    """
+    def switch(self, path: Union[str, Path]) -> DbcHandle:
+        with self._reload_lock:
+            path = Path(path)
+            handle = self._compile(path, self._handle.version + 1)
+            self.path = path
+            self._stat = self._stat_of(path)
+            self._swap(handle)
+            return handle
+
+
+    """
+    Starts a daemon thread that calls reload every poll_interval seconds (once per source)
+
+    Parameters:
+        poll_interval - seconds between checks of the file
+
+    Returns:
+        None
+    """
+    def start_watching(self, poll_interval: float = 2.0) -> None:
+        if self._watch_thread is not None:
+            return
+        self._watch_thread = threading.Thread(target=self._watch, args=(poll_interval,), daemon=True)
+        self._watch_thread.start()
+
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+
+
+    def _watch(self, poll_interval: float) -> None:
+        while not self._stop.wait(poll_interval):
+            self.reload()
+
+
+    def _compile(self, path: Path, version: int, dbc_bytes: Optional[bytes] = None) -> DbcHandle:
+        if dbc_bytes is None:
+            dbc_bytes = path.read_bytes()
+        dbc = load_dbc_contents(dbc_bytes, path)
+        return DbcHandle(version, path, dbc_hash(dbc_bytes), dbc, DecoderTable(dbc, self.cache_size))
+
+
+    def _swap(self, handle: DbcHandle) -> None:
+        self._handle = handle
+        self.log(f"Loaded DBC \"{handle.path}\" version {handle.version} ({len(handle.decoders)} messages)")
+        for listener in self._listeners:
+            listener(handle)
+
+
+    @staticmethod
+    def _stat_of(path: Path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,137 @@
+import math
+import threading
+import time
+import numpy as np
+from typing import Dict, Hashable, Optional, Tuple
+
+
+"""
+Per-signal change detection in front of InfluxDB point building. Flags, fault bits and other
+signals that sit at one value for a whole drive otherwise produce one point per frame.
+
+A signal is emitted when
+    - it has not been emitted before,
+    - it moved by more than its deadband since the last EMITTED value (so slow drift is still
+      written once it adds up), or for non-numeric values when it changed at all,
+    - or max_silence seconds (of frame time) passed since it was last emitted, as a heartbeat so
+      that dashboards and "last value" queries keep seeing it.
+
+Fields:
+    default_deadband: deadband for signals without their own entry (0 means any change is written)
+    max_silence: heartbeat interval in seconds (0 or None disables the heartbeat)
+    deadbands: "Measurement" or "Class.Measurement" -> deadband for that signal
+    emitted, suppressed: counters since the filter was created
+"""
+class DeadbandFilter:
+    def __init__(self, default_deadband: float = 0.0, max_silence: Optional[float] = 10.0,
+                 deadbands: Optional[Dict[str, float]] = None) -> None:
+        self.default_deadband = default_deadband
+        self.max_silence = max_silence or None
+        self.deadbands: Dict[str, float] = dict(deadbands or {})
+        self.emitted = 0
+        self.suppressed = 0
+
+        # (source, class, measurement) -> (last emitted value, its timestamp, deadband)
+        self._last: Dict[Hashable, Tuple[object, float, float]] = {}
+        self._lock = threading.Lock()
+
+
+    """
+    Gets the deadband of a signal ("Class.Measurement" entries take priority over "Measurement")
+
+    Parameters:
+        m_class - the class of the message (Ex. VoltageSensorsData)
+        name - the measurement name
+
+    Returns:
+        the deadband of the signal
+    """
+    def deadband_for(self, m_class: str, name: str) -> float:
+        deadbands = self.deadbands
+        if not deadbands:
+            return self.default_deadband
+        return deadbands.get(f"{m_class}.{name}", deadbands.get(name, self.default_deadband))
+
+
+    """
+    Decides whether one value of a signal should be written and remembers it if so
+
+    Parameters:
+        source - the board the value came from
+        m_class - the class of the message
+        name - the measurement name
+        value - the decoded value
+        timestamp - time of the value in seconds (None uses the current time)
+
+    Returns:
+        True if the value should be written to InfluxDB
+    """
+    def should_emit(self, source: str, m_class: str, name: str, value, timestamp: Optional[float] = None) -> bool:
+        if timestamp is None:
+            timestamp = time.time()
+
+        key = (source, m_class, name)
+        with self._lock:
+            last = self._last.get(key)
+            if last is None:
+                deadband = self.deadband_for(m_class, name)
+            elif not self._changed(last[0], value, last[2]) and not self._silent_for(last[1], timestamp):
+                self.suppressed += 1
+                return False
+            else:
+                deadband = last[2]
+
+            self._last[key] = (value, timestamp, deadband)
+            self.emitted += 1
+            return True
+
+
+    """
+    Column counterpart of should_emit for the batch decode path (see can_decoder.CanColumns)
+
+    Parameters:
+        source - the board the values came from
+        m_class - the class of the message
+        name - the measurement name
+        timestamps - (N,) array of frame timestamps in seconds, in arrival order
+        values - (N,) array of decoded values
+
+    Returns:
+        (N,) boolean mask of the values that should be written
+    """
+    def mask(self, source: str, m_class: str, name: str, timestamps: np.ndarray, values: np.ndarray) -> np.ndarray:
+        keep = np.zeros(len(values), dtype=bool)
+        for i, (timestamp, value) in enumerate(zip(timestamps.tolist(), values.tolist())):
+            keep[i] = self.should_emit(source, m_class, name, value, timestamp)
+        return keep
+
+
+    def _changed(self, last, value, deadband: float) -> bool:
+        if isinstance(value, (int, float)) and isinstance(last, (int, float)):
+            if math.isnan(value) or math.isnan(last):
+                return math.isnan(value) != math.isnan(last)
+            return abs(value - last) > deadband if deadband > 0 else value != last
+        return value != last
+
+
+    def _silent_for(self, last_timestamp: float, timestamp: float) -> bool:
+        return self.max_silence is not None and timestamp - last_timestamp >= self.max_silence
+
+
+    """
+    Snapshot of the filter counters
+
+    Parameters:
+        None
+
+    Returns:
+        dict with emitted, suppressed and suppressed_ratio (0 to 1)
+    """
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.emitted + self.suppressed
+            return {
+                "emitted": self.emitted,
+                "suppressed": self.suppressed,
+                "suppressed_ratio": self.suppressed / total if total else 0.0,
+            }
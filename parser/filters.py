@@ -0,0 +1,83 @@
+from functools import lru_cache
+from typing import FrozenSet, Iterable, Optional
+
+
+"""
+Message filters shared by the parser and link_telemetry (live, log and display filters).
+
+A filter list (Ex. ["CAN", "0x401", "1795"]) is compiled once into a FrameFilter: hex and decimal
+entries become a set of frame IDs and alphabetic entries a set of message types, so checking a
+message is a set lookup. Compiled filters are cached by the filter list.
+
+    "ALL"       every message (takes precedence over everything else)
+    "NONE"      no message
+    "0x401"     CAN messages with frame ID 0x401
+    "1025"      CAN messages with frame ID 1025
+    "IMU"       every message of that type (CAN, GPS, IMU)
+"""
+class FrameFilter:
+    __slots__ = ("all", "frame_ids", "types")
+
+    def __init__(self, all: bool, frame_ids: FrozenSet[int], types: FrozenSet[str]) -> None:
+        self.all = all
+        self.frame_ids = frame_ids
+        self.types = types
+
+
+    """
+    Checks a message against the filter
+
+    Parameters:
+        message_type - type of the message (Ex. "CAN")
+        frame_id - CAN frame ID of the message, None for messages without one
+
+    Returns:
+        True if the message passes the filter
+    """
+    def matches(self, message_type: str, frame_id: Optional[int] = None) -> bool:
+        return self.all or message_type in self.types or frame_id in self.frame_ids
+
+
+    def __repr__(self) -> str:
+        return f"FrameFilter(all={self.all}, frame_ids={set(self.frame_ids)}, types={set(self.types)})"
+
+
+"""
+Compiles a filter list (cached, so repeated lists are compiled once)
+
+Parameters:
+    filters - list of filter strings (a falsy value filters everything out)
+
+Returns:
+    FrameFilter
+"""
+def compile_filters(filters: Optional[Iterable[str]]) -> FrameFilter:
+    if not filters:
+        return _NONE
+    return _compile(tuple(filters))
+
+
+@lru_cache(maxsize=256)
+def _compile(filters: tuple) -> FrameFilter:
+    if "ALL" in filters:
+        return FrameFilter(True, frozenset(), frozenset())
+    if "NONE" in filters:
+        return _NONE
+
+    frame_ids = set()
+    types = set()
+    for filter in filters:
+        if len(filter) > 2 and filter[:2].lower() == "0x":
+            try:
+                frame_ids.add(int(filter, 16))
+            except ValueError:
+                pass
+        elif filter.isdigit():
+            frame_ids.add(int(filter))
+        elif filter.isalpha():
+            types.add(filter.upper())
+
+    return FrameFilter(False, frozenset(frame_ids), frozenset(types))
+
+
+_NONE = FrameFilter(False, frozenset(), frozenset())
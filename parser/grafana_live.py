@@ -0,0 +1,174 @@
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
+from websockets.sync.client import connect
+
+
+"""
+Escapes a measurement name or field key for line protocol (commas, spaces and equal signs)
+"""
+@lru_cache(maxsize=4096)
+def escape_key(key: str) -> str:
+    return key.replace("\\", "\\\\").replace(",", "\\,").replace("=", "\\=").replace(" ", "\\ ")
+
+
+def _field_value(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(float(value))
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+"""
+Builds one multi-field line protocol line (Ex. "Pack Voltage=3.3,Current=1.0 1717380000000000000")
+
+Parameters:
+    measurement - name of the line's measurement
+    fields - iterable of (field name, value) pairs
+    time_ns - timestamp of the line in nanoseconds
+
+Returns:
+    str - the line
+"""
+def line_protocol(measurement: str, fields, time_ns: int) -> str:
+    field_set = ",".join(f"{escape_key(name)}={_field_value(value)}" for name, value in fields)
+    return f"{escape_key(measurement)} {field_set} {time_ns}"
+
+
+"""
+Persistent websockets to Grafana Live push endpoints (ws://<grafana>/api/live/push/<channel>).
+A socket is opened the first time a channel is pushed to and then kept open, so streaming a
+measurement is one websocket send instead of a TCP connect + HTTP upgrade + close.
+
+A channel whose socket fails is closed and reconnected on a later push, after a backoff that
+doubles with every failed attempt (up to max_backoff seconds); pushes to it during the backoff
+are dropped and counted, so a down Grafana never slows the stream worker.
+
+Not thread safe: used by the single stream worker thread of the parser.
+"""
+class GrafanaLivePool:
+    def __init__(self, grafana_host: str, token: str, channel_prefix: str,
+                 min_backoff: float = 0.5, max_backoff: float = 30.0,
+                 log: Callable[[str], None] = print, connect: Callable = connect) -> None:
+        self.push_url = f"ws://{grafana_host}/api/live/push/"
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.channel_prefix = channel_prefix
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.log = log
+        self._connect = connect
+
+        self._urls: Dict[Tuple[str, str], str] = {}
+        self._sockets: Dict[str, object] = {}
+        self._backoff: Dict[str, Tuple[float, float]] = {}     # url -> (retry at, current backoff)
+
+        self.connects = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+
+    """
+    Gets the push URL of the channel of a board's class of measurements (computed once per class)
+
+    Parameters:
+        source - board of the measurements (Ex. "BMS")
+        m_class - class of the measurements
+
+    Returns:
+        str - the websocket URL
+    """
+    def channel_url(self, source: str, m_class: str) -> str:
+        key = (source, m_class)
+        url = self._urls.get(key)
+        if url is None:
+            url = self._urls[key] = self.push_url + "_".join([self.channel_prefix, source, m_class])
+        return url
+
+
+    """
+    Pushes one line protocol message to a channel
+
+    Parameters:
+        url - push URL of the channel (see channel_url)
+        message - line protocol text, one or more lines (see line_protocol)
+
+    Returns:
+        True if the message was sent
+    """
+    def push(self, url: str, message: str) -> bool:
+        websocket = self._sockets.get(url)
+        if websocket is not None:
+            try:
+                websocket.send(message)
+            except Exception:
+                # the socket went stale (Ex. Grafana restarted): reconnect once right away
+                self._discard(url)
+            else:
+                self.sent += 1
+                return True
+
+        websocket = self._open(url)
+        if websocket is None:
+            return False
+
+        try:
+            websocket.send(message)
+        except Exception as e:
+            self._fail(url, e)
+            return False
+        self.sent += 1
+        return True
+
+
+    def close(self) -> None:
+        for url in list(self._sockets):
+            self._discard(url)
+
+
+    def stats(self) -> dict:
+        return {
+            "open": len(self._sockets),
+            "connects": self.connects,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+
+    def _open(self, url: str) -> Optional[object]:
+        retry_at, _ = self._backoff.get(url, (0.0, 0.0))
+        if time.monotonic() < retry_at:
+            self.dropped += 1
+            return None
+
+        try:
+            websocket = self._connect(url, additional_headers=self.headers)
+        except Exception as e:
+            self._fail(url, e)
+            return None
+
+        self.connects += 1
+        self._sockets[url] = websocket
+        self._backoff.pop(url, None)
+        return websocket
+
+
+    def _fail(self, url: str, error: Exception) -> None:
+        self._discard(url)
+        self.failed += 1
+        _, backoff = self._backoff.get(url, (0.0, 0.0))
+        backoff = min(self.max_backoff, backoff * 2 if backoff else self.min_backoff)
+        self._backoff[url] = (time.monotonic() + backoff, backoff)
+        self.log(f"Unable to stream to Grafana channel \"{url}\" (retrying in {backoff}s): {error}")
+
+
+    def _discard(self, url: str) -> None:
+        websocket = self._sockets.pop(url, None)
+        if websocket is not None:
+            try:
+                websocket.close()
+            except Exception:
+                pass
@@ -0,0 +1,86 @@
+import gc
+import multiprocessing
+import os
+import signal
+import threading
+
+"""
+Multi-process deployment of the Flask parser (parser/main.py). One Python process decodes on one
+core (the GIL), so the parser is run as several gunicorn workers:
+
+    - the app is preloaded: the master imports parser.main once (compiling the DBC) and the workers
+      are forked from it, sharing the compiled DBC copy-on-write
+    - every worker has its own InfluxDB client and batching writer (parser.main.start_worker)
+    - one separate process streams to Grafana Live; the workers hand it their coalesced updates
+      (parser.main.start_stream_process). The master restarts it if it dies
+    - every process writes its metrics to a shared folder (PARSER_METRICS_DIR), so /api/v1/metrics
+      reports the whole parser whichever worker serves it (see MetricsDirectory in parser/metrics.py)
+
+Run from the project root (paths are relative to it):
+    gunicorn -c parser/gunicorn.conf.py parser.main:app
+
+PARSER_WORKERS sets the number of workers (default: one per core).
+"""
+
+# tells parser.main to start its background threads in the workers rather than on import
+os.environ["PARSER_PRELOAD"] = "true"
+
+bind = os.environ.get("PARSER_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("PARSER_WORKERS", multiprocessing.cpu_count()))
+
+# threads let a worker keep serving requests while it holds WebSocket streams (/api/v1/stream)
+worker_class = "gthread"
+threads = int(os.environ.get("PARSER_THREADS", 8))
+
+preload_app = True
+
+
+# seconds between checks that the streaming process is still running
+STREAM_WATCH_INTERVAL_S = 1.0
+
+stream_pid = None
+stream_stopping = threading.Event()
+
+
+def when_ready(server):
+    global stream_pid
+    import parser.main
+
+    stream_pid = parser.main.start_stream_process()
+    threading.Thread(target=watch_stream_process, args=(server,), daemon=True).start()
+
+    # keep the objects loaded so far (the compiled DBC, ...) out of the garbage collector, so that
+    # collections in the workers do not write to (and copy) the pages they share with the master
+    gc.freeze()
+
+
+def watch_stream_process(server):
+    # the master reaps every child (its SIGCHLD handler), so a dead streaming process is gone by the
+    # time it is checked here rather than waited on
+    global stream_pid
+    import parser.main
+
+    while not stream_stopping.wait(STREAM_WATCH_INTERVAL_S):
+        try:
+            os.kill(stream_pid, 0)
+        except ProcessLookupError:
+            server.log.error(f"Streaming process (pid:{stream_pid}) exited, restarting it")
+            stream_pid = parser.main.start_stream_process()
+
+
+def post_fork(server, worker):
+    import parser.main
+
+    parser.main.start_worker()
+
+
+def on_exit(server):
+    import parser.main
+
+    stream_stopping.set()
+    if stream_pid is not None:
+        try:
+            os.kill(stream_pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    parser.main.metrics_directory.remove()
@@ -0,0 +1,167 @@
+import threading
+import time
+import requests
+
+from typing import Callable, Dict, List, Optional
+
+
+"""
+Background health probes of the services the parser depends on (InfluxDB and Grafana).
+
+Each service is probed on an interval with a strict timeout by one background thread, and the
+result (status, latency, time of the last success) is kept. The health check endpoint only reads
+this state, so it answers right away however slow or unreachable a service is, and the InfluxDB
+writer uses it to stop writing to an InfluxDB that is down (see BatchingWriter's ready).
+
+    "UP"                        probe answered 200
+    "UNAUTHORIZED"              probe answered 401 (the token is wrong)
+    "UNEXPECTED_STATUS_CODE"    probe answered something else
+    "DOWN"                      probe failed to connect or timed out
+    "UNKNOWN"                   not probed yet
+"""
+
+"""
+Maps the HTTP status code of a service's health probe to the status sent back by the health check
+"""
+def service_status(status_code: int) -> str:
+    if (status_code == 200):
+        return "UP"
+    elif (status_code == 401):
+        return "UNAUTHORIZED"
+    else:
+        return "UNEXPECTED_STATUS_CODE"
+
+
+class ServiceHealth:
+    def __init__(self, name: str, url: str, probe_url: str, token: str) -> None:
+        self.name = name
+        self.url = url
+        self.probe_url = probe_url
+        self.token = token
+
+        self.status = "UNKNOWN"
+        self.latency: Optional[float] = None           # seconds the last probe took
+        self.last_success: Optional[float] = None      # time.time() of the last "UP" probe
+        self.checked_at: Optional[float] = None        # time.time() of the last probe
+
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "url": self.url,
+            "status": self.status,
+            "latency_ms": None if self.latency is None else round(self.latency * 1000, 3),
+            "last_success": self.last_success,
+            "checked_at": self.checked_at,
+        }
+
+
+"""
+Probes services in the background and keeps their latest health
+
+Parameters:
+    interval - seconds between probe rounds
+    timeout - seconds a probe may take (connecting and reading)
+    get - function making the probe request (requests.get)
+    log - called with a message when a service changes status
+"""
+class HealthMonitor:
+    def __init__(self, interval: float = 5.0, timeout: float = 2.0, get: Callable = requests.get,
+                 log: Callable[[str], None] = print) -> None:
+        self.interval = interval
+        self.timeout = timeout
+        self.get = get
+        self.log = log
+
+        self._services: Dict[str, ServiceHealth] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+
+    def add(self, name: str, url: str, probe_url: str, token: str) -> None:
+        self._services[name] = ServiceHealth(name, url, probe_url, token)
+
+
+    """
+    Starts probing in the background (once); the first round runs right away
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+    """
+    Probes every service once
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    def check(self) -> None:
+        for service in self._services.values():
+            start = time.perf_counter()
+            try:
+                response = self.get(service.probe_url, headers={"Authorization": f"Bearer {service.token}"},
+                                    timeout=self.timeout)
+            except requests.exceptions.RequestException:
+                status = "DOWN"
+            else:
+                status = service_status(response.status_code)
+
+            if status != service.status:
+                self.log(f"{service.name} @ {service.url} is {status} (was {service.status})")
+            service.latency = time.perf_counter() - start
+            service.checked_at = time.time()
+            if status == "UP":
+                service.last_success = service.checked_at
+            service.status = status
+
+
+    """
+    Latest health of every service (the services list of the health check)
+
+    Parameters:
+        None
+
+    Returns:
+        list of dicts: name, url, status, latency_ms, last_success and checked_at (Unix seconds)
+    """
+    def services(self) -> List[dict]:
+        return [service.to_dict() for service in self._services.values()]
+
+
+    def status(self, name: str) -> str:
+        return self._services[name].status
+
+
+    """
+    Checks if a service is worth sending requests to: it is up, or has not been probed yet
+
+    Parameters:
+        name - name of the service
+
+    Returns:
+        True unless the last probe of the service failed
+    """
+    def is_available(self, name: str) -> bool:
+        return self._services[name].status in ("UP", "UNKNOWN")
+
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.check()
+            self._stop.wait(self.interval)
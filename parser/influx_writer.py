@@ -0,0 +1,223 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+
+"""
+Batching InfluxDB writer. Request threads only append points to the buffer of their destination
+bucket; a background thread writes a bucket's buffer in one request once it holds batch_size points
+or its oldest point is flush_interval seconds old, so request threads never wait on InfluxDB and
+points are not stranded in a half-full batch during quiet periods.
+
+Memory is bounded by max_points (over all buckets). When InfluxDB is down the buffers fill up and
+the oldest points are dropped (and counted) to make room for new ones. A failed write is retried on
+the next flush while there is room for it. The error of a failed write is reported once through
+add() so the parse endpoints can still send INFLUX_WRITE_FAIL back to the client.
+
+ready (optional) is checked before every background flush. While it returns False (Ex. the health
+probe of InfluxDB failed, see parser/health.py) nothing is written: points keep being buffered and
+add() reports the buckets waiting for InfluxDB as failed writes.
+"""
+class BatchingWriter:
+    def __init__(self, write: Callable[[str, list], None], batch_size: int = 24, flush_interval: float = 1.0,
+                 max_points: int = 100_000, log: Callable[[str], None] = print,
+                 ready: Optional[Callable[[], bool]] = None) -> None:
+        self.write = write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_points = max_points
+        self.log = log
+        self.ready = ready
+
+        self._buffers: Dict[str, Deque] = {}
+        self._oldest: Dict[str, float] = {}            # bucket -> time.monotonic() of its oldest buffered point
+        self._errors: Dict[str, Exception] = {}        # bucket -> error of its last failed write (not yet reported)
+        self._buffered = 0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.written = 0
+        self.dropped = 0
+        self.failed_writes = 0
+        self.skipped_flushes = 0
+
+
+    """
+    Queues points for a bucket
+
+    Parameters:
+        bucket - destination bucket
+        points - influxdb_client Points (or line protocol strings)
+
+    Returns:
+        the error of the last failed write to bucket if it was not reported yet, else None
+    """
+    def add(self, bucket: str, points: list) -> Optional[Exception]:
+        if not points:
+            return None
+
+        with self._cond:
+            buffer = self._buffers.get(bucket)
+            if buffer is None:
+                buffer = self._buffers[bucket] = deque()
+            if not buffer:
+                self._oldest[bucket] = time.monotonic()
+            buffer.extend(points)
+            self._buffered += len(points)
+            if self._buffered > self.max_points:
+                self._drop_oldest(self._buffered - self.max_points)
+
+            if len(buffer) >= self.batch_size:
+                self._cond.notify()
+            return self._errors.pop(bucket, None)
+
+
+    """
+    Starts the background flush thread (once)
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+    """
+    Stops the background thread and writes everything still buffered (Ex. at exit)
+
+    Parameters:
+        timeout - seconds to wait for the background thread
+
+    Returns:
+        None
+    """
+    def close(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush(force=True)
+
+
+    """
+    Writes the buffers that are due: full batches, buffers older than flush_interval, or all of them
+
+    Parameters:
+        force - write every non-empty buffer
+
+    Returns:
+        True if every write succeeded
+    """
+    def flush(self, force: bool = False) -> bool:
+        ok = True
+        with self._flush_lock:
+            for bucket, batch in self._take_due(force):
+                try:
+                    self.write(bucket, batch)
+                except Exception as e:
+                    ok = False
+                    self.failed_writes += 1
+                    self.log(f"Unable to write {len(batch)} points to InfluxDB bucket \"{bucket}\": {e}")
+                    self._requeue(bucket, batch, e)
+                else:
+                    self.written += len(batch)
+        return ok
+
+
+    def stats(self) -> dict:
+        with self._cond:
+            buffered = {bucket: len(buffer) for bucket, buffer in self._buffers.items() if buffer}
+        return {
+            "buffered": buffered,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_writes": self.failed_writes,
+            "skipped_flushes": self.skipped_flushes,
+        }
+
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stop and not self._has_full_batch():
+                    self._cond.wait(self._next_deadline())
+                if self._stop:
+                    return
+            if self.ready is not None and not self.ready():
+                # InfluxDB is known to be down: keep buffering instead of waiting on it
+                self._hold()
+                with self._cond:
+                    self._cond.wait_for(lambda: self._stop, self.flush_interval)
+            elif not self.flush():
+                # InfluxDB is failing: wait before retrying instead of retrying full batches right away
+                with self._cond:
+                    self._cond.wait_for(lambda: self._stop, self.flush_interval)
+
+
+    def _hold(self) -> None:
+        with self._cond:
+            self.skipped_flushes += 1
+            for bucket, buffer in self._buffers.items():
+                if buffer and bucket not in self._errors:
+                    self._errors[bucket] = ConnectionError("InfluxDB is unavailable, writes are held until it is back up")
+
+
+    def _has_full_batch(self) -> bool:
+        return any(len(buffer) >= self.batch_size for buffer in self._buffers.values())
+
+
+    def _next_deadline(self) -> float:
+        if not self._oldest:
+            return self.flush_interval
+        return max(0.0, min(self._oldest.values()) + self.flush_interval - time.monotonic())
+
+
+    def _take_due(self, force: bool) -> List[tuple]:
+        now = time.monotonic()
+        due = []
+        with self._cond:
+            for bucket, buffer in self._buffers.items():
+                if not buffer:
+                    continue
+                if force or len(buffer) >= self.batch_size or now - self._oldest[bucket] >= self.flush_interval:
+                    batch = list(buffer)
+                    buffer.clear()
+                    del self._oldest[bucket]
+                    self._buffered -= len(batch)
+                    due.append((bucket, batch))
+        return due
+
+
+    def _requeue(self, bucket: str, batch: list, error: Exception) -> None:
+        with self._cond:
+            self._errors[bucket] = error
+            buffer = self._buffers[bucket]
+            buffer.extendleft(reversed(batch))
+            self._oldest[bucket] = time.monotonic()
+            self._buffered += len(batch)
+            if self._buffered > self.max_points:
+                self._drop_oldest(self._buffered - self.max_points)
+
+
+    def _drop_oldest(self, count: int) -> None:
+        # caller holds self._cond; drop from the fullest buffer first
+        while count > 0:
+            bucket, buffer = max(self._buffers.items(), key=lambda item: len(item[1]))
+            drop = min(count, len(buffer))
+            for _ in range(drop):
+                buffer.popleft()
+            if not buffer:
+                self._oldest.pop(bucket, None)
+            self._buffered -= drop
+            self.dropped += drop
+            count -= drop
@@ -0,0 +1,92 @@
+import threading
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+
+"""
+Queue that only keeps the most recent value per key (Ex. per signal). Putting a value for a key
+that is still pending replaces the old value in place (a coalesced update), so a slow consumer
+always gets the freshest value of every signal instead of working through a backlog of stale ones.
+
+Memory is bounded by max_keys: when a new key arrives at a full queue the key that has been
+pending the longest is dropped (a dropped update).
+"""
+class LatestValueQueue:
+    def __init__(self, max_keys: int = 4096) -> None:
+        self.max_keys = max_keys
+        self._pending: Dict[Hashable, object] = {}
+        self._cond = threading.Condition()
+
+        self.put_count = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+
+    """
+    Sets the latest value of many keys at once (one lock per call)
+
+    Parameters:
+        items - iterable of (key, value) pairs
+
+    Returns:
+        None
+    """
+    def put_many(self, items: Iterable[Tuple[Hashable, object]]) -> None:
+        with self._cond:
+            pending = self._pending
+            for key, value in items:
+                self.put_count += 1
+                if key in pending:
+                    self.coalesced += 1
+                elif len(pending) >= self.max_keys:
+                    del pending[next(iter(pending))]
+                    self.dropped += 1
+                pending[key] = value
+            self._cond.notify()
+
+
+    def put(self, key: Hashable, value) -> None:
+        self.put_many(((key, value),))
+
+
+    """
+    Waits until a value is pending (without taking it)
+
+    Parameters:
+        timeout - seconds to wait (None waits forever)
+
+    Returns:
+        True if a value is pending
+    """
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            return bool(self._cond.wait_for(lambda: self._pending, timeout))
+
+
+    """
+    Takes every pending value
+
+    Parameters:
+        timeout - seconds to wait for a value (None waits forever)
+
+    Returns:
+        dict - key -> latest value (empty if the timeout passed)
+    """
+    def drain(self, timeout: Optional[float] = None) -> dict:
+        with self._cond:
+            if not self._pending:
+                self._cond.wait_for(lambda: self._pending, timeout)
+            pending, self._pending = self._pending, {}
+            return pending
+
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "put": self.put_count,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+        }
@@ -1,25 +1,40 @@
 import re
 import influxdb_client
-import requests
 import pprint
 import time
-import queue
 import threading
 import flask
+import msgpack
+import atexit
+import multiprocessing
+import os
+import queue
+import signal
 import sys
+import tempfile
 
 from influxdb_client.client.write_api import SYNCHRONOUS
 
 from pathlib import Path
 from typing import Dict, List
 
-from websockets.sync.client import connect
 
 from flask import Flask
 from flask_httpauth import HTTPTokenAuth
+from flask_sock import Sock
 
 from parser.create_message import create_message
-from parser.parameters import CAR_DBC
+from parser.bulk_frames import decode_bulk_body, wants_msgpack, BULK_MSGPACK_TYPE
+from parser.deadband import DeadbandFilter
+from parser.filters import compile_filters
+from parser.influx_writer import BatchingWriter
+from parser.grafana_live import GrafanaLivePool, line_protocol
+from parser.health import HealthMonitor
+from parser.latest_value_queue import LatestValueQueue
+from parser.metrics import MetricsDirectory, Registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from parser.stream_ingest import StreamSession, STREAM_PATH
+from parser.parse_errors import ParseError, failure_counts
+from parser.parameters import DBC_SOURCE, DBC_POLL_INTERVAL, DEADBAND_DEFAULT, DEADBAND_MAX_SILENCE, DEADBAND_SIGNALS
 
 from dotenv import dotenv_values
 
@@ -29,6 +44,7 @@ __VERSION__ = "0.4"
 # <----- Flask ----->
 
 app = Flask(__name__)
+sock = Sock(app)
 
 # <----- Constants ----->
 
@@ -46,7 +62,20 @@ ENV_CONFIG = dotenv_values(ENV_FILE)
 
 API_PREFIX = "/api/v1"
 
-STREAM_QUEUE_MAXSIZE = 256
+HEALTH_TIMEOUT_S = 2.0          # seconds a health probe of InfluxDB or Grafana may take
+HEALTH_INTERVAL_S = 5.0         # seconds between health probes (the health check serves the latest results)
+
+STREAM_MAX_SIGNALS = 4096       # signals waiting to be streamed to Grafana (latest value of each)
+STREAM_WINDOW_S = 0.05          # updates within this window are coalesced into one push per channel
+STREAM_CHANNEL_SIZE = 64        # worker mode: windows of updates waiting for the streaming process
+
+# gunicorn worker mode (see parser/gunicorn.conf.py): the app is imported once by the master, which
+# then forks the workers, so background threads are started after the fork instead of on import
+PRELOADED = os.environ.get("PARSER_PRELOAD", "false").lower() == "true"
+
+# worker mode: every process writes its metrics here so that any worker can report all of them
+METRICS_DIR = os.environ.get("PARSER_METRICS_DIR", os.path.join(tempfile.gettempdir(), f"parser-metrics-{os.getpid()}"))
+METRICS_SYNC_S = 1.0            # seconds between metrics snapshots of a process
 
 # <----- InfluxDB constants ----->
 
@@ -63,13 +92,107 @@ GRAFANA_TOKEN = ENV_CONFIG["GRAFANA_TOKEN"]
 # url without the 'http://'
 GRAFANA_URL_NAME = Path(GRAFANA_URL).name
 
-stream_queue: 'queue.Queue' = queue.Queue(maxsize=STREAM_QUEUE_MAXSIZE)
+# InfluxDB and Grafana are probed in the background (see parser/health.py)
+health_monitor = HealthMonitor(HEALTH_INTERVAL_S, HEALTH_TIMEOUT_S, log=app.logger.warning)
+health_monitor.add("influxdb", INFLUX_URL, INFLUX_URL + "api/v2/buckets", INFLUX_TOKEN)
+health_monitor.add("grafana", GRAFANA_URL, GRAFANA_URL + "api/frontend/settings", GRAFANA_TOKEN)
+
+# latest value per (source, class, measurement) to stream (see parser/latest_value_queue.py)
+stream_queue = LatestValueQueue(max_keys=STREAM_MAX_SIGNALS)
+
+# websockets to Grafana Live are kept open per channel (see parser/grafana_live.py)
+grafana_live = GrafanaLivePool(GRAFANA_URL_NAME, GRAFANA_TOKEN, CAR_NAME, log=app.logger.warning)
+
+# optional change detection before InfluxDB writes (DEADBAND=true in .env)
+deadband_filter = None
+if ENV_CONFIG.get("DEADBAND", "false").lower() == "true":
+    deadband_filter = DeadbandFilter(DEADBAND_DEFAULT, DEADBAND_MAX_SILENCE, DEADBAND_SIGNALS)
 
 # <----- InfluxDB object set-up ----->
 
-client = influxdb_client.InfluxDBClient(
-    url=INFLUX_URL, org=INFLUX_ORG, token=INFLUX_TOKEN)
-write_api = client.write_api(write_options=SYNCHRONOUS)
+# points are written per bucket in batches by a background thread (see parser/influx_writer.py)
+INFLUX_BATCH_SIZE       = int(ENV_CONFIG.get("INFLUX_BATCH_SIZE", 500))      # CREDIT: Mridul Singh for Batch Writing Optimization!
+INFLUX_FLUSH_INTERVAL   = float(ENV_CONFIG.get("INFLUX_FLUSH_INTERVAL", 1.0))
+INFLUX_MAX_BUFFERED     = int(ENV_CONFIG.get("INFLUX_MAX_BUFFERED", 100_000))
+
+"""
+Creates an InfluxDB client and the batching writer that owns it. Every process writing to InfluxDB
+has its own (each gunicorn worker creates one after the fork, see start_worker).
+
+Parameters:
+    None
+
+Returns:
+    BatchingWriter - not started yet
+"""
+def create_influx_writer() -> BatchingWriter:
+    client = influxdb_client.InfluxDBClient(
+        url=INFLUX_URL, org=INFLUX_ORG, token=INFLUX_TOKEN)
+    write_api = client.write_api(write_options=SYNCHRONOUS)
+
+    def write_points(bucket: str, points: list):
+        start = time.perf_counter()
+        write_api.write(bucket=bucket, org=INFLUX_ORG, record=points)
+        STAGE_SECONDS.observe(time.perf_counter() - start, "influx_write")
+
+    # writes are held while the health probe of InfluxDB fails
+    return BatchingWriter(write_points, INFLUX_BATCH_SIZE, INFLUX_FLUSH_INTERVAL, INFLUX_MAX_BUFFERED,
+                          log=app.logger.warning, ready=lambda: health_monitor.is_available("influxdb"))
+
+influx_writer = create_influx_writer()
+
+# <----- Metrics (see parser/metrics.py) ----->
+
+metrics = Registry()
+
+STAGE_SECONDS = metrics.histogram("parser_stage_seconds",
+                                  "Time spent in each stage of handling frames", ("stage",))
+FRAME_RESULTS = metrics.counter("parser_frame_results_total",
+                                "Responses per result (OK, PARSE_FAIL, INFLUX_WRITE_FAIL)", ("result",))
+FRAMES_RECEIVED = metrics.counter("parser_frames_received_total", "Frames received in parse requests", ("endpoint",))
+STREAM_FORWARDS = metrics.counter("parser_stream_forwards_total",
+                                  "Worker mode: windows of updates handed to the streaming process", ("outcome",))
+
+metrics.counter_callback("parser_parse_failures_total", "Parse failures per error code", failure_counts, "code")
+metrics.gauge("parser_stream_queue_depth", "Signals waiting to be streamed to Grafana", lambda: len(stream_queue))
+metrics.counter_callback("parser_stream_queue_updates_total", "Stream queue updates (put, coalesced, dropped)",
+                         lambda: {key: value for key, value in stream_queue.stats().items() if key != "pending"}, "outcome")
+metrics.counter_callback("parser_grafana_pushes_total", "Grafana Live pushes (sent, failed, dropped)",
+                         lambda: {key: grafana_live.stats()[key] for key in ("sent", "failed", "dropped")}, "outcome")
+metrics.gauge("parser_grafana_open_sockets", "Open Grafana Live websockets", lambda: grafana_live.stats()["open"])
+metrics.gauge("parser_influx_buffered_points", "Points waiting to be written per bucket",
+              lambda: influx_writer.stats()["buffered"], "bucket")
+metrics.counter_callback("parser_influx_points_total", "Points written to or dropped before InfluxDB",
+                         lambda: {"written": influx_writer.written, "dropped": influx_writer.dropped}, "outcome")
+metrics.counter_callback("parser_influx_failed_writes_total", "Failed InfluxDB batch writes", lambda: influx_writer.failed_writes)
+metrics.counter_callback("parser_influx_held_flushes_total", "InfluxDB writes held because its health probe failed",
+                         lambda: influx_writer.skipped_flushes)
+# every worker probes the services: up if one of them reached the service last time (the streaming
+# process does not probe and reports 0)
+metrics.gauge("parser_service_up", "1 if the last health probe of a service succeeded",
+              lambda: {service["name"]: int(service["status"] == "UP") for service in health_monitor.services()}, "service",
+              aggregate="max")
+metrics.gauge("parser_service_probe_seconds", "Time the last health probe of a service took",
+              lambda: {service["name"]: (service["latency_ms"] or 0) / 1000 for service in health_monitor.services()}, "service",
+              aggregate="max")
+metrics.counter_callback("parser_decode_cache_lookups_total", "CAN decode cache lookups",
+                         lambda: {key: value for key, value in cache_stats().items() if key in ("hits", "misses")}, "outcome")
+metrics.counter_callback("parser_deadband_values_total", "Values passed or suppressed by the deadband filter",
+                         lambda: {} if deadband_filter is None else
+                                 {key: value for key, value in deadband_filter.stats().items() if key != "suppressed_ratio"}, "outcome")
+
+
+def cache_stats() -> dict:
+    cache = DBC_SOURCE.current().decoders.cache
+    return cache.stats() if cache is not None else {}
+
+# worker mode: the metrics of all workers and of the streaming process are merged (see parser/metrics.py)
+metrics_directory = MetricsDirectory(METRICS_DIR, metrics, METRICS_SYNC_S, log=app.logger.warning) if PRELOADED else None
+
+
+def render_metrics() -> str:
+    return metrics.render() if metrics_directory is None else metrics_directory.render()
+
 
 # <----- Pretty printing ----->
 
@@ -97,6 +220,13 @@ def verify_token(token):
     return None
 
 
+@app.before_request
+def authenticate_stream():
+    # the websocket handshake happens before a flask-sock route runs, so check the token first
+    if flask.request.path.startswith(API_PREFIX + STREAM_PATH):
+        return auth.login_required(lambda: None)()
+
+
 @app.route("/")
 def welcome():
     return "Welcome to UBC Solar's Telemetry Parser!\n"
@@ -107,7 +237,7 @@ def welcome():
 def check_health():
     """
     Returns the health of the parser and if it is
-    able to connect to the relevant services.
+    able to connect to the relevant services (as of their last probe).
 
     Sample response:
         {
@@ -115,59 +245,34 @@ def check_health():
                 {
                     "name": "influxdb",
                     "status": "UP",
-                    "url": "http://influxdb:8086/"
+                    "url": "http://influxdb:8086/",
+                    "latency_ms": 2.113,
+                    "last_success": 1718000000.52,
+                    "checked_at": 1718000000.52
                 },
                 {
                     "name": "grafana",
                     "status": "UP",
-                    "url": "http://grafana:3000/"
+                    "url": "http://grafana:3000/",
+                    ...
                 },
             ]
         }
     """
 
-    # build response dictionary
-    response_dict: Dict[str, List[Dict[str, str]]] = dict()
-    response_dict["services"] = list()
+    # latest results of the background probes (see parser/health.py): never waits on a service
+    return {"services": health_monitor.services()}
+
+@app.get(f"{API_PREFIX}/metrics")
+@auth.login_required
+def get_metrics():
+    """
+    Returns the parser's metrics in the Prometheus text format: latency histograms per stage
+    (request_decode, create_message, filter, influx_write, grafana_push), results per frame and
+    the counters of the InfluxDB writer, stream queue, Grafana pushes, decode cache and deadband.
+    """
+    return flask.Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
 
-    # try making a request to InfluxDB container
-    try:
-        influx_response = requests.get(INFLUX_URL + "api/v2/buckets", headers={"Authorization": f"Bearer {INFLUX_TOKEN}"})
-    except requests.exceptions.ConnectionError:
-        influx_status = "DOWN"
-    else:
-        if (influx_response.status_code == 200):
-            influx_status = "UP"
-        elif (influx_response.status_code == 401):
-            influx_status = "UNAUTHORIZED"
-        else:
-            influx_status = "UNEXPECTED_STATUS_CODE"
-
-    # try making a request to Grafana container
-    try:
-        grafana_response = requests.get(GRAFANA_URL + "api/frontend/settings", headers={"Authorization": f"Bearer {GRAFANA_TOKEN}"})
-    except requests.exceptions.ConnectionError:
-        grafana_status = "DOWN"
-    else:
-        if (grafana_response.status_code == 200):
-            grafana_status = "UP"
-        elif (grafana_response.status_code == 401):
-            grafana_status = "UNAUTHORIZED"
-        else:
-            grafana_status = "UNEXPECTED_STATUS_CODE"
-
-    response_dict["services"].append({
-        "name": "influxdb",
-        "url": INFLUX_URL,
-        "status": influx_status
-    })
-    response_dict["services"].append({
-        "name": "grafana",
-        "url": GRAFANA_URL,
-        "status": grafana_status
-    })
-
-    return response_dict
 
 """
 Filters what to live stream based on args in link_telemetry
@@ -176,49 +281,109 @@ NOTE: if CAN is a filter and a message ID is also a filter,
       the entire message class (CAN) is allowed to stream
 """
 def filter_stream(message, filter_list):  
-    if "ALL" in filter_list:
-        return True
-    elif "NONE" in filter_list:
-        return False
-      
-    for filter in filter_list:
-        if len(filter) > 2 and filter[:2] == "0x":
-            class_name = message.data["Class"][0]
-
-            # try if it is CAN message
-            can_message = None
-            try:
-                can_message = CAR_DBC.get_message_by_name(class_name)
-            except:
-                continue
-
-            id = can_message.frame_id
-
-            if hex(id) == filter:
-                return True
-            continue
-        if filter.isdigit():
-            class_name = message.data["Class"][0]
+    # compiled once per filter list (see parser/filters.py)
+    return compile_filters(filter_list).matches(message.type, message.record.frame_id)
 
-            # try if it is CAN message
-            can_message = None
-            try:
-                can_message = CAR_DBC.get_message_by_name(class_name)
-            except:
-                continue
 
-            id = can_message.frame_id
+"""
+Splits the message of a JSON parse request into frames. Two CAN frames are sometimes sent in one
+message (45 characters); the bulk endpoints avoid this by sending every frame with its length.
+"""
+def split_frames(msg: bytes) -> list:
+    if len(msg) == 45:
+        return [msg[:22], msg[23:]]         # Might need to change splitting logic
+    return [msg]
+
 
-            if int(filter) == id:
-                return True
-            else:
-                continue
-        if filter.isalpha():
-            if filter.upper() == message.type:
-                return True
+"""
+Parses one raw frame, queues it for Grafana streaming and (if a bucket is given) writes its
+measurements to the InfluxDB bucket that is specific to the message type (CAN, GPS, IMU, for example).
+Shared by the JSON and bulk parse endpoints.
+
+Parameters:
+    msg: the raw frame (bytes)
+    bucket: bucket suffix ("_test" or "_prod") or None to not write
+    live_filters: filters of what to stream to Grafana
+    log_filters: filters of what the client logs to file
+    display_filters: filters of what the client displays. None sends the display_data of every
+                     message (full response mode); otherwise it is only sent for messages matching
+                     display_filters or log_filters (ack response mode, see ack_responses)
+
+Returns:
+    list of response dicts for the frame (INFLUX_WRITE_FAIL responses, then OK or PARSE_FAIL)
+"""
+def process_frame(msg: bytes, bucket, live_filters, log_filters, display_filters=None) -> list:
+    responses = []
+
+    # try extracting measurements
+    start = time.perf_counter()
+    try:
+        message = create_message(msg)
+    except Exception as e:
+        STAGE_SECONDS.observe(time.perf_counter() - start, "create_message")
+        FRAME_RESULTS.inc("PARSE_FAIL")
+        app.logger.warn(
+            f"Unable to extract measurements for raw message {msg}")
+        return [{
+            "result": "PARSE_FAIL",
+            "message": msg.decode('latin-1'),
+            "error": str(e),
+            "error_code": e.code.name if isinstance(e, ParseError) else "UNEXPECTED",
+        }]
+
+    filter_start = time.perf_counter()
+    STAGE_SECONDS.observe(filter_start - start, "create_message")
+    type = message.type
+
+    # put the extracted measurements in the queue for Grafana streaming (replaces older values not streamed yet)
+    if (filter_stream(message, live_filters)):
+        stream_queue.put_many(((source, m_class, name), value) for source, m_class, name, value in message.record.rows())
+    
+    # Check if this message should be logged into a file based on args
+    doLogMessage = filter_stream(message, log_filters)
+    do_display = display_filters is None or doLogMessage or filter_stream(message, display_filters)
+    STAGE_SECONDS.observe(time.perf_counter() - filter_start, "filter")
+
+    # queue the measurements extracted for writing (see influx_writer)
+    record = message.record
+    points = []
+    for source, m_class, name, value in (record.rows() if bucket is not None else ()):
+        # skip values that did not change (see parser/deadband.py)
+        if deadband_filter is not None and not deadband_filter.should_emit(source, m_class, name, value, record.timestamp):
             continue
 
-    return False
+        # REQUIRED FIELDS
+        point = influxdb_client.Point(source).tag("car", CAR_NAME).tag(
+            "class", m_class).field(name, value)
+        
+        if record.timestamp is not None:
+            point.time(int(record.timestamp * 1e9))
+        
+        points.append(point)
+
+    # the writer sends back the error of its last failed write to this bucket (once)
+    write_error = influx_writer.add(type + bucket, points) if points else None
+    if write_error is not None:
+        FRAME_RESULTS.inc("INFLUX_WRITE_FAIL")
+        responses.append({
+            "result": "INFLUX_WRITE_FAIL",
+            "message": msg.decode('latin-1'),
+            "error": str(write_error),
+            "type": type 
+        })
+
+    curr_response = {
+        "result": "OK",
+        "logMessage": doLogMessage,
+        "type": type,
+        "frame_id": message.record.frame_id,
+    }
+    if do_display:
+        curr_response["message"] = message.display_data
+    responses.append(curr_response)
+    FRAME_RESULTS.inc("OK")
+
+    return responses
 
 
 @app.post(f"{API_PREFIX}/parse")
@@ -227,61 +392,7 @@ def parse_request():
     """
     Parses incoming request and sends back the parsed result.
     """
-    parse_request = flask.request.json
-
-    msgs = []
-    msg = parse_request['message']
-    if len(msg) == 45:
-        msgs.append(msg[:22])                  # Might need to change splitting logic
-        msgs.append(msg[23:])                  # Might need to change splitting logic
-    else:
-        msgs = [msg]
-
-    all_response = []
-    for msg in msgs:
-        curr_response = {}
-
-        # try extracting measurements
-        try:
-            message = create_message(msg)
-        except Exception as e:
-            app.logger.warn(
-                f"Unable to extract measurements for raw message {msg}")
-            curr_response = {
-                "result": "PARSE_FAIL",
-                "message": str(msg),
-                "error": str(e),
-            }
-            all_response.append(curr_response)
-            continue
-        
-        type = message.type
-
-        app.logger.info(f"Successfully parsed {type} message placed into queue")
-
-        # try putting the extracted measurements in the queue for Grafana streaming
-        try:
-            stream_queue.put(message.data, block=False)
-        except queue.Full:
-            app.logger.warn(
-                "Stream queue full. Unable to add measurements to stream queue!"
-            )
-
-        # Check if this message should be logged into a file based on args
-        log_filters = parse_request.get("log_filters", False)
-        doLogMessage = filter_stream(message, log_filters)    
-
-        curr_response =  {
-            "result": "OK",
-            "message": message.data["display_data"],
-            "logMessage": doLogMessage,
-            "type": type
-        }
-        all_response.append(curr_response)
-
-    return {
-        "all_responses": all_response,
-    }
+    return send_response(parse_json_body(decode_json_request(), None))
     
 
 @app.post(f"{API_PREFIX}/parse/write/debug")
@@ -295,114 +406,166 @@ def parse_and_write_request_to_prod():
     return parse_and_write_request_bucket("_prod")
 
 
-
-def static_vars(**kwargs):
-    def decorate(func):
-        for k in kwargs:
-            setattr(func, k, kwargs[k])
-        return func
-    return decorate
-
-BATCH_SIZE          = 24
-
 """
 Parses incoming request, writes the parsed measurements to InfluxDB bucket (debug or production)
 that is specifc to the message type (CAN, GPS, IMU, for example).
 Also sends back parsed measurements back to client.
 """
-@static_vars(points=[])
 def parse_and_write_request_bucket(bucket):
+    return send_response(parse_json_body(decode_json_request(), bucket))
+
+
+def decode_json_request() -> dict:
+    start = time.perf_counter()
     parse_request = flask.request.json
+    STAGE_SECONDS.observe(time.perf_counter() - start, "request_decode")
+    return parse_request
 
-    msgs = []
-    msg = parse_request['message']
-    if len(msg) == 45:
-        msgs.append(msg[:22])                  # Might need to change splitting logic
-        msgs.append(msg[23:])                  # Might need to change splitting logic
-    else:
-        msgs = [msg]
 
-    all_response = []
-    for msg in msgs:
-        curr_response = {}
-        # try extracting measurements
-        try:
-            message = create_message(msg)
-        except Exception as e:
-            app.logger.warn(
-                f"Unable to extract measurements for raw message {msg}")
-            curr_response =  {
-                "result": "PARSE_FAIL",
-                "message": str(msg),
-                "error": str(e),
-            }
-            all_response.append(curr_response)
-            continue
+"""
+Handles the JSON body of a parse request (shared by the Flask and async servers)
 
-        type = message.type
-        live_filters = parse_request.get("live_filters", False)
-        log_filters = parse_request.get("log_filters", False)
-
-        # try putting the extracted measurements in the queue for Grafana streaming
-        if (filter_stream(message, live_filters)):
-            try:
-                stream_queue.put(message.data, block=False)
-            except queue.Full:
-                app.logger.warn(
-                    "Stream queue full. Unable to add measurements to stream queue!"
-                )
-        
-        # Check if this message should be logged into a file based on args
-        doLogMessage = filter_stream(message, log_filters)
-
-        # try writing the measurements extracted
-        for i in range(len(message.data[list(message.data.keys())[0]])):
-            # REQUIRED FIELDS
-            name = message.data["Measurement"][i]
-            source = message.data["Source"][i]
-            m_class = message.data["Class"][i]
-            value = message.data["Value"][i]
-            
-            timestamp = message.data.get("Timestamp", ["NA"])[i]
-
-            point = influxdb_client.Point(source).tag("car", CAR_NAME).tag(
-                "class", m_class).field(name, value)
-            
-            if timestamp != "NA":
-                point.time(int(timestamp * 1e9))
-            
-            parse_and_write_request_bucket.points.append(point)
-
-            # write to InfluxDB
-            if len(parse_and_write_request_bucket.points) >= BATCH_SIZE:    # CREDIT: Mridul Singh for Batch Writing Optimization!
-                try:
-                    write_api.write(bucket=message.type + bucket, org=INFLUX_ORG, record=parse_and_write_request_bucket.points)
-                    write_api.close()
-                    parse_and_write_request_bucket.points = []
-                except Exception as e:
-                    app.logger.warning("Unable to write measurement to InfluxDB!")
-                    curr_response =  {
-                        "result": "INFLUX_WRITE_FAIL",
-                        "message": str(msg),
-                        "error": str(e),
-                        "type": type 
-                    }
-                    all_response.append(curr_response)
-                    continue
-                
+Parameters:
+    parse_request: the decoded JSON body ("message" plus optional filters and "response_mode")
+    bucket: bucket suffix ("_test" or "_prod") or None to only parse
 
-        curr_response = {
-            "result": "OK",
-            "message": message.data["display_data"],
-            "logMessage": doLogMessage,
-            "type": type
-        }
-        all_response.append(curr_response)
+Returns:
+    the response body: {"all_responses": [...]} or the ack_responses summary in ack mode
+"""
+def parse_json_body(parse_request: dict, bucket) -> dict:
+    msg = parse_request['message'].encode('latin-1')     # JSON carries the raw frame as a latin-1 string
+    frames = split_frames(msg)
+    FRAMES_RECEIVED.inc("json", amount=len(frames))
+    live_filters = ["ALL"] if bucket is None else parse_request.get("live_filters", False)
+    log_filters = parse_request.get("log_filters", False)
+
+    if parse_request.get("response_mode") == "ack":
+        display_filters = parse_request.get("display_filters", ["NONE"])
+        return ack_responses(frames, bucket, live_filters, log_filters, display_filters)
+
+    all_response = []
+    for msg in frames:
+        all_response.extend(process_frame(msg, bucket, live_filters, log_filters))
 
     return {
         "all_responses": all_response
     }
 
+
+@app.post(f"{API_PREFIX}/parse/bulk")
+@auth.login_required
+def parse_bulk_request():
+    return parse_bulk_request_bucket(None)
+
+@app.post(f"{API_PREFIX}/parse/write/debug/bulk")
+@auth.login_required
+def parse_and_write_bulk_request():
+    return parse_bulk_request_bucket("_test")
+
+@app.post(f"{API_PREFIX}/parse/write/production/bulk")
+@auth.login_required
+def parse_and_write_bulk_request_to_prod():
+    return parse_bulk_request_bucket("_prod")
+
+
+def parse_bulk_request_bucket(bucket):
+    body, status = parse_bulk_body(flask.request.get_data(), flask.request.mimetype, flask.request.args, bucket)
+    return send_response(body) if status == 200 else (body, status)
+
+
+"""
+Parses many frames sent in one request (see parser/bulk_frames.py for the body formats).
+Shared by the Flask and async servers.
+
+Parameters:
+    body: the request body
+    content_type: mimetype of the body
+    query: query parameters of the request
+    bucket: bucket suffix ("_test" or "_prod") or None to only parse
+
+Returns:
+    (response body, HTTP status) - the ack_responses summary, or {"error": ...} and 400 for a bad body
+"""
+def parse_bulk_body(body: bytes, content_type: str, query, bucket):
+    start = time.perf_counter()
+    try:
+        frames, options = decode_bulk_body(body, content_type, query)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    STAGE_SECONDS.observe(time.perf_counter() - start, "request_decode")
+    FRAMES_RECEIVED.inc("bulk", amount=len(frames))
+
+    live_filters = options.get("live_filters", ["ALL"] if bucket is None else ["NONE"])
+    log_filters = options.get("log_filters", ["NONE"])
+    display_filters = options.get("display_filters", ["NONE"])
+
+    return ack_responses(frames, bucket, live_filters, log_filters, display_filters), 200
+
+
+@sock.route(f"{API_PREFIX}{STREAM_PATH}")
+def stream_request(ws):
+    serve_stream(ws, None)
+
+@sock.route(f"{API_PREFIX}{STREAM_PATH}/write/debug")
+def stream_and_write_request(ws):
+    serve_stream(ws, "_test")
+
+@sock.route(f"{API_PREFIX}{STREAM_PATH}/write/production")
+def stream_and_write_request_to_prod(ws):
+    serve_stream(ws, "_prod")
+
+
+"""
+Serves a WebSocket ingest connection (see parser/stream_ingest.py for the protocol): every batch
+of frames is parsed like a bulk request and acknowledged with its ack summary.
+"""
+def serve_stream(ws, bucket):
+    session = StreamSession(bucket, stream_frames)
+    while True:
+        ws.send(session.handle(ws.receive()))
+
+
+def stream_frames(frames, bucket, live_filters, log_filters, display_filters) -> dict:
+    FRAMES_RECEIVED.inc("stream", amount=len(frames))
+    return ack_responses(frames, bucket, live_filters, log_filters, display_filters)
+
+
+"""
+Processes frames in ack response mode: instead of one full response per frame the client gets
+a count of the frames that parsed OK, and full responses only for the frames it will display or
+log (display_filters/log_filters) and for the frames that failed:
+    {
+        "received": number of frames,
+        "ok": number of frames parsed,
+        "failed": number of frames that failed to parse or write,
+        "all_responses": responses of the failed frames and of the frames matching display_filters
+                         or log_filters (same form as the full responses plus the "index" of the frame)
+    }
+"""
+def ack_responses(frames, bucket, live_filters, log_filters, display_filters) -> dict:
+    summary = {"received": len(frames), "ok": 0, "failed": 0, "all_responses": []}
+    for index, frame in enumerate(frames):
+        for response in process_frame(bytes(frame), bucket, live_filters, log_filters, display_filters):
+            if response["result"] == "OK":
+                summary["ok"] += 1
+                if "message" not in response:
+                    continue
+            else:
+                summary["failed"] += 1
+            response["index"] = index
+            summary["all_responses"].append(response)
+
+    return summary
+
+
+"""
+Sends a response body as msgpack if the client accepts it (Accept: application/msgpack), else as JSON
+"""
+def send_response(body: dict):
+    if wants_msgpack(flask.request.headers.get("Accept", "")):
+        return flask.Response(msgpack.packb(body), mimetype=BULK_MSGPACK_TYPE)
+    return body
+
 def write_measurements():
     """
     Worker thread responsible for live-streaming measurements to Grafana.
@@ -412,33 +575,129 @@ def write_measurements():
     """
 
     while True:
-        data_dict = stream_queue.get()
-
-        # try writing the measurements extracted
-        for i in range(len(data_dict[list(data_dict.keys())[0]])):
-            name = data_dict["Measurement"][i]
-            source = data_dict["Source"][i]
-            m_class = data_dict["Class"][i]
-            value = data_dict["Value"][i]
-
-            # compute Grafana websocket URL to livestream measurement
-            endpoint_name = "_".join([CAR_NAME, source, m_class, name])
-            websocket_url = f"ws://{GRAFANA_URL_NAME}/api/live/push/{endpoint_name}"
-
-            # live-stream measurements to Grafana Live
-            try:
-                with connect(websocket_url,
-                             additional_headers={
-                                 'Authorization': f'Bearer {GRAFANA_TOKEN}'}
-                             ) as websocket:
-                    current_time = time.time_ns()
-                    message = f"test value={value} {current_time}"
-                    websocket.send(message)
-            except Exception:
-                app.logger.warning(f"Unable to stream measurement \"{name}\" to Grafana!")
-            else:
-                app.logger.debug(f"Streamed \"{m_class}\" measurement to Grafana instance!")
+        push_measurements(next_measurements())
+
+
+def forward_measurements():
+    """
+    Worker mode replacement of write_measurements: hands every window of updates to the one streaming
+    process (see stream_measurements), so Grafana gets one push per channel rather than one per worker.
+    A window is dropped if the streaming process falls behind.
+    """
+
+    while True:
+        latest = next_measurements()
+        try:
+            stream_channel.put_nowait(latest)
+            STREAM_FORWARDS.inc("sent")
+        except queue.Full:
+            STREAM_FORWARDS.inc("dropped")
+
+
+def next_measurements() -> dict:
+    # wait for updates, then give the window's updates time to coalesce
+    stream_queue.wait()
+    time.sleep(STREAM_WINDOW_S)
+    return stream_queue.drain()
+
+
+def push_measurements(latest: dict):
+    # one line per board/class with the latest value of each of its measurements as fields
+    classes: Dict[tuple, list] = {}
+    for (source, m_class, name), value in latest.items():
+        classes.setdefault((source, m_class), []).append((name, value))
+
+    # live-stream measurements to Grafana Live: one push per channel over its open websocket
+    current_time = time.time_ns()
+    for (source, m_class), fields in classes.items():
+        websocket_url = grafana_live.channel_url(source, m_class)
+        start = time.perf_counter()
+        pushed = grafana_live.push(websocket_url, line_protocol(m_class, fields, current_time))
+        STAGE_SECONDS.observe(time.perf_counter() - start, "grafana_push")
+        if pushed:
+            app.logger.debug(f"Streamed \"{m_class}\" measurements to Grafana instance!")
+
+
+# <----- Background work ----->
+
+# worker mode: queue from the workers to the streaming process (see start_stream_process)
+stream_channel = None
+
+def start_background_work():
+    health_monitor.start()
+
+    # reload the DBC without restarting when dbc/ changes (DBC_WATCH=false in .env to turn off)
+    if ENV_CONFIG.get("DBC_WATCH", "true").lower() == "true":
+        DBC_SOURCE.start_watching(DBC_POLL_INTERVAL)
+
+    influx_writer.start()
+    atexit.register(influx_writer.close)
+
+    # create thread to stream to Grafana (or to hand measurements to the streaming process)
+    stream_target = write_measurements if stream_channel is None else forward_measurements
+    threading.Thread(target=stream_target, daemon=True).start()
+
+
+def stream_measurements(channel):
+    """
+    Entry point of the streaming process in worker mode: merges the windows of updates of every
+    worker into one queue and streams them to Grafana with write_measurements.
+    """
+
+    # forked from the gunicorn master: drop its signal handlers so that SIGTERM stops this process
+    for sig in signal.valid_signals():
+        if callable(signal.getsignal(sig)):
+            signal.signal(sig, signal.SIG_DFL)
+
+    # the Grafana pushes happen here, so this process reports their metrics
+    metrics_directory.start()
+    threading.Thread(target=write_measurements, daemon=True).start()
+    while True:
+        stream_queue.put_many(channel.get().items())
+
+
+"""
+Worker mode: forks the one process streaming to Grafana. Called by the gunicorn master before it
+forks the workers, so that they inherit the queue to it, and again by the master if the streaming
+process dies (the new one reads the same queue). (A plain fork: the workers must not inherit
+a multiprocessing.Process, which they would terminate when they exit.)
+
+Parameters:
+    None
+
+Returns:
+    int - pid of the streaming process
+"""
+def start_stream_process() -> int:
+    global stream_channel
+    if stream_channel is None:
+        stream_channel = multiprocessing.Queue(maxsize=STREAM_CHANNEL_SIZE)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            stream_measurements(stream_channel)
+        finally:
+            os._exit(1)
+    return pid
+
+
+"""
+Worker mode: starts the background work of a forked worker. The compiled DBC is inherited from the
+master; the InfluxDB client and point buffer are created per worker.
+
+Parameters:
+    None
+
+Returns:
+    None
+"""
+def start_worker():
+    global influx_writer
+    influx_writer = create_influx_writer()
+    metrics_directory.start()
+    atexit.register(metrics_directory.write)
+    start_background_work()
 
 
-# create thread to write to InfluxDB and stream to Grafana
-threading.Thread(target=write_measurements, daemon=True).start()
+if not PRELOADED:
+    start_background_work()
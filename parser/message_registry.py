@@ -0,0 +1,81 @@
+from typing import Dict, List, Optional, Tuple
+
+
+"""
+Registry of message classes for create_message. Every message class registers the frame lengths
+it accepts (and optionally a marker that identifies its frames) with the register_message
+decorator when its module is imported. The registry is a table indexed by frame length, so routing a
+frame is one list index instead of a chain of length checks.
+
+A marker is only checked when more than one class accepts the frame's length. A frame with a single
+candidate is always handed to that class, so a misframed frame fails with that class's
+more specific ParseError instead of a generic one.
+"""
+
+# frame length -> [(marker offset, marker, class), ...] in registration order
+_BY_LENGTH: List[List[Tuple[int, Optional[bytes], type]]] = []
+
+# message type name -> class
+_BY_TYPE: Dict[str, type] = {}
+
+
+"""
+Class decorator that registers a message class for the frame lengths it accepts
+
+Parameters:
+    type_name: the message type (matches the class's self.type, Ex. "CAN")
+    length_min: shortest frame the class accepts
+    length_max: longest frame the class accepts
+    marker: bytes that every frame of the class has at marker_offset (Ex. b"#" for CAN)
+    marker_offset: position of the marker in the frame
+
+Returns:
+    decorator that registers the class and returns it unchanged
+"""
+def register_message(type_name: str, length_min: int, length_max: int,
+                     marker: Optional[bytes] = None, marker_offset: int = 0):
+    def decorate(cls):
+        if len(_BY_LENGTH) <= length_max:
+            _BY_LENGTH.extend([] for _ in range(length_max + 1 - len(_BY_LENGTH)))
+        for length in range(length_min, length_max + 1):
+            _BY_LENGTH[length].append((marker_offset, marker, cls))
+        _BY_TYPE[type_name] = cls
+        return cls
+    return decorate
+
+
+"""
+Finds the message class for a raw frame
+
+Parameters:
+    frame: the raw frame as bytes-like data
+
+Returns:
+    the registered class for the frame or None if no class accepts it
+"""
+def message_class_for(frame) -> Optional[type]:
+    length = len(frame)
+    if length >= len(_BY_LENGTH):
+        return None
+
+    candidates = _BY_LENGTH[length]
+    if len(candidates) == 1:
+        return candidates[0][2]
+
+    for marker_offset, marker, cls in candidates:
+        if marker is None or frame[marker_offset:marker_offset + len(marker)] == marker:
+            return cls
+    return None
+
+
+"""
+Gets every registered message class
+
+Parameters:
+    None
+
+Returns:
+    dict - message type name -> class
+"""
+def registered_messages() -> Dict[str, type]:
+    return dict(_BY_TYPE)
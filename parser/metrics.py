@@ -0,0 +1,341 @@
+import bisect
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+
+"""
+Minimal Prometheus metrics for the parser (text exposition format 0.0.4, served by /api/v1/metrics).
+Counters and histograms are updated in place by the parse path; gauges are read from a callback
+only when the metrics are rendered, so components that already keep statistics (the InfluxDB
+writer, the stream queue, the decode cache, ...) are exported without extra bookkeeping.
+
+Metrics are rendered from a snapshot (a JSON-able list with one dict per metric: name, help, kind,
+label_names, aggregate, buckets and series). Snapshots of several processes can be merged, which is
+how the gunicorn workers and the streaming process report as one parser (see MetricsDirectory).
+"""
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds; a frame's stages range from microseconds (filters) to seconds (InfluxDB writes)
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            series = [[list(label_values), value] for label_values, value in self._values.items()]
+        return _metric(self.name, self.help, "counter", self.label_names, series)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}          # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+
+    """
+    Records one observation
+
+    Parameters:
+        value - the observed value (Ex. seconds a stage took)
+        label_values - values of the histogram's labels (Ex. the stage name)
+
+    Returns:
+        None
+    """
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            series = [[list(label_values), list(values)] for label_values, values in self._series.items()]
+        return _metric(self.name, self.help, "histogram", self.label_names, series, buckets=list(self.buckets))
+
+
+"""
+Metric read from a callback when the metrics are rendered
+
+Parameters:
+    name - metric name
+    help - description
+    read - returns a number, or a dict of label value -> number (for one label)
+    label_name - name of the label of a dict result
+    kind - "gauge" or "counter"
+    aggregate - how the values of several processes are merged: "sum", "max" or "min" (counters are summed)
+"""
+class CallbackMetric:
+    def __init__(self, name: str, help: str, read: Callable, label_name: str = "", kind: str = "gauge",
+                 aggregate: str = "sum") -> None:
+        self.name = name
+        self.help = help
+        self.read = read
+        self.label_name = label_name
+        self.kind = kind
+        self.aggregate = aggregate
+
+
+    def snapshot(self) -> dict:
+        value = self.read()
+        if isinstance(value, dict):
+            return _metric(self.name, self.help, self.kind, (self.label_name,),
+                           [[[label_value], number] for label_value, number in value.items()], self.aggregate)
+        return _metric(self.name, self.help, self.kind, (), [[[], value]], self.aggregate)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list = []
+
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+    def counter(self, name: str, help: str, label_names: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, label_names))
+
+
+    def histogram(self, name: str, help: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, label_names, buckets))
+
+
+    def gauge(self, name: str, help: str, read: Callable, label_name: str = "", aggregate: str = "sum") -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, read, label_name, "gauge", aggregate))
+
+
+    def counter_callback(self, name: str, help: str, read: Callable, label_name: str = "") -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, read, label_name, "counter"))
+
+
+    def snapshot(self) -> List[dict]:
+        return [metric.snapshot() for metric in self._metrics]
+
+
+    """
+    Renders every metric in the Prometheus text format
+
+    Parameters:
+        None
+
+    Returns:
+        str - the metrics page
+    """
+    def render(self) -> str:
+        return render_snapshot(self.snapshot())
+
+
+def _metric(name: str, help: str, kind: str, label_names: Sequence[str], series: list,
+            aggregate: str = "sum", buckets: Sequence[float] = ()) -> dict:
+    return {"name": name, "help": help, "kind": kind, "label_names": list(label_names),
+            "aggregate": aggregate, "buckets": list(buckets), "series": series}
+
+
+"""
+Renders a snapshot (Registry.snapshot or merge_snapshots) in the Prometheus text format
+
+Parameters:
+    snapshot - list of metric dicts
+
+Returns:
+    str - the metrics page
+"""
+def render_snapshot(snapshot: List[dict]) -> str:
+    lines = []
+    for metric in snapshot:
+        name, label_names = metric["name"], tuple(metric["label_names"])
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        for label_values, value in metric["series"]:
+            label_values = tuple(label_values)
+            if metric["kind"] != "histogram":
+                lines.append(f"{name}{_labels(label_names, label_values)} {value}")
+                continue
+
+            cumulative = 0
+            for bound, count in zip(tuple(metric["buckets"]) + ("+Inf",), value):
+                cumulative += count
+                labels = _labels(label_names + ("le",), label_values + (str(bound),))
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+            labels = _labels(label_names, label_values)
+            lines.append(f"{name}_sum{labels} {value[-1]}")
+            lines.append(f"{name}_count{labels} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+"""
+Merges the snapshots of several processes into one: series with the same labels are summed
+(histograms bucket by bucket), or combined with max/min for gauges that say so
+
+Parameters:
+    snapshots - list of snapshots (Registry.snapshot)
+
+Returns:
+    list of metric dicts, in the order the metrics first appear
+"""
+def merge_snapshots(snapshots: List[List[dict]]) -> List[dict]:
+    merged: Dict[str, dict] = {}
+    series: Dict[str, dict] = {}
+    for snapshot in snapshots:
+        for metric in snapshot:
+            name = metric["name"]
+            if name not in merged:
+                merged[name] = dict(metric)
+                series[name] = {}
+            combine = {"max": max, "min": min}.get(metric["aggregate"]) if metric["kind"] == "gauge" else None
+
+            for label_values, value in metric["series"]:
+                key = tuple(label_values)
+                current = series[name].get(key)
+                if current is None:
+                    series[name][key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    series[name][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    series[name][key] = combine(current, value) if combine is not None else current + value
+
+    for name, metric in merged.items():
+        metric["series"] = [[list(key), value] for key, value in series[name].items()]
+    return list(merged.values())
+
+
+"""
+Metrics of several processes of one parser (the gunicorn workers and the streaming process, see
+parser/gunicorn.conf.py), which would otherwise each report only their own counters. Every process
+writes a snapshot of its registry to <path>/<pid>.json every `interval` seconds, and render() merges
+the latest snapshot of every process with the live metrics of the process that serves the scrape.
+
+The snapshots of processes that exited are kept for their counters and histograms, so totals do not
+go down when a worker is restarted; their gauges are left out.
+
+Parameters:
+    path - folder of the snapshots (shared by the processes, created by start)
+    registry - the metrics of this process
+    interval - seconds between snapshots
+    log - called with a message when a snapshot cannot be written
+"""
+class MetricsDirectory:
+    def __init__(self, path: str, registry: Registry, interval: float = 1.0, log: Callable[[str], None] = print) -> None:
+        self.path = Path(path)
+        self.registry = registry
+        self.interval = interval
+        self.log = log
+        self._stop = threading.Event()
+
+
+    """
+    Starts writing snapshots of this process (call it in every process, after the fork)
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    def start(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        threading.Thread(target=self._run, daemon=True).start()
+
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+    def write(self) -> None:
+        pid = os.getpid()
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.path, prefix=f".{pid}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as temp_file:
+                    json.dump(self.registry.snapshot(), temp_file)
+                os.replace(temp_path, self.path / f"{pid}.json")
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            self.log(f"Unable to write metrics snapshot to \"{self.path}\": {e}")
+
+
+    """
+    Renders the merged metrics of every process in the Prometheus text format
+
+    Parameters:
+        None
+
+    Returns:
+        str - the metrics page
+    """
+    def render(self) -> str:
+        pid = os.getpid()
+        snapshots = [self.registry.snapshot()]
+        for snapshot_file in self.path.glob("*.json"):
+            if not snapshot_file.stem.isdigit() or snapshot_file.stem == str(pid):
+                continue
+            try:
+                snapshot = json.loads(snapshot_file.read_text())
+            except (OSError, ValueError):
+                continue
+            if not _process_alive(int(snapshot_file.stem)):
+                snapshot = [metric for metric in snapshot if metric["kind"] != "gauge"]
+            snapshots.append(snapshot)
+        return render_snapshot(merge_snapshots(snapshots))
+
+
+    def remove(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.write()
+            self._stop.wait(self.interval)
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
@@ -1,6 +1,11 @@
 import cantools
+import struct
 from pathlib import Path
+from typing import Union
 import sys    
+from parser.can_decoder import DecoderTable
+from parser.dbc_watcher import DbcHandle, DbcSource
+from parser.parse_errors import ParseError, ParseErrorCode, failure_counts
 
 #  <----- Multi-Class Functions  ----->
 """
@@ -22,6 +27,35 @@ def generate_exception(e: Exception, func_name: str) -> Exception:
     )
 
 
+"""
+Gets a raw frame as bytes-like data. Frames are passed around as bytes (or a bytearray/memoryview
+slice of a larger buffer) end to end; only callers at a text boundary (Ex. the JSON body of a
+parser request) still hold a latin-1 string, which is encoded exactly once here.
+
+Parameters:
+    message: the raw frame as bytes, bytearray, memoryview or latin-1 string
+
+Returns:
+    The frame as bytes-like data (not copied unless it was a string)
+"""
+def as_frame(message: Union["Frame", str]) -> "Frame":
+    if isinstance(message, str):
+        return message.encode('latin-1')
+    return message
+
+
+#  <----- Raw frame layouts ----->
+Frame = Union[bytes, bytearray, memoryview]
+
+# CAN: TTTTTTTT#IIIIDDDDDDDDL -> timestamp (double), '#', identifier (uint32), data (8 bytes). L (data length) is unused
+CAN_FRAME           = struct.Struct(">dcI8s")
+CAN_FRAME_MARKER    = b"#"
+
+# IMU: TTTTTTTT@IIFFFF -> timestamp (double), '@', identifier (2 chars), value (float)
+IMU_FRAME           = struct.Struct(">dc2sf")
+IMU_FRAME_MARKER    = b"@"
+
+
 #  <----- Lengths of messages for differentiating message types ----->
 CAN_LENGTH_MIN      = 21
 CAN_LENGTH_MAX      = 25
@@ -36,7 +70,76 @@ DBC_FILE = Path("./dbc/brightside.dbc")
 if not DBC_FILE.is_file():
     print(f"Unable to find expected existing DBC file: \"{DBC_FILE.absolute()}\"")
     sys.exit(1)
-CAR_DBC = cantools.database.load_file(DBC_FILE)
+
+# Number of (frame ID, payload) decodes kept for repeated CAN frames. 0 disables the cache
+DECODE_CACHE_SIZE   = 4096
+
+# Seconds between checks of DBC_FILE for changes when watching it (see DBC_SOURCE.start_watching)
+DBC_POLL_INTERVAL   = 2.0
+
+# Loaded from the compiled snapshot in dbc/.cache (see parser/dbc_cache.py). CAR_DBC always
+# refers to the latest version of the DBC; it is replaced when DBC_SOURCE reloads or switches files
+DBC_SOURCE = DbcSource(DBC_FILE, DECODE_CACHE_SIZE)
+CAR_DBC = DBC_SOURCE.current().dbc
+
+
+def _on_dbc_swap(handle: DbcHandle) -> None:
+    global CAR_DBC
+    CAR_DBC = handle.dbc
+
+DBC_SOURCE.add_listener(_on_dbc_swap)
+
+
+"""
+Gets the current version of the DBC. Code that decodes a frame (or a batch of frames) should get
+the handle once and use it for the whole decode so a reload in the middle can not mix versions.
+
+Parameters:
+    None
+
+Returns:
+    DbcHandle with the cantools database, its decoder table and its version
+"""
+def get_dbc_handle() -> DbcHandle:
+    return DBC_SOURCE.current()
+
+
+"""
+Gets the precompiled decoder table for the current DBC. Its decode cache holds up to
+DECODE_CACHE_SIZE payloads and is replaced along with the table when the DBC changes.
+
+Parameters:
+    None
+
+Returns:
+    DecoderTable mapping each frame ID in CAR_DBC to its FrameDecoder
+"""
+def get_decoder_table() -> DecoderTable:
+    return DBC_SOURCE.current().decoders
+
+
+"""
+Switches to another DBC file (Ex. link_telemetry's --dbc option)
+
+Parameters:
+    dbc_file: path of the DBC file
+
+Returns:
+    None
+"""
+def use_dbc_file(dbc_file: Path) -> None:
+    global DBC_FILE
+    DBC_FILE = Path(dbc_file)
+    DBC_SOURCE.switch(DBC_FILE)
+
+
+# <----- Deadband (change detection) before InfluxDB writes. See parser/deadband.py ----->
+# A signal is written when it moves by more than its deadband (0 = any change) ...
+DEADBAND_DEFAULT        = 0.0
+# ... or when it has not been written for this many seconds (heartbeat)
+DEADBAND_MAX_SILENCE    = 10.0
+# Per-signal deadbands: "Measurement" or "Class.Measurement" -> deadband
+DEADBAND_SIGNALS        = {}
 
 
 # <----- \ANSI SEQUENCES ----->
@@ -0,0 +1,91 @@
+import threading
+from enum import IntEnum
+from typing import Callable, Dict, Optional
+
+
+"""
+Reasons a raw frame could not be parsed. Sent back to clients as "error_code" (the name)
+and counted per reason (see failure_counts).
+"""
+class ParseErrorCode(IntEnum):
+    INVALID_LENGTH  = 1     # no message type has frames of this length
+    MALFORMED_FRAME = 2     # frame could not be unpacked or its marker byte is wrong
+    UNKNOWN_ID      = 3     # CAN id is not in the DBC
+    DECODE_FAIL     = 4     # the DBC could not decode the payload
+    INVALID_ID      = 5     # IMU id is not one of A/G + X/Y/Z
+    NO_MATCH        = 6     # GPS text did not match the expected format
+
+
+_failure_counts = [0] * (max(ParseErrorCode) + 1)
+_failure_lock = threading.Lock()
+
+
+"""
+Raised when a raw frame can not be parsed. Creating one only stores the code and a short detail,
+so undecodable frames on a noisy link are cheap. The verbose diagnostic text (ANSI colours, hex
+dumps of the frame, the steps of the failing message class) is only built the first time the
+error is turned into a string, i.e. when someone logs or displays it.
+
+Fields:
+    code: ParseErrorCode of the failure
+    detail: short description of what went wrong
+    message_type: type of message that failed (Ex. "CAN"), None if no type matched the frame
+    frame: the raw frame that failed
+"""
+class ParseError(Exception):
+    def __init__(self, code: ParseErrorCode, detail: str) -> None:
+        super().__init__(detail)
+        self.code = code
+        self.detail = detail
+        self.message_type: Optional[str] = None
+        self.frame = None
+        self._describe: Optional[Callable[["ParseError"], str]] = None
+        self._text: Optional[str] = None
+
+        with _failure_lock:
+            _failure_counts[code] += 1
+
+
+    """
+    Attaches the failing frame and a function that builds the verbose text for it
+
+    Parameters:
+        message_type - type of message that failed (Ex. "CAN")
+        frame - the raw frame
+        describe - called with this error to build the verbose text (only when it is needed)
+
+    Returns:
+        this error, so it can be re-raised with `raise e.attach(...)`
+    """
+    def attach(self, message_type: str, frame, describe: Optional[Callable[["ParseError"], str]] = None) -> "ParseError":
+        self.message_type = message_type
+        self.frame = frame
+        self._describe = describe
+        return self
+
+
+    @property
+    def summary(self) -> str:
+        if self.message_type is None:
+            return f"{self.code.name}: {self.detail}"
+        return f"{self.message_type} {self.code.name}: {self.detail}"
+
+
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = self._describe(self) if self._describe is not None else self.summary
+        return self._text
+
+
+"""
+Number of parse failures per reason since the process started
+
+Parameters:
+    None
+
+Returns:
+    dict - ParseErrorCode name -> count (only reasons that happened)
+"""
+def failure_counts() -> Dict[str, int]:
+    with _failure_lock:
+        return {code.name: _failure_counts[code] for code in ParseErrorCode if _failure_counts[code]}
@@ -1,10 +1,9 @@
 import random
-import struct
 import time
 from datetime import timedelta
 
 # Get format specifiers
-from parser.parameters import CAR_DBC
+from parser.parameters import CAR_DBC, CAN_FRAME, CAN_FRAME_MARKER, IMU_FRAME, IMU_FRAME_MARKER
 
 # Constants
 SECONDS_IN_DAY = 86400
@@ -21,20 +20,20 @@ class RandomMessage:
         message_types - list of message types to choose from (the randomList arg in parser)
         
     Returns:
-        string - random message of a random type as a string with latin-1 decoding
+        bytes - random message of a random type as a raw frame
     """
-    def random_message_str(self, message_types) -> str:
+    def random_message_bytes(self, message_types) -> bytes:
         """
         Randomly selects a message type from the provided list and returns a random message of that type.
         """
 
         message_type = random.choice(message_types).upper()  # Convert to uppercase
         if message_type == 'CAN':
-            return self.random_can_str()
+            return self.random_can_bytes()
         elif message_type == 'GPS':
-            return self.random_gps_str()
+            return self.random_gps_bytes()
         elif message_type == 'IMU':
-            return self.random_imu_str()
+            return self.random_imu_bytes()
 
     """
     CREDIT: Mihir .N taken from link_telemetry
@@ -43,16 +42,16 @@ class RandomMessage:
         None
 
     Returns
-        string - random CAN message as string with latin-1 decoding:
-                 "TTTTTTTTIIIIDDDDDDDDL"
+        bytes - random CAN message as a raw frame:
+                 "TTTTTTTT#IIIIDDDDDDDDL"
                     T - timestamp       = 8 bytes
                     I - identifier      = 4 bytes
                     D - data            = 8 bytes
                     L - data length     = 1 byte
     """
-    def random_can_str(self) -> str:
+    def random_can_bytes(self) -> bytes:
         """
-        Generates a random string (which represents a CAN message) that mimics
+        Generates a random frame (which represents a CAN message) that mimics
         the format sent over by the telemetry board over radio. This function
         is useful when debugging the telemetry system.
         """
@@ -62,30 +61,15 @@ class RandomMessage:
         for message in CAR_DBC.messages:
             can_ids.append(message.frame_id)
 
-        # Convert current time to a 32 bit unsigned integer to latin-1 string 
-        # Convert current time to float bytes to latin-1 string 
-        current_time = time.time()
-        current_time_bytes = struct.pack('>d', current_time)
-        current_time_str = current_time_bytes.decode('latin-1')
-
-        # random identifier
+        # random identifier and 8 random data bytes
         random_identifier = random.choice(can_ids)
-        random_id_str = random_identifier.to_bytes(4, 'big').decode('latin-1')  # to encoded string
-
-        # random data 8 bytes. Then 2 HEX to ASCII
-        random_data = random.randint(0, pow(2, 64))
-        random_data_str = "{0:0{1}x}".format(random_data, 16)
-        hex_pairs = [random_data_str[i:i+2] for i in range(0, len(random_data_str), 2)] # split into pairs
-        ascii_chars = [chr(int(h, 16)) for h in hex_pairs]  # convert to ASCII
-        random_data_str = ''.join(ascii_chars)  # join into string
+        random_data = random.getrandbits(64).to_bytes(8, 'big')
 
         # fixed data length
-        data_length = "8"
+        data_length = b"8"
 
-        # collect into single string
-        can_str = current_time_str + "#" + random_id_str + random_data_str \
-             + data_length
-        return can_str
+        # current time as a 64 bit float, then pack into a single frame
+        return CAN_FRAME.pack(time.time(), CAN_FRAME_MARKER, random_identifier, random_data) + data_length
     
     """
     Returns a random GPS message in NMEA format.
@@ -95,9 +79,9 @@ class RandomMessage:
         None
     
     Returns:
-        string - random GPS message in NMEA format as a string with latin-1 decoding
+        bytes - random GPS message in NMEA format as a raw frame
     """
-    def random_gps_str(self) -> str:
+    def random_gps_bytes(self) -> bytes:
         latitude = random.uniform(-90, 90)
         latSide = 'S' if latitude < 0 else 'N'
         longitude = random.uniform(-180, 180)
@@ -119,7 +103,7 @@ class RandomMessage:
             satelliteCount, fix,
             lastMeasure)
 
-        return nmea_msg
+        return nmea_msg.encode('latin-1')
 
     """
     Returns a random IMU message in the format:
@@ -128,30 +112,20 @@ class RandomMessage:
         None
     
     Returns:
-        string - random IMU message in the format as a string with latin-1 decoding:
+        bytes - random IMU message as a raw frame in the format:
                  "TTTTTTTT@IIFFFF"
                     T - timestamp       = 8 bytes
                     I - identifier      = 2 bytes
                     F - data            = 4 bytes
     """
-    def random_imu_str(self) -> str:
-        # Convert current time to float bytes to latin-1 string 
-        current_time = time.time()
-        current_time_bytes = struct.pack('>d', current_time)
-        current_time_str = current_time_bytes.decode('latin-1')
-
-
+    def random_imu_bytes(self) -> bytes:
         # Generate a random identifier
-        types = ['A', 'G']
-        dimensions = ['X', 'Y', 'Z']
+        types = [b'A', b'G']
+        dimensions = [b'X', b'Y', b'Z']
         identifier = random.choice(types) + random.choice(dimensions)
 
         # Generate a random value
         value = random.uniform(-1000, 1000)
-        value_bytes = struct.pack('>f', value)
-
-        # Combine all parts into a single bytes object
-        imu_bytes = current_time_str + "@" + identifier + value_bytes.decode('latin-1')
 
-        return imu_bytes
-    
\ No newline at end of file
+        # current time as a 64 bit float, then pack into a single frame
+        return IMU_FRAME.pack(time.time(), IMU_FRAME_MARKER, identifier, value)
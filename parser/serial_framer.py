@@ -0,0 +1,103 @@
+import re
+from collections import Counter
+from typing import List
+
+from parser.parameters import CAN_FRAME_MARKER, IMU_FRAME_MARKER
+
+
+"""
+Splits the byte stream of the radio (serial port) into frames. The TEL board sends every frame
+followed by b"\r\n":
+
+    CAN     22 bytes, '#' at offset 8   TTTTTTTT#IIIIDDDDDDDDL
+    IMU     15 bytes, '@' at offset 8   TTTTTTTT@IIFFFF
+    GPS     198 bytes of text           Latitude: ... (printable ASCII, NUL bytes are accepted as padding)
+
+Frames are recognized by their length, marker and terminator at the current position instead of
+by splitting on b"\r\n", because the binary CAN and IMU payloads can contain b"\r\n" themselves.
+When nothing matches (garbage, a dropped byte, ...) the framer resyncs: it discards one byte at a
+time until a frame matches again, so the first frame after garbage is kept even if no b"\r\n"
+separates them. Discarded bytes are counted, and every run of them is one misframe.
+
+Chunks can end anywhere (Ex. in the middle of a frame or between b"\r" and b"\n"); the incomplete
+end of a chunk is kept until the next one. Frames are returned with their terminator, which is how
+the parser expects them (see the CAN/IMU/GPS lengths in parser/parameters.py).
+"""
+
+TERMINATOR = b"\r\n"
+MARKER_OFFSET = 8
+
+# (type, payload length, marker at MARKER_OFFSET or None for text frames)
+SERIAL_FRAMES = (
+    ("CAN", 22, CAN_FRAME_MARKER),
+    ("IMU", 15, IMU_FRAME_MARKER),
+    ("GPS", 198, None),
+)
+
+# size of a frame (with its terminator) -> type
+FRAME_TYPES = {length + len(TERMINATOR): frame_type for frame_type, length, _ in SERIAL_FRAMES}
+MAX_FRAME_SIZE = max(FRAME_TYPES)
+
+
+def _frame_pattern(length: int, marker) -> bytes:
+    if marker is None:
+        return rb"[\x00\x20-\x7e]{%d}\r\n" % length
+    return rb".{%d}%s.{%d}\r\n" % (MARKER_OFFSET, re.escape(marker), length - MARKER_OFFSET - len(marker))
+
+# one group around every frame: split() returns [bytes before frame 1, frame 1, ..., bytes after the last frame].
+# The regex engine tries the frames at every byte, which is the resync (in C rather than a Python loop)
+FRAME_REGEX = re.compile(b"(" + b"|".join(b"(?:" + _frame_pattern(length, marker) + b")"
+                                           for _, length, marker in SERIAL_FRAMES) + b")", re.DOTALL)
+
+
+class SerialFramer:
+    def __init__(self) -> None:
+        self._rest = b""                               # incomplete end of the previous chunks
+
+        self.frames = {frame_type: 0 for frame_type, _, _ in SERIAL_FRAMES}
+        self.discarded_bytes = 0
+        self.misframes = 0
+        self._resyncing = False
+
+
+    """
+    Adds a chunk read from the serial port
+
+    Parameters:
+        data - the bytes read
+
+    Returns:
+        list of the complete frames (bytes, with their terminator) in the order they arrived
+    """
+    def feed(self, data: bytes) -> List[bytes]:
+        parts = FRAME_REGEX.split(self._rest + bytes(data))
+        frames = parts[1::2]
+        gaps = parts[0:-1:2]
+        rest = parts[-1]
+
+        # a frame can only start in the last MAX_FRAME_SIZE - 1 bytes of the rest (it would have matched otherwise)
+        cut = len(rest) - (MAX_FRAME_SIZE - 1)
+        if cut > 0:
+            gaps.append(rest[:cut])
+            rest = rest[cut:]
+        self._rest = rest
+
+        discarded = sum(map(len, gaps))
+        if discarded:
+            self.discarded_bytes += discarded
+            # a run of discarded bytes continued from the previous chunk is the same misframe
+            self.misframes += sum(1 for gap in gaps if gap) - (1 if self._resyncing and gaps[0] else 0)
+        self._resyncing = cut > 0
+
+        for size, count in Counter(map(len, frames)).items():
+            self.frames[FRAME_TYPES[size]] += count
+        return frames
+
+
+    def stats(self) -> dict:
+        return {
+            "frames": dict(self.frames),
+            "discarded_bytes": self.discarded_bytes,
+            "misframes": self.misframes,
+            "buffered": len(self._rest),
+        }
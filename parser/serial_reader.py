@@ -0,0 +1,126 @@
+import queue
+import threading
+from typing import Callable, Optional
+
+
+"""
+Reads the serial port (radio) on a dedicated thread. The thread only drains the port: every read
+takes all the bytes the port has waiting (in_waiting, at least 1) and puts them in a bounded queue.
+Framing and sending to the parser happen on the consumer thread (see read()), so a slow consumer
+can no longer leave bytes piling up in the OS buffer of the UART until it overflows.
+
+If the consumer falls so far behind that the queue is full, the new chunk is dropped (an overflow)
+rather than blocking the reader. The framer resyncs after the gap (see parser/serial_framer.py).
+The high-water mark is the most chunks that were ever waiting in the queue.
+
+Parameters:
+    ser - an open serial.Serial (anything with read() and in_waiting)
+    max_chunks - most chunks waiting in the queue
+    log - called with a message when reading fails
+"""
+class SerialReader:
+    def __init__(self, ser, max_chunks: int = 1024, log: Callable[[str], None] = print) -> None:
+        self.ser = ser
+        self.log = log
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=max_chunks)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[Exception] = None      # error that stopped the reader thread
+        self._failed = False                        # the consumer got to the error
+
+        self.bytes_read = 0
+        self.high_water = 0
+        self.overflows = 0
+        self.dropped_bytes = 0
+
+
+    """
+    Starts the reader thread (once)
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        self._stop.set()
+        # unblock a read waiting for bytes (not every port supports it)
+        cancel_read = getattr(self.ser, "cancel_read", None)
+        if cancel_read is not None:
+            cancel_read()
+
+
+    """
+    Takes every chunk waiting in the queue
+
+    Parameters:
+        timeout - seconds to wait for a chunk (None waits forever)
+
+    Returns:
+        bytes - the chunks in the order they were read (empty if the timeout passed)
+
+    Raises:
+        the error that stopped the reader thread (Ex. the port was unplugged)
+    """
+    def read(self, timeout: Optional[float] = None) -> bytes:
+        if self._failed:
+            raise self.error
+        try:
+            chunks = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return b""
+        while True:
+            try:
+                chunks.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        # None is put after the last chunk when reading failed: return the chunks, then raise
+        if chunks[-1] is None:
+            self._failed = True
+            chunks.pop()
+            if not chunks:
+                raise self.error
+        return b"".join(chunks)
+
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "high_water": self.high_water,
+            "overflows": self.overflows,
+            "dropped_bytes": self.dropped_bytes,
+            "bytes_read": self.bytes_read,
+        }
+
+
+    def _run(self) -> None:
+        ser = self.ser
+        while not self._stop.is_set():
+            try:
+                chunk = ser.read(ser.in_waiting or 1)
+            except Exception as e:
+                if not self._stop.is_set():
+                    self.log(f"Unable to read from serial port: {e}")
+                    self.error = e
+                    self._queue.put(None)
+                return
+
+            if not chunk:
+                continue
+            self.bytes_read += len(chunk)
+            try:
+                self._queue.put_nowait(chunk)
+            except queue.Full:
+                self.overflows += 1
+                self.dropped_bytes += len(chunk)
+            else:
+                self.high_water = max(self.high_water, self._queue.qsize())
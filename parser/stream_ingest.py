@@ -0,0 +1,256 @@
+import json
+import threading
+import time
+import msgpack
+
+from collections import OrderedDict
+from typing import Callable, Dict, Union
+
+from websockets.sync.client import connect
+
+from parser.bulk_frames import check_list_options, pack_frames, unpack_frames, LIST_OPTIONS
+
+
+"""
+WebSocket ingest protocol (/api/v1/stream, /api/v1/stream/write/debug, /api/v1/stream/write/production).
+One authenticated connection carries a whole radio session instead of one HTTP request per frame:
+
+    client -> parser    text: JSON options, Ex. {"live_filters": ["CAN"], "log_filters": ["NONE"]}
+                        (any time; applies to the frames sent after it)
+    client -> parser    binary: a batch of frames in the bulk format (see parser/bulk_frames.py)
+    parser -> client    binary: msgpack ack of every message, in order. Batches are answered with the
+                        ack summary of the bulk endpoints plus "seq" (1 for the first batch, ...);
+                        options with {"options": {...}}; bad messages with {"error": "..."}
+
+The acks are the flow control: the client keeps at most `window` batches unacknowledged, and sends
+them again on its next connection if the connection breaks first (see StreamClient).
+"""
+
+STREAM_PATH = "/stream"
+
+
+"""
+Parser side of one ingest connection. Used by the Flask (flask-sock) and aiohttp servers.
+
+Parameters:
+    bucket - bucket suffix ("_test" or "_prod") or None to only parse
+    process_frames - called with (frames, bucket, live_filters, log_filters, display_filters) and
+                     returns the ack summary of a batch (ack_responses in parser/main.py)
+"""
+class StreamSession:
+    def __init__(self, bucket, process_frames: Callable[..., dict]) -> None:
+        self.bucket = bucket
+        self.process_frames = process_frames
+        self.seq = 0
+        self.options = {
+            "live_filters": ["ALL"] if bucket is None else ["NONE"],
+            "log_filters": ["NONE"],
+            "display_filters": ["NONE"],
+        }
+
+
+    """
+    Handles one message of the client
+
+    Parameters:
+        data - text (options) or bytes (a batch of frames)
+
+    Returns:
+        bytes - the msgpack ack to send back
+    """
+    def handle(self, data: Union[str, bytes]) -> bytes:
+        if isinstance(data, str):
+            try:
+                self.configure(json.loads(data))
+            except ValueError as e:
+                return msgpack.packb({"error": f"Invalid options: {e}"})
+            return msgpack.packb({"options": self.options})
+
+        self.seq += 1
+        try:
+            frames = unpack_frames(data)
+        except ValueError as e:
+            return msgpack.packb({"seq": self.seq, "error": str(e)})
+
+        summary = self.process_frames(frames, self.bucket, self.options["live_filters"],
+                                      self.options["log_filters"], self.options["display_filters"])
+        summary["seq"] = self.seq
+        return msgpack.packb(summary)
+
+
+    def configure(self, options) -> None:
+        if not isinstance(options, dict):
+            raise ValueError("options must be a JSON object")
+        check_list_options(options)
+        for key in LIST_OPTIONS:
+            if key in options:
+                self.options[key] = options[key]
+
+
+"""
+Client side of an ingest connection (used by link_telemetry --stream). send() blocks while `window`
+batches are unacknowledged; acks are read by a background thread and passed to on_reply. A broken
+connection is reopened by the next send().
+
+Delivery is at least once: the unacknowledged batches are kept and sent again, in order, on the
+next connection. A batch the parser processed but whose ack was lost is therefore written twice
+(same points, so InfluxDB keeps one). Batches are only lost when they cannot be sent at all (the
+parser is unreachable or a full window is not acked within ack_timeout), or when they are still
+unacknowledged at close(); every one of them is counted in lost_batches.
+
+Parameters:
+    url - ws:// URL of the stream endpoint
+    headers - HTTP headers of the handshake (the bearer token)
+    options - filters sent at the start of every connection
+    on_reply - called with every decoded ack
+    window - most batches in flight
+    ack_timeout - seconds to wait for an ack when the window is full (and for the last acks at close)
+"""
+class StreamClient:
+    def __init__(self, url: str, headers: Dict[str, str], options: dict, on_reply: Callable[[dict], None],
+                 window: int = 8, ack_timeout: float = 10.0, log: Callable[[str], None] = print,
+                 connect: Callable = connect) -> None:
+        self.url = url
+        self.headers = headers
+        self.options = options
+        self.on_reply = on_reply
+        self.window = window
+        self.ack_timeout = ack_timeout
+        self.log = log
+        self._connect = connect
+
+        self._websocket = None
+        self._unacked: "OrderedDict[int, bytes]" = OrderedDict()     # seq on the connection -> packed batch
+        self._next_seq = 1
+        self._retry_at = 0.0
+        # one sender at a time so batches go out in seq order (reentrant: link_telemetry's sigint
+        # handler sends the last frames on the main thread, which may be in send() already)
+        self._send_lock = threading.RLock()
+        # guards the connection and _unacked; only held briefly since the receiver thread needs it
+        self._state = threading.Condition()
+
+        self.sent_batches = 0
+        self.resent_batches = 0
+        self.lost_batches = 0
+
+
+    """
+    Sends a batch of raw frames
+
+    Parameters:
+        frames - list of raw frames
+
+    Returns:
+        True if the batch was sent (its ack arrives through on_reply, or it is sent again after a reconnect)
+    """
+    def send(self, frames: list) -> bool:
+        batch = pack_frames(frames)
+        with self._send_lock:
+            if self._websocket is None and not self._open():
+                self.lost_batches += 1
+                return False
+
+            with self._state:
+                # flow control: wait for an ack if `window` batches are in flight (waiting releases
+                # _state, so the receiver can take acks and drop a dead connection meanwhile)
+                has_slot = self._state.wait_for(lambda: self._websocket is None or len(self._unacked) < self.window,
+                                                timeout=self.ack_timeout)
+                websocket = self._websocket
+                if has_slot and websocket is not None:
+                    self._unacked[self._next_seq] = batch
+                    self._next_seq += 1
+
+            if websocket is None:
+                self.lost_batches += 1
+                return False
+            if not has_slot:
+                self.log(f"No ack from the parser in {self.ack_timeout}s, reconnecting")
+                self._drop(websocket)
+                self.lost_batches += 1
+                return False
+
+            self.sent_batches += 1
+            try:
+                websocket.send(batch)
+            except Exception as e:
+                # the batch stays unacknowledged and is sent again on the next connection
+                self.log(f"Unable to stream frames to {self.url}: {e}")
+                self._drop(websocket)
+            return True
+
+
+    """
+    Waits (up to ack_timeout) for the batches in flight to be acknowledged and closes the connection.
+    The batches still unacknowledged are counted as lost.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    def close(self) -> None:
+        with self._state:
+            self._state.wait_for(lambda: self._websocket is None or not self._unacked, timeout=self.ack_timeout)
+            websocket = self._websocket
+            self.lost_batches += len(self._unacked)
+            self._unacked.clear()
+        if websocket is not None:
+            self._drop(websocket)
+
+
+    # opens a connection and sends the batches left unacknowledged by the previous one (send_lock held)
+    def _open(self) -> bool:
+        if time.monotonic() < self._retry_at:
+            return False
+        try:
+            websocket = self._connect(self.url, additional_headers=self.headers)
+            websocket.send(json.dumps(self.options))
+        except Exception as e:
+            self._retry_at = time.monotonic() + 1.0
+            self.log(f"Unable to open stream to {self.url}: {e}")
+            return False
+
+        # the parser numbers the batches of every connection from 1
+        with self._state:
+            pending = list(self._unacked.values())
+            self._unacked = OrderedDict(enumerate(pending, start=1))
+            self._next_seq = len(pending) + 1
+            self._websocket = websocket
+        threading.Thread(target=self._receive, args=(websocket,), daemon=True).start()
+
+        try:
+            for batch in pending:
+                websocket.send(batch)
+        except Exception as e:
+            self.log(f"Unable to stream frames to {self.url}: {e}")
+            self._drop(websocket)
+            return False
+        self.resent_batches += len(pending)
+        return True
+
+
+    def _receive(self, websocket) -> None:
+        try:
+            for message in websocket:
+                reply = msgpack.unpackb(message, raw=False)
+                if "seq" in reply:
+                    with self._state:
+                        if self._websocket is websocket:
+                            self._unacked.pop(reply["seq"], None)
+                            self._state.notify_all()
+                self.on_reply(reply)
+        except Exception as e:
+            self.log(f"Stream to {self.url} closed: {e}")
+        self._drop(websocket)
+
+
+    def _drop(self, websocket) -> None:
+        with self._state:
+            if self._websocket is websocket:
+                self._websocket = None
+                self._state.notify_all()
+        try:
+            websocket.close()
+        except Exception:
+            pass
@@ -1,9 +1,12 @@
 # Parameter imports. ADD AND REMOVE AS NEEDED
 from parser.parameters import *
+from parser.message_registry import register_message
+from parser.data_classes.Message_Data import MessageData, FrameSchema, ParsedFrame
 
 
 """
-<MESSAGE_NAME> message wrapper class. <MESSAGE_NAME>.data[''] fields are:
+<MESSAGE_NAME> message wrapper class. The parsed frame is stored in <MESSAGE_NAME>.record (a ParsedFrame)
+and <MESSAGE_NAME>.data[''] is a dict view of it with fields:
 
 (See 'CAN_Msg.py', 'GPS_Msg.py', or 'IMU_Msg.py' for example)
 
@@ -21,20 +24,37 @@ DIPSLAY FIELDS
 
 self.type = "<MESSAGE_NAME>"
 """
+# Frame lengths (add <MESSAGE_NAME>_LENGTH_MIN/MAX to parameters.py) and an optional marker that
+# tells this type apart from others of the same length. Import the class in create_message.py
+@register_message("<MESSAGE_NAME>", <MESSAGE_NAME>_LENGTH_MIN, <MESSAGE_NAME>_LENGTH_MAX)
 class MESSAGE_NAME:
-    def __init__(self, message: str) -> None:      
+    __slots__ = ("message", "record", "type", "_data", "_display_data")
+
+    def __init__(self, message: Frame) -> None:      
         """
-        In general, the init should set the data dictionary 
-        based on parsing the message string. The type should be set to the name of the message.
+        In general, the init should set the record (a ParsedFrame)
+        based on parsing the raw frame (bytes-like). The type should be set to the name of the message.
         
         See 'CAN_Msg.py', 'GPS_Msg.py' and 'IMU_Msg.py' for good working examples.
         """
 
-        self.message = message
-        self.data = self.extract_measurements()
+        self.message = as_frame(message)
+        self._data = None
+        self._display_data = None
+        self.record = self.extract_measurements()
         self.type = "<MESSAGE_NAME>"
 
 
+    """
+    Dict view of the record. Only built when something asks for it.
+    """
+    @property
+    def data(self) -> MessageData:
+        if self._data is None:
+            self._data = MessageData(self, self.record.as_dict())
+        return self._data
+
+
     """
     <REPLACE_THIS> Gets example data
     
@@ -45,10 +65,10 @@ class MESSAGE_NAME:
         <REPLACE_THIS> None
     """
     def get_example_data(self):
-        try:
-            return 0
-        except Exception as e:
-            generate_exception(e, "get_example_data")
+        # raise ParseError (see parser/parse_errors.py) with the closest ParseErrorCode if the frame is invalid
+        if len(self.message) == 0:
+            raise ParseError(ParseErrorCode.MALFORMED_FRAME, "get_example_data: empty message")
+        return 0
 
 
     """
@@ -60,32 +80,55 @@ class MESSAGE_NAME:
         None
         
     Returns:
-        dictionary with the form outlined in the class description above
-    """
-    def extract_measurements(self) -> dict:
-        # Set all fields to None initially
-        example_data = None
+        ParsedFrame of the message (build the FrameSchema once and share it between frames)
 
+    Raises:
+        ParseError whose verbose text (see describe_failure) is only built if it is displayed
+    """
+    def extract_measurements(self) -> ParsedFrame:
         try:
             example_data = self.get_example_data()
-        except Exception as e:
-            raise Exception(
-                f"Could not extract {ANSI_BOLD}<MESSAGE_NAME>{ANSI_ESCAPE} message with properties: \n"
-                f"      Message Length = {len(self.message)} \n"
-                f"      Message Hex Data = {self.message.encode('latin-1').hex()} \n\n"
-                f"      {ANSI_RED}Error{ANSI_ESCAPE}: \n"
-                f"      {e} \n"
-                f"      {ANSI_GREEN}Function Call Details (self.message[] bytes -> hex numbers):{ANSI_ESCAPE} \n"
-                f"        {ANSI_BOLD}get_example_data(){ANSI_ESCAPE}, \n"
-                f"          - gets the example data \n"
-            )
-        
-
-        data = {}
+        except ParseError as e:
+            raise e.attach("<MESSAGE_NAME>", self.message, self.describe_failure)
 
         # SET REQUIRED FIELDS
+        schema = FrameSchema(None, ("<SOURCE>",), ("<CLASS>",), ("<MEASUREMENT>",))
+
+        # DISPLAY FIELDS are built lazily in build_display_data
+        return ParsedFrame(schema, None, (example_data,))
+
+
+    """
+    Builds the verbose diagnostic text of a failed parse. Only called when the error is displayed or logged
+    """
+    def describe_failure(self, error) -> str:
+        return (
+            f"Could not extract {ANSI_BOLD}<MESSAGE_NAME>{ANSI_ESCAPE} message with properties: \n"
+            f"      Message Length = {len(self.message)} \n"
+            f"      Message Hex Data = {self.message.hex()} \n\n"
+            f"      {ANSI_RED}Error{ANSI_ESCAPE} ({error.code.name}): \n"
+            f"      {error.detail} \n"
+            f"      {ANSI_GREEN}Function Call Details (self.message[] bytes -> hex numbers):{ANSI_ESCAPE} \n"
+            f"        {ANSI_BOLD}get_example_data(){ANSI_ESCAPE}, \n"
+            f"          - gets the example data \n"
+        )
+
+
+    """
+    Display fields of the message. Only built when something asks for them
+    (a displayed table, a log filter or the parser API response).
+    """
+    @property
+    def display_data(self) -> dict:
+        if self._display_data is None:
+            self._display_data = self.build_display_data()
+        return self._display_data
+
+
+    def build_display_data(self) -> dict:
+        display_data = {}
 
         # SET DISPLAY FIELDS
 
-        return data
+        return display_data
     
\ No newline at end of file
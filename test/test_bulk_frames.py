@@ -0,0 +1,47 @@
+import msgpack
+import pytest
+
+from parser.bulk_frames import (BULK_CONTENT_TYPE, BULK_MSGPACK_TYPE, decode_bulk_body, pack_frames,
+                                unpack_frames)
+
+# <---- tests ---->
+
+
+class TestBulkFrames:
+    def test_round_trip(self):
+        frames = [b"\x01" * 22, b"\x02" * 15, b"", b"\x03" * 120]
+
+        assert [bytes(frame) for frame in unpack_frames(pack_frames(frames))] == frames
+
+    def test_truncated_body(self):
+        body = pack_frames([b"\x01" * 22])
+
+        with pytest.raises(ValueError):
+            unpack_frames(body[:-1])
+        with pytest.raises(ValueError):
+            unpack_frames(body + b"\x00")
+
+    def test_octet_stream_options(self):
+        body = pack_frames([b"\x01" * 22])
+        frames, options = decode_bulk_body(body, BULK_CONTENT_TYPE, {"live_filters": "CAN,0x401"})
+
+        assert len(frames) == 1
+        assert options["live_filters"] == ["CAN", "0x401"]
+
+    def test_msgpack_bodies(self):
+        frames = [b"\x01" * 22, b"\x02" * 15]
+
+        assert decode_bulk_body(msgpack.packb(frames), BULK_MSGPACK_TYPE, {}) == (frames, {})
+
+        body = msgpack.packb({"frames": frames, "log_filters": ["ALL"]})
+        assert decode_bulk_body(body, BULK_MSGPACK_TYPE, {}) == (frames, {"log_filters": ["ALL"]})
+
+        with pytest.raises(ValueError):
+            decode_bulk_body(msgpack.packb(["not a frame"]), BULK_MSGPACK_TYPE, {})
+
+    def test_msgpack_filters_must_be_lists_of_strings(self):
+        for live_filters in (5, "VDS", ["ALL", 1]):
+            body = msgpack.packb({"frames": [b"\x01" * 22], "live_filters": live_filters})
+
+            with pytest.raises(ValueError):
+                decode_bulk_body(body, BULK_MSGPACK_TYPE, {})
@@ -0,0 +1,152 @@
+import random
+import pytest
+import cantools
+
+from pathlib import Path
+
+from parser.can_decoder import DecodeCache, DecoderTable
+
+DBC_FILE = Path("./dbc/brightside.dbc")
+
+# <---- helper functions ---->
+
+
+def random_payload() -> bytes:
+    return random.getrandbits(64).to_bytes(8, 'big')
+
+# <---- test fixtures ---->
+
+
+@pytest.fixture(scope="module")
+def dbc():
+    # read in the DBC file
+    return cantools.database.load_file(DBC_FILE)
+
+
+@pytest.fixture(scope="module")
+def table(dbc):
+    return DecoderTable(dbc)
+
+# <---- tests ---->
+
+
+class TestFrameDecoder:
+    def test_decoder_matches_dbc(self, dbc, table):
+        """
+        every frame ID gets a decoder with the DBC's class name, source and signals
+        """
+        assert len(table) == len(dbc.messages)
+
+        for message in dbc.messages:
+            decoder = table.get(message.frame_id)
+            assert decoder.name == message.name
+            assert decoder.source == (message.senders[0] if message.senders else "UNKNOWN")
+            assert decoder.hex_id == "0x" + hex(message.frame_id)[2:].upper()
+            assert decoder.signal_names == tuple(signal.name for signal in message.signals)
+
+    def test_decode_matches_cantools(self, dbc, table):
+        random.seed(1)
+        for message in dbc.messages:
+            payload = random_payload()
+            assert table.get(message.frame_id).decode(payload) == dbc.decode_message(message.frame_id, payload)
+
+    def test_unknown_id(self, table):
+        assert table.get(0x1) is None
+
+
+class TestBatchDecode:
+    def test_columns_match_cantools(self, dbc, table):
+        """
+        every signal of every frame (including multiplexed messages) decodes to
+        exactly what cantools decodes for that frame alone
+        """
+        random.seed(2)
+        frame_ids = [random.choice(dbc.messages).frame_id for _ in range(5000)]
+        payloads = [random_payload() for _ in frame_ids]
+        timestamps = [float(i) for i in range(len(frame_ids))]
+
+        batch = table.decode_batch(timestamps, frame_ids, payloads)
+
+        assert len(batch) == len(frame_ids)
+        for frame_id, columns in batch.groups.items():
+            for row, index in enumerate(columns.indices.tolist()):
+                expected = dbc.decode_message(frame_id, payloads[index])
+                decoded = {
+                    name: values[row]
+                    for name, values in columns.columns.items()
+                    if name not in columns.present or columns.present[name][row]
+                }
+                assert decoded.keys() == expected.keys()
+                for name, value in expected.items():
+                    assert value == decoded[name] or (value != value and decoded[name] != decoded[name])
+
+    def test_unknown_and_truncated(self, dbc, table):
+        message = next(m for m in dbc.messages if m.length == 8)
+
+        batch = table.decode_batch(
+            [0.0, 1.0, 2.0],
+            [message.frame_id, 0x1, message.frame_id],
+            [bytes(8), bytes(8), bytes(2)],
+        )
+
+        assert batch.unknown.tolist() == [1]
+        assert batch.truncated.tolist() == [2]
+        assert batch.groups[message.frame_id].indices.tolist() == [0]
+
+    def test_extended_ids_and_choices(self):
+        """
+        a standard and an extended frame with the same ID decode with their own message, and
+        choice signals are named like cantools names them
+        """
+        dbc = cantools.database.load_string(
+            'VERSION ""\n\nBU_: A\n\n'
+            'BO_ 256 Standard: 8 A\n SG_ Mode : 0|8@1+ (1,0) [0|255] "" A\n\n'
+            'BO_ 2147483904 Extended: 8 A\n SG_ Level : 0|8@1+ (1,0) [0|255] "" A\n\n'
+            'VAL_ 256 Mode 1 "Drive" 2 "Reverse" ;\n',
+            database_format="dbc",
+        )
+        table = DecoderTable(dbc)
+        payloads = [bytes([1]) + bytes(7), bytes([1]) + bytes(7), bytes([7]) + bytes(7)]
+
+        batch = table.decode_batch([0.0, 1.0, 2.0], [0x100, 0x100, 0x100], payloads,
+                                   extended=[False, True, False], decode_choices=True)
+
+        assert sorted(columns.decoder.name for columns in batch.groups.values()) == ["Extended", "Standard"]
+        for columns in batch.groups.values():
+            for name, _, values in columns.signals():
+                expected = [columns.decoder.message.decode(payloads[i])[name] for i in columns.indices.tolist()]
+                assert [str(value) for value in values.tolist()] == [str(value) for value in expected]
+
+    def test_mismatched_lengths(self, table):
+        with pytest.raises(ValueError):
+            table.decode_batch([0.0], [0x1, 0x2], [bytes(8)])
+
+
+class TestDecodeCache:
+    def test_cached_decode_matches_cantools(self, dbc):
+        table = DecoderTable(dbc, cache_size=4)
+        message = dbc.messages[0]
+        decoder = table.get(message.frame_id)
+        payload = random_payload()
+
+        first = table.decode(decoder, payload)
+        second = table.decode(decoder, bytearray(payload))
+
+        assert first == dbc.decode_message(message.frame_id, payload)
+        assert second is first
+        assert (table.cache.hits, table.cache.misses) == (1, 1)
+
+    def test_lru_eviction(self):
+        cache = DecodeCache(2)
+        cache.put((1, b"a"), {"x": 1})
+        cache.put((2, b"b"), {"x": 2})
+        cache.get((1, b"a"))                # (2, b"b") is now least recently used
+        cache.put((3, b"c"), {"x": 3})
+
+        assert cache.get((2, b"b")) is None
+        assert cache.get((1, b"a")) == {"x": 1}
+        assert cache.stats()["evictions"] == 1
+        assert len(cache) == 2
+
+    def test_no_cache_by_default(self, table):
+        assert table.cache is None
@@ -0,0 +1,37 @@
+import pytest
+
+from parser import message_registry
+from parser.create_message import create_message
+from parser.message_registry import message_class_for, register_message
+from parser.randomizer import RandomMessage
+
+# <---- test fixtures ---->
+
+
+@pytest.fixture
+def private_registry(monkeypatch):
+    # register into copies of the registry so the test classes are gone after the test
+    monkeypatch.setattr(message_registry, "_BY_LENGTH", [list(candidates) for candidates in message_registry._BY_LENGTH])
+    monkeypatch.setattr(message_registry, "_BY_TYPE", dict(message_registry._BY_TYPE))
+
+# <---- tests ---->
+
+
+class TestMessageDispatch:
+    def test_every_type_is_routed(self):
+        randomizer = RandomMessage()
+
+        assert create_message(randomizer.random_can_bytes()).type == "CAN"
+        assert create_message(randomizer.random_imu_bytes()).type == "IMU"
+        assert create_message(randomizer.random_gps_bytes()).type == "GPS"
+
+    def test_marker_breaks_length_ties(self, private_registry):
+        class First: pass
+        class Second: pass
+        register_message("FIRST", 300, 301, b"A", marker_offset=1)(First)
+        register_message("SECOND", 300, 300, b"B", marker_offset=1)(Second)
+
+        assert message_class_for(b"xA" + bytes(298)) is First
+        assert message_class_for(b"xB" + bytes(298)) is Second
+        assert message_class_for(b"xC" + bytes(298)) is None
+        assert message_class_for(b"xB" + bytes(299)) is First
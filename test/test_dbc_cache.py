@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from parser.dbc_cache import load_dbc
+
+DBC_FILE = Path("./dbc/brightside.dbc")
+
+# <---- tests ---->
+
+
+class TestDbcCache:
+    def test_snapshot_is_reused(self, tmp_path):
+        first = load_dbc(DBC_FILE, tmp_path)
+        snapshots = list(tmp_path.glob("*.pickle"))
+        second = load_dbc(DBC_FILE, tmp_path)
+
+        assert len(snapshots) == 1
+        assert [m.name for m in second.messages] == [m.name for m in first.messages]
+
+    def test_snapshot_is_rebuilt_when_dbc_changes(self, tmp_path):
+        dbc_copy = tmp_path / "car.dbc"
+        dbc_copy.write_bytes(DBC_FILE.read_bytes())
+        load_dbc(dbc_copy, tmp_path / "cache")
+        old_snapshots = set((tmp_path / "cache").glob("*.pickle"))
+
+        dbc_copy.write_bytes(DBC_FILE.read_bytes() + b"\n")
+        load_dbc(dbc_copy, tmp_path / "cache")
+        new_snapshots = set((tmp_path / "cache").glob("*.pickle"))
+
+        assert len(new_snapshots) == 1 and new_snapshots != old_snapshots
+
+    def test_other_versions_snapshots_are_kept(self, tmp_path):
+        other_version = tmp_path / f"{DBC_FILE.stem}.{'0' * 32}.cantools0.0.0-py30.pickle"
+        other_version.write_bytes(b"")
+        load_dbc(DBC_FILE, tmp_path)
+
+        assert other_version.exists() and len(list(tmp_path.glob("*.pickle"))) == 2
@@ -0,0 +1,44 @@
+import os
+from pathlib import Path
+
+from parser.dbc_watcher import DbcSource
+
+DBC_FILE = Path("./dbc/brightside.dbc")
+
+# <---- tests ---->
+
+
+class TestDbcSource:
+    def test_reload_swaps_in_new_version(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DBC_CACHE_DIR", str(tmp_path / "cache"))
+        dbc_copy = tmp_path / "car.dbc"
+        dbc_copy.write_bytes(DBC_FILE.read_bytes())
+        source = DbcSource(dbc_copy, log=lambda line: None)
+        swapped = []
+        source.add_listener(swapped.append)
+
+        in_flight = source.current()
+        assert source.reload() is False         # file did not change
+
+        # drop the last message from the DBC
+        text = DBC_FILE.read_bytes()
+        dbc_copy.write_bytes(text[:text.rindex(b"\nBO_ ")] + b"\n")
+        os.utime(dbc_copy, ns=(0, 1))
+        assert source.reload() is True
+
+        assert source.current().version == in_flight.version + 1
+        assert len(source.current().decoders) == len(in_flight.decoders) - 1
+        assert swapped == [source.current()]
+
+    def test_broken_dbc_keeps_previous_version(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DBC_CACHE_DIR", str(tmp_path / "cache"))
+        dbc_copy = tmp_path / "car.dbc"
+        dbc_copy.write_bytes(DBC_FILE.read_bytes())
+        source = DbcSource(dbc_copy, log=lambda line: None)
+        before = source.current()
+
+        dbc_copy.write_bytes(b"BO_ this is not a dbc")
+        os.utime(dbc_copy, ns=(0, 1))
+
+        assert source.reload() is False
+        assert source.current() is before
@@ -0,0 +1,38 @@
+import numpy as np
+
+from parser.deadband import DeadbandFilter
+
+# <---- tests ---->
+
+
+class TestDeadbandFilter:
+    def test_unchanged_values_are_suppressed(self):
+        deadband = DeadbandFilter(max_silence=None)
+
+        emitted = [deadband.should_emit("BMS", "Faults", "Overvoltage", value, float(t))
+                   for t, value in enumerate([0, 0, 0, 1, 1, 0])]
+
+        assert emitted == [True, False, False, True, False, True]
+        assert deadband.stats()["suppressed"] == 3
+
+    def test_deadband_compares_to_last_emitted_value(self):
+        deadband = DeadbandFilter(max_silence=None, deadbands={"PackVoltage": 0.5})
+
+        emitted = [deadband.should_emit("BMS", "Pack", "PackVoltage", value, float(t))
+                   for t, value in enumerate([100.0, 100.3, 100.6, 100.7, 99.9])]
+
+        # 100.6 is 0.6 away from the last emitted 100.0 even though it moved 0.3 per frame
+        assert emitted == [True, False, True, False, True]
+
+    def test_heartbeat_after_max_silence(self):
+        deadband = DeadbandFilter(max_silence=10.0)
+
+        emitted = [deadband.should_emit("MC", "Status", "Mode", 3, t) for t in (0.0, 5.0, 10.0, 15.0)]
+
+        assert emitted == [True, False, True, False]
+
+    def test_mask_matches_should_emit(self):
+        deadband = DeadbandFilter(max_silence=None)
+        mask = deadband.mask("MC", "Status", "Mode", np.arange(4.0), np.array([1, 1, 2, 2]))
+
+        assert mask.tolist() == [True, False, True, False]
@@ -0,0 +1,22 @@
+from parser.filters import compile_filters
+
+# <---- tests ---->
+
+
+class TestFilters:
+    def test_ids_and_types(self):
+        frame_filter = compile_filters(["0x401", "1795", "imu"])
+
+        assert frame_filter.matches("CAN", 0x401)
+        assert frame_filter.matches("CAN", 1795)
+        assert frame_filter.matches("IMU")
+        assert not frame_filter.matches("CAN", 0x402)
+        assert not frame_filter.matches("GPS")
+
+    def test_all_and_none(self):
+        assert compile_filters(["NONE", "ALL"]).matches("GPS")
+        assert not compile_filters(["NONE", "CAN"]).matches("CAN", 0x401)
+        assert not compile_filters(False).matches("CAN", 0x401)
+
+    def test_compiled_once_per_list(self):
+        assert compile_filters(["CAN", "0x401"]) is compile_filters(["CAN", "0x401"])
@@ -0,0 +1,62 @@
+from parser.grafana_live import GrafanaLivePool, line_protocol
+
+# <---- tests ---->
+
+
+class FakeSocket:
+    def __init__(self, url, fail_send=False):
+        self.url = url
+        self.fail_send = fail_send
+        self.sent = []
+        self.closed = False
+
+    def send(self, message):
+        if self.fail_send:
+            raise ConnectionError("closed")
+        self.sent.append(message)
+
+    def close(self):
+        self.closed = True
+
+
+class TestGrafanaLivePool:
+    def make_pool(self, fail_connect=False):
+        sockets = []
+        def connect(url, additional_headers):
+            if fail_connect:
+                raise ConnectionRefusedError("grafana down")
+            sockets.append(FakeSocket(url))
+            return sockets[-1]
+        return GrafanaLivePool("grafana:3000", "token", "Brightside", log=lambda text: None, connect=connect), sockets
+
+    def test_socket_is_reused(self):
+        pool, sockets = self.make_pool()
+        url = pool.channel_url("BMS", "Pack")
+
+        assert url == "ws://grafana:3000/api/live/push/Brightside_BMS_Pack"
+        assert pool.push(url, "a") and pool.push(url, "b")
+        assert len(sockets) == 1 and sockets[0].sent == ["a", "b"]
+
+    def test_stale_socket_reconnects(self):
+        pool, sockets = self.make_pool()
+        url = pool.channel_url("BMS", "Pack")
+        pool.push(url, "a")
+        sockets[0].fail_send = True
+
+        assert pool.push(url, "b")
+        assert sockets[0].closed and sockets[1].sent == ["b"]
+
+    def test_backoff_after_failed_connect(self):
+        pool, _ = self.make_pool(fail_connect=True)
+        url = pool.channel_url("BMS", "Pack")
+
+        assert not pool.push(url, "a")
+        assert not pool.push(url, "b")
+        assert pool.stats()["failed"] == 1 and pool.stats()["dropped"] == 1
+
+
+class TestLineProtocol:
+    def test_multi_field_line(self):
+        line = line_protocol("Pack Status", [("Voltage", 3), ("Is Charging", True), ("Mode", 'a"b')], 17)
+
+        assert line == 'Pack\\ Status Voltage=3.0,Is\\ Charging=true,Mode="a\\"b" 17'
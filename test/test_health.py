@@ -0,0 +1,50 @@
+import requests
+
+from parser.health import HealthMonitor
+
+# <---- tests ---->
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class TestHealthMonitor:
+    def make_monitor(self, results):
+        def get(url, headers, timeout):
+            result = results[url]
+            if isinstance(result, Exception):
+                raise result
+            return FakeResponse(result)
+
+        monitor = HealthMonitor(get=get, log=lambda text: None)
+        monitor.add("influxdb", "http://influxdb:8086/", "influx", "token")
+        monitor.add("grafana", "http://grafana:3000/", "grafana", "token")
+        return monitor
+
+    def test_services_are_available_until_probed(self):
+        monitor = self.make_monitor({})
+
+        assert monitor.status("influxdb") == "UNKNOWN"
+        assert monitor.is_available("influxdb")
+
+    def test_probe_results(self):
+        results = {"influx": 200, "grafana": 401}
+        monitor = self.make_monitor(results)
+        monitor.check()
+
+        services = {service["name"]: service for service in monitor.services()}
+        assert services["influxdb"]["status"] == "UP"
+        assert services["influxdb"]["last_success"] is not None
+        assert services["grafana"]["status"] == "UNAUTHORIZED"
+        assert services["grafana"]["last_success"] is None
+        assert not monitor.is_available("grafana")
+
+        results["influx"] = requests.exceptions.ConnectTimeout("timed out")
+        monitor.check()
+
+        services = {service["name"]: service for service in monitor.services()}
+        assert services["influxdb"]["status"] == "DOWN"
+        assert services["influxdb"]["last_success"] is not None        # time of the last success is kept
+        assert not monitor.is_available("influxdb")
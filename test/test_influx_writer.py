@@ -0,0 +1,77 @@
+import time
+
+from parser.influx_writer import BatchingWriter
+
+# <---- tests ---->
+
+
+class TestBatchingWriter:
+    def test_batches_per_bucket(self):
+        writes = []
+        writer = BatchingWriter(lambda bucket, points: writes.append((bucket, points)), batch_size=3, flush_interval=60)
+
+        writer.add("CAN_test", [1, 2])
+        writer.add("IMU_test", [10])
+        writer.add("CAN_test", [3])
+        writer.flush()
+
+        assert writes == [("CAN_test", [1, 2, 3])]
+        writer.close()
+        assert ("IMU_test", [10]) in writes
+
+    def test_flushes_by_age(self):
+        writes = []
+        writer = BatchingWriter(lambda bucket, points: writes.append((bucket, points)), batch_size=100, flush_interval=0.05)
+        writer.start()
+
+        writer.add("CAN_test", [1])
+        deadline = time.time() + 2
+        while not writes and time.time() < deadline:
+            time.sleep(0.01)
+
+        writer.close()
+        assert writes == [("CAN_test", [1])]
+
+    def test_failed_write_is_retried_and_reported(self):
+        writes = []
+        def write(bucket, points):
+            if not writes:
+                writes.append(None)
+                raise ConnectionError("influx down")
+            writes.append((bucket, points))
+
+        writer = BatchingWriter(write, batch_size=1, log=lambda text: None)
+        writer.add("CAN_test", [1])
+        writer.flush()
+
+        assert isinstance(writer.add("CAN_test", [2]), ConnectionError)
+        assert writer.add("CAN_test", [3]) is None
+        writer.flush()
+        assert writes[-1] == ("CAN_test", [1, 2, 3])
+
+    def test_memory_is_bounded(self):
+        writer = BatchingWriter(lambda bucket, points: None, batch_size=100, max_points=5)
+        writer.add("CAN_test", list(range(8)))
+
+        assert writer.stats()["buffered"] == {"CAN_test": 5}
+        assert writer.dropped == 3
+
+    def test_writes_are_held_while_not_ready(self):
+        writes = []
+        ready = [False]
+        writer = BatchingWriter(lambda bucket, points: writes.append((bucket, points)), batch_size=1,
+                                flush_interval=0.02, ready=lambda: ready[0])
+        writer.start()
+
+        writer.add("CAN_test", [1])
+        time.sleep(0.1)
+        assert writes == []
+        assert isinstance(writer.add("CAN_test", [2]), ConnectionError)
+
+        ready[0] = True
+        deadline = time.time() + 2
+        while not writes and time.time() < deadline:
+            time.sleep(0.01)
+
+        writer.close()
+        assert writes == [("CAN_test", [1, 2])]
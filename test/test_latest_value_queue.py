@@ -0,0 +1,21 @@
+from parser.latest_value_queue import LatestValueQueue
+
+# <---- tests ---->
+
+
+class TestLatestValueQueue:
+    def test_keeps_latest_value(self):
+        stream_queue = LatestValueQueue()
+        stream_queue.put_many([(("BMS", "Pack", "Voltage"), 1.0), (("BMS", "Pack", "Current"), 2.0)])
+        stream_queue.put(("BMS", "Pack", "Voltage"), 3.0)
+
+        assert stream_queue.drain() == {("BMS", "Pack", "Voltage"): 3.0, ("BMS", "Pack", "Current"): 2.0}
+        assert stream_queue.stats()["coalesced"] == 1
+        assert stream_queue.drain(timeout=0) == {}
+
+    def test_drops_oldest_key_when_full(self):
+        stream_queue = LatestValueQueue(max_keys=2)
+        stream_queue.put_many([("a", 1), ("b", 2), ("c", 3)])
+
+        assert stream_queue.drain() == {"b": 2, "c": 3}
+        assert stream_queue.stats()["dropped"] == 1
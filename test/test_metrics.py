@@ -0,0 +1,44 @@
+from parser.metrics import Registry, merge_snapshots, render_snapshot
+
+# <---- tests ---->
+
+
+class TestMetrics:
+    def test_histogram_buckets_are_cumulative(self):
+        metrics = Registry()
+        stage_seconds = metrics.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0))
+        stage_seconds.observe(0.05, "decode")
+        stage_seconds.observe(0.5, "decode")
+        stage_seconds.observe(5.0, "decode")
+
+        lines = metrics.render().splitlines()
+        assert 'stage_seconds_bucket{stage="decode",le="0.1"} 1' in lines
+        assert 'stage_seconds_bucket{stage="decode",le="1.0"} 2' in lines
+        assert 'stage_seconds_bucket{stage="decode",le="+Inf"} 3' in lines
+        assert 'stage_seconds_count{stage="decode"} 3' in lines
+
+    def test_counters_and_callbacks(self):
+        metrics = Registry()
+        results = metrics.counter("results_total", "Results", ("result",))
+        results.inc("OK")
+        results.inc("OK")
+        metrics.gauge("depth", "Queue depth", lambda: 7)
+        metrics.counter_callback("failures_total", "Failures", lambda: {"UNKNOWN_ID": 2}, "code")
+
+        lines = metrics.render().splitlines()
+        assert 'results_total{result="OK"} 2' in lines
+        assert "# TYPE depth gauge" in lines and "depth 7" in lines
+        assert 'failures_total{code="UNKNOWN_ID"} 2' in lines
+
+    def test_snapshots_of_processes_are_merged(self):
+        def process(frames, up):
+            metrics = Registry()
+            metrics.counter("frames_total", "Frames", ("endpoint",)).inc("bulk", amount=frames)
+            metrics.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1,)).observe(0.05, "decode")
+            metrics.gauge("service_up", "Service up", lambda: {"influxdb": up}, "service", aggregate="max")
+            return metrics.snapshot()
+
+        lines = render_snapshot(merge_snapshots([process(3, 0), process(4, 1)])).splitlines()
+        assert 'frames_total{endpoint="bulk"} 7' in lines
+        assert 'stage_seconds_count{stage="decode"} 2' in lines
+        assert 'service_up{service="influxdb"} 1' in lines
@@ -0,0 +1,37 @@
+import pytest
+
+from parser.create_message import create_message
+from parser.parameters import CAN_FRAME, CAN_FRAME_MARKER
+from parser.parse_errors import ParseError, ParseErrorCode, failure_counts
+
+# <---- tests ---->
+
+
+class TestParseErrors:
+    def test_unknown_id(self):
+        frame = CAN_FRAME.pack(0.0, CAN_FRAME_MARKER, 0x1, bytes(8)) + b"8"
+        before = failure_counts().get("UNKNOWN_ID", 0)
+
+        with pytest.raises(ParseError) as error:
+            create_message(frame)
+
+        assert error.value.code == ParseErrorCode.UNKNOWN_ID
+        assert error.value.message_type == "CAN"
+        assert failure_counts()["UNKNOWN_ID"] == before + 1
+
+    def test_verbose_text_is_built_lazily(self):
+        frame = CAN_FRAME.pack(0.0, b"$", 0x1, bytes(8)) + b"8"
+
+        with pytest.raises(ParseError) as error:
+            create_message(frame)
+
+        assert error.value.code == ParseErrorCode.MALFORMED_FRAME
+        assert error.value._text is None
+        assert frame.hex() in str(error.value)
+
+    def test_invalid_length(self):
+        with pytest.raises(ParseError) as error:
+            create_message(b"\x00" * 3)
+
+        assert error.value.code == ParseErrorCode.INVALID_LENGTH
+        assert error.value.message_type is None
@@ -0,0 +1,47 @@
+from parser.parameters import CAN_FRAME, IMU_FRAME
+from parser.serial_framer import SerialFramer
+
+# <---- tests ---->
+
+# the payload of this CAN frame contains b"\r\n"
+CAN = CAN_FRAME.pack(1718000000.25, b"#", 0x401, b"\x01\r\n\x02\x03\x04\x05\x06") + b"8" + b"\r\n"
+IMU = IMU_FRAME.pack(1718000000.5, b"@", b"AX", 1.5) + b"\r\n"
+GPS = b"Latitude: 49.262400 N, Longitude: 123.249600 W, Altitude: 90.00 meters".ljust(198) + b"\r\n"
+
+
+class TestSerialFramer:
+    def test_frames_across_chunks(self):
+        framer = SerialFramer()
+        stream = CAN + IMU + GPS + CAN
+
+        frames = []
+        for i in range(len(stream)):
+            frames.extend(framer.feed(stream[i:i + 1]))
+
+        assert frames == [CAN, IMU, GPS, CAN]
+        assert framer.stats()["frames"] == {"CAN": 2, "IMU": 1, "GPS": 1}
+        assert framer.discarded_bytes == 0
+
+    def test_resyncs_after_garbage(self):
+        framer = SerialFramer()
+
+        frames = framer.feed(b"\x00\n" + CAN + b"garbage\r\n" + IMU + CAN[:10])
+        frames += framer.feed(CAN[10:])
+
+        assert frames == [CAN, IMU, CAN]
+        assert framer.discarded_bytes == 2 + len(b"garbage\r\n")
+        assert framer.misframes == 2
+
+    def test_truncated_frame_is_discarded(self):
+        framer = SerialFramer()
+
+        assert framer.feed(CAN[:12] + b"\r\n" + IMU) == [IMU]
+        assert framer.discarded_bytes == 14
+
+    def test_long_garbage_across_chunks(self):
+        framer = SerialFramer()
+
+        assert framer.feed(b"x" * 300) == []
+        assert framer.feed(b"x" * 300 + CAN) == [CAN]
+        assert framer.discarded_bytes == 600
+        assert framer.misframes == 1
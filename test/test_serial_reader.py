@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+from parser.serial_reader import SerialReader
+
+# <---- tests ---->
+
+
+class FakeSerial:
+    def __init__(self, chunks, error=None):
+        self.chunks = list(chunks)
+        self.error = error
+        self.done = threading.Event()
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size):
+        if self.chunks:
+            return self.chunks.pop(0)
+        self.done.set()
+        if self.error is not None:
+            raise self.error
+        time.sleep(0.01)
+        return b""
+
+
+class TestSerialReader:
+    def test_chunks_are_read_in_order(self):
+        ser = FakeSerial([b"ab", b"cd", b"ef"])
+        reader = SerialReader(ser)
+        reader.start()
+        assert ser.done.wait(2)
+
+        assert reader.read() == b"abcdef"
+        assert reader.read(timeout=0.01) == b""
+        assert reader.stats()["bytes_read"] == 6
+        reader.stop()
+
+    def test_overflow_drops_new_chunks(self):
+        ser = FakeSerial([b"a", b"b", b"c", b"d"])
+        reader = SerialReader(ser, max_chunks=2)
+        reader.start()
+        assert ser.done.wait(2)
+
+        assert reader.read() == b"ab"
+        assert (reader.overflows, reader.dropped_bytes, reader.high_water) == (2, 2, 2)
+        reader.stop()
+
+    def test_read_error_is_raised_after_the_data(self):
+        ser = FakeSerial([b"ab"], error=OSError("device unplugged"))
+        reader = SerialReader(ser, log=lambda text: None)
+        reader.start()
+        assert ser.done.wait(2)
+        time.sleep(0.05)
+
+        assert reader.read() == b"ab"
+        with pytest.raises(OSError):
+            reader.read()
@@ -0,0 +1,96 @@
+import queue
+import msgpack
+
+from parser.bulk_frames import pack_frames, unpack_frames
+from parser.stream_ingest import StreamClient, StreamSession
+
+# <---- helper functions ---->
+
+
+class FakeWebSocket:
+    """
+    connection to a fake parser: batches are acked only when acking is True
+    """
+    def __init__(self, acking: bool) -> None:
+        self.acking = acking
+        self.session = StreamSession("_test", lambda frames, *_: {"received": len(frames)})
+        self.batches = []
+        self._replies = queue.Queue()
+
+    def send(self, data) -> None:
+        if isinstance(data, bytes):
+            self.batches.append([bytes(frame) for frame in unpack_frames(data)])
+        reply = self.session.handle(data)
+        if self.acking:
+            self._replies.put(reply)
+
+    def close(self) -> None:
+        self._replies.put(None)
+
+    def __iter__(self):
+        return iter(self._replies.get, None)
+
+# <---- tests ---->
+
+
+class TestStreamSession:
+    def make_session(self):
+        calls = []
+        def process_frames(frames, bucket, live_filters, log_filters, display_filters):
+            calls.append(([bytes(frame) for frame in frames], bucket, live_filters, display_filters))
+            return {"received": len(frames), "ok": len(frames), "failed": 0, "all_responses": []}
+        return StreamSession("_test", process_frames), calls
+
+    def test_batches_are_acked_in_order(self):
+        session, calls = self.make_session()
+
+        first = msgpack.unpackb(session.handle(pack_frames([b"a" * 22, b"b" * 15])))
+        second = msgpack.unpackb(session.handle(pack_frames([b"c" * 22])))
+
+        assert (first["seq"], first["received"]) == (1, 2)
+        assert (second["seq"], second["received"]) == (2, 1)
+        assert calls[0] == ([b"a" * 22, b"b" * 15], "_test", ["NONE"], ["NONE"])
+
+    def test_options_apply_to_later_batches(self):
+        session, calls = self.make_session()
+
+        reply = msgpack.unpackb(session.handle('{"live_filters": ["CAN"], "display_filters": ["0x401"]}'))
+        session.handle(pack_frames([b"a" * 22]))
+
+        assert reply["options"]["live_filters"] == ["CAN"]
+        assert calls[0][2:] == (["CAN"], ["0x401"])
+
+    def test_bad_messages_are_rejected(self):
+        session, calls = self.make_session()
+
+        assert "error" in msgpack.unpackb(session.handle('{"live_filters": "CAN"}'))
+        assert "error" in msgpack.unpackb(session.handle(b"\x00"))
+        assert calls == []
+
+
+class TestStreamClient:
+    def test_unacked_batches_are_resent_after_reconnect(self):
+        connections = [FakeWebSocket(acking=False), FakeWebSocket(acking=True)]
+        opened = iter(connections)
+        replies = []
+        client = StreamClient("ws://parser", {}, {}, replies.append, window=2, ack_timeout=0.2,
+                              log=lambda message: None, connect=lambda url, additional_headers: next(opened))
+
+        assert client.send([b"a" * 22]) and client.send([b"b" * 22])
+        assert not client.send([b"c" * 22])         # no ack in ack_timeout: the connection is dropped
+        assert client.send([b"d" * 22])             # reconnects, sending a and b again first
+        client.close()
+
+        assert connections[1].batches == [[b"a" * 22], [b"b" * 22], [b"d" * 22]]
+        assert [reply["seq"] for reply in replies if "seq" in reply] == [1, 2, 3]
+        assert (client.sent_batches, client.resent_batches, client.lost_batches) == (3, 2, 1)
+
+    def test_unacked_batches_are_lost_at_close(self):
+        client = StreamClient("ws://parser", {}, {}, lambda reply: None, ack_timeout=0.1,
+                              log=lambda message: None, connect=lambda url, additional_headers: FakeWebSocket(acking=False))
+
+        client.send([b"a" * 22])
+        client.send([b"b" * 22])
+        client.close()
+
+        assert client.lost_batches == 2
@@ -1,7 +1,6 @@
 import canlib.kvmlib as kvmlib
 import re
 import datetime
-import struct
 import time
 import sys
 
@@ -32,11 +31,17 @@ ERROR_ID                = 0
 # Data Count Updater
 MSGS_TO_UPDATE          = 1000
 
+# Number of log events decoded together by create_message_batch
+EVENTS_PER_BATCH        = 50000
+
 
 def upload(log_file: kvmlib.LogFile, parserCallFunc: callable, live_filters: list,  log_filters: list, display_filters: list, args: list, csv_file_f):
     start_time = None
     got_start_time = False
-    global num_msgs_processed
+
+    # events are decoded in column batches (parserCallFunc is create_message_batch); choice signals
+    # are written by name, as they were when every event was decoded on its own
+    timestamps, ids, payloads = [], [], []
 
     for event in log_file:
         str_event = str(event)
@@ -54,51 +59,60 @@ def upload(log_file: kvmlib.LogFile, parserCallFunc: callable, live_filters: lis
         elif PATTERN_EVENT.search(str_event):
             match = PATTERN_EVENT.search(str_event)
             timestamp = start_time + float(match.group(1))
-            timestamp_str = struct.pack('>d', timestamp).decode('latin-1')
 
             id = int(match.group(3).strip(), 16)
 
             if id == ERROR_ID:
                 continue
-            
-            id_str = id.to_bytes(4, 'big').decode('latin-1') 
 
-            dlc_str = match.group(4)
+            timestamps.append(timestamp)
+            ids.append(id)
+            payloads.append(bytes.fromhex(match.group(5).replace(' ', '')))
 
-            data = bytes.fromhex(match.group(5).replace(' ', ''))
-            data_str = data.ljust(8, b'\0').decode('latin-1')
-            
-            can_str = timestamp_str + "#" + id_str + data_str + dlc_str
+            if len(ids) >= EVENTS_PER_BATCH:
+                write_batch(parserCallFunc(timestamps, ids, payloads, decode_choices=True), csv_file_f)
+                timestamps, ids, payloads = [], [], []
 
+    if ids:
+        write_batch(parserCallFunc(timestamps, ids, payloads, decode_choices=True), csv_file_f)
 
-            try:
-                can_msg = parserCallFunc(can_str)
-            except Exception as e:
-                continue
 
-            num_msgs_processed += 1
-
-            if num_msgs_processed % MSGS_TO_UPDATE == 0:
-                sys.stdout.write(ANSI_SAVE_CURSOR)  # Save cursor position
-                sys.stdout.write(f"{ANSI_YELLOW}Processed {num_msgs_processed} Messages in {(time.time() - start_time_log):.2f} Seconds!{ANSI_RESET}")  # Yellow text
-                sys.stdout.write(ANSI_RESTORE_CURSOR)  # Restore cursor position
-                sys.stdout.flush()
-
-            if not isinstance(can_msg, Exception) and can_msg is not None:
-                dict_data = can_msg.data['display_data']['COL']
-                class_name = dict_data['Class'][0]
-                for i in range(len(dict_data['Timestamp'])):
-                    csv_string = ",,0,,,"
-                    csv_string += "T".join(dict_data['Timestamp'][i].split(" ")) + "Z"    # Timestamp
-                    csv_string += "," + str(dict_data['Value'][i])                            # Value
-                    csv_string += "," + dict_data['Measurement'][i]                      # Signal Name
-                    csv_string += "," + dict_data['Source'][i]                           # Board Name
-                    csv_string += "," + "Brightside"                                # Car Name
-                    csv_string += "," + class_name                                  # Message Name
-
-                    print(csv_string + '\n', file=csv_file_f, end='')
-                
-            continue
+"""
+Writes one CSV row per decoded signal of a batch and updates the processed message counter
+
+Parameters:
+    can_batch: CanBatch returned by create_message_batch
+    csv_file_f: open CSV file to append to
+"""
+def write_batch(can_batch, csv_file_f):
+    global num_msgs_processed
+
+    for columns in can_batch.groups.values():
+        decoder = columns.decoder
+        formatted_ts = [datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + "Z"
+                        for ts in columns.timestamps.tolist()]
+
+        rows = []
+        for name, values in columns.columns.items():
+            mask = columns.present.get(name)
+            if mask is None:
+                row_indices, row_values = range(len(columns)), values.tolist()
+            else:
+                row_indices, row_values = mask.nonzero()[0].tolist(), values[mask].tolist()
+
+            for i, value in zip(row_indices, row_values):
+                rows.append(f",,0,,,{formatted_ts[i]},{value},{name},{decoder.source},Brightside,{decoder.name}\n")
+
+        csv_file_f.write("".join(rows))
+
+    previous = num_msgs_processed
+    num_msgs_processed += len(can_batch)
+
+    if num_msgs_processed // MSGS_TO_UPDATE != previous // MSGS_TO_UPDATE:
+        sys.stdout.write(ANSI_SAVE_CURSOR)  # Save cursor position
+        sys.stdout.write(f"{ANSI_YELLOW}Processed {num_msgs_processed} Messages in {(time.time() - start_time_log):.2f} Seconds!{ANSI_RESET}")  # Yellow text
+        sys.stdout.write(ANSI_RESTORE_CURSOR)  # Restore cursor position
+        sys.stdout.flush()
             
 
 def memorator_upload_script(parserCallFunc: callable, live_filters: list,  log_filters: list, display_filters: list, args: list, csv_file_f):